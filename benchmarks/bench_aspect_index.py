@@ -0,0 +1,111 @@
+"""Benchmark of keyword matching cost against taxonomy size.
+
+Compares the original list-based matching (four separate passes over the Doc,
+each doing a linear search of the keywords) against a single pass over the Doc
+using a compiled taxonomy.AspectIndex, for taxonomies of increasing size.
+
+Docs are built directly from words and lemmas, so no spacy model is needed.
+
+Usage:
+    python -m benchmarks.bench_aspect_index [--docs N] [--tokens N]
+"""
+
+import argparse
+import random
+import time
+
+from la_nlp import components, taxonomy
+
+from spacy.tokens import Doc
+from spacy.vocab import Vocab
+
+TAXONOMY_SIZES = [(5, 5), (40, 15), (200, 15)]
+FILLER = ["the", "be", "good", "and", "I", "think", "very", "long", "a", "it"]
+
+
+def make_aspects(n_aspects: int, n_keywords: int) -> dict:
+    """Builds a synthetic taxonomy of n_aspects with n_keywords each."""
+    return {
+        f"aspect{a}": [f"keyword{a}_{k}" for k in range(n_keywords)]
+        for a in range(n_aspects)
+    }
+
+
+def make_docs(vocab: Vocab, aspects: dict, n_docs: int, n_tokens: int) -> list:
+    """Builds Docs of filler lemmas with roughly one keyword per ten tokens."""
+    keywords = [kw for kws in aspects.values() for kw in kws]
+    rng = random.Random(0)
+    docs = []
+    for _ in range(n_docs):
+        lemmas = [
+            rng.choice(keywords) if rng.random() < 0.1 else rng.choice(FILLER)
+            for _ in range(n_tokens)
+        ]
+        docs.append(Doc(vocab, words=lemmas, lemmas=lemmas))
+    return docs
+
+
+def legacy_match(doc: Doc, aspects: dict, keywords: list) -> None:
+    """The original per-component matching logic."""
+    contains_aspect = False
+    for token in doc:
+        if token.lemma_ in keywords or token.lemma_.lower() in keywords:
+            contains_aspect = True
+            break
+    if not contains_aspect:
+        return
+    aspects_contained = []
+    for token in doc:
+        for aspect in aspects:
+            if aspect in aspects_contained:
+                continue
+            kws = aspects[aspect]
+            if token.lemma_ in kws or token.lemma_.lower() in kws:
+                aspects_contained.append(aspect)
+    doc_keywords = []
+    for token in doc:
+        if token.lemma_ in keywords or token.lemma_.lower() in keywords:
+            doc_keywords.append(token)
+    for doc_keyword in doc_keywords:
+        for aspect in aspects:
+            for keyword in aspects[aspect]:
+                if doc_keyword.lemma_ == keyword or doc_keyword.lemma_.lower() == keyword:
+                    doc_keyword._.aspect = aspect
+
+
+def time_docs(func, docs: list) -> float:
+    """Returns mean seconds per doc of func over docs."""
+    start = time.perf_counter()
+    for doc in docs:
+        func(doc)
+    return (time.perf_counter() - start) / len(docs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=60)
+    args = parser.parse_args()
+
+    components.set_extension("aspect", target_obj=components.Token)
+    vocab = Vocab()
+
+    print(f"{'aspects':>8} {'keywords':>9} {'legacy us/doc':>14} {'index us/doc':>13}")
+    for n_aspects, n_keywords in TAXONOMY_SIZES:
+        aspects = make_aspects(n_aspects, n_keywords)
+        keywords = [kw for kws in aspects.values() for kw in kws]
+        docs = make_docs(vocab, aspects, args.docs, args.tokens)
+        index = taxonomy.compile_aspects(aspects)
+
+        legacy = time_docs(lambda doc: legacy_match(doc, aspects, keywords), docs)
+        indexed = time_docs(
+            lambda doc: components.set_doc_aspect_matches(doc, index), docs
+        )
+        print(
+            f"{n_aspects:>8} {len(keywords):>9} "
+            f"{legacy * 1e6:>14.1f} {indexed * 1e6:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark of the cost of importing la_nlp.pipes.aspect_sentiment.
+
+Each measurement is made in a fresh interpreter, reporting wall time and peak
+RSS for a bare interpreter, for importing the module, and for importing the
+module and loading its model via get_nlp(). Importing the module should cost
+little more than importing spacy itself, with the model only paid for on use.
+
+Usage:
+    python -m benchmarks.bench_import [--repeat N] [--model NAME]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SNIPPETS = {
+    "interpreter": "pass",
+    "import spacy": "import spacy",
+    "import aspect_sentiment": "import la_nlp.pipes.aspect_sentiment",
+    "import + get_nlp()": (
+        "import la_nlp.pipes.aspect_sentiment as asp; asp.get_nlp({model!r})"
+    ),
+}
+
+MEASURE = """
+import json, resource, sys, time
+start = time.perf_counter()
+{snippet}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+loaded = "en_core_web_lg" in sys.modules or "en_core_web_sm" in sys.modules
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_kb / 1024, "model_loaded": loaded}}))
+"""
+
+
+def measure(snippet: str) -> dict:
+    """Runs a snippet in a fresh interpreter and returns its measurements."""
+    code = MEASURE.format(snippet=snippet)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name, snippet in SNIPPETS.items():
+        runs = [measure(snippet.format(model=args.model)) for _ in range(args.repeat)]
+        results[name] = {
+            "seconds": statistics.median(run["seconds"] for run in runs),
+            "rss_mb": statistics.median(run["rss_mb"] for run in runs),
+            "model_loaded": runs[0]["model_loaded"],
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'':<26} {'seconds':>8} {'peak RSS MB':>12} {'model loaded':>13}")
+    for name, result in results.items():
+        print(
+            f"{name:<26} {result['seconds']:>8.3f} {result['rss_mb']:>12.1f} "
+            f"{str(result['model_loaded']):>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
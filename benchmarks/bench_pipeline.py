@@ -0,0 +1,244 @@
+"""Benchmark suite for the aspect sentiment pipeline.
+
+For synthetic corpora (see benchmarks.corpus) of each comment length and
+keyword density, measures:
+
+- throughput of make_docs() in docs/sec,
+- p50/p95 latency per Doc of parsing and of each components.set_* stage,
+- peak traced Python memory (tracemalloc) while running make_docs(), and
+- peak RSS of the process.
+
+It also measures how the cost of the components scales with taxonomy size.
+Results are written as JSON so runs can be compared with --compare, which
+prints the ratio of each throughput and p50 latency to those of a previous run.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--docs N] [--model NAME]
+        [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import platform
+import resource
+import statistics
+import time
+import tracemalloc
+
+import spacy
+
+from benchmarks import corpus
+from la_nlp import components, sentiment, taxonomy, utils
+from la_nlp.pipes import aspect_sentiment as asp
+
+LENGTHS = ["short", "medium", "essay"]
+DENSITIES = [0.1, 0.5, 1.0]
+TAXONOMY_SIZES = [(5, 5), (40, 15), (200, 15)]
+
+STAGES = [
+    "parse",
+    "set_doc_aspect_matches",
+    "set_token_parent_span",
+    "set_span_sentiment",
+    "set_doc_aspect_sentiments",
+]
+
+
+def percentiles(values: list[float]) -> dict:
+    """Returns the p50 and p95 of values, in microseconds."""
+    if len(values) < 2:
+        values = values * 2
+    cuts = statistics.quantiles(values, n=100)
+    return {"p50_us": cuts[49] * 1e6, "p95_us": cuts[94] * 1e6}
+
+
+def time_stages(texts: list[str], aspects: dict, model: str | None) -> dict:
+    """Times parsing and each component stage per Doc."""
+    nlp = asp.get_nlp(model)
+    cfg, disable = asp.get_pipe_config(aspects, nlp=nlp)
+    disable.append("aspect_sentiment_pipe")
+    index = cfg["aspect_index"]
+    sentiment.CACHE.clear()
+
+    timings = {stage: [] for stage in STAGES}
+    clock = time.perf_counter
+    for text in texts:
+        start = clock()
+        doc = nlp(text, disable=disable)
+        timings["parse"].append(clock() - start)
+
+        start = clock()
+        components.set_doc_aspect_matches(doc, index, cfg["phrase_matcher"])
+        timings["set_doc_aspect_matches"].append(clock() - start)
+
+        start = clock()
+        components.set_token_parent_span(doc)
+        timings["set_token_parent_span"].append(clock() - start)
+
+        start = clock()
+        components.set_span_sentiment(doc)
+        timings["set_span_sentiment"].append(clock() - start)
+
+        start = clock()
+        components.set_doc_aspect_sentiments(doc, index.aspects)
+        timings["set_doc_aspect_sentiments"].append(clock() - start)
+
+    return {stage: percentiles(values) for stage, values in timings.items()}
+
+
+def time_throughput(texts: list[str], aspects: dict, model: str | None) -> float:
+    """Returns the docs/sec of make_docs() over texts."""
+    sentiment.CACHE.clear()
+    start = time.perf_counter()
+    for _ in asp.make_docs(texts, aspects=aspects, model=model):
+        pass
+    return len(texts) / (time.perf_counter() - start)
+
+
+def trace_memory(texts: list[str], aspects: dict, model: str | None) -> float:
+    """Returns the peak traced memory in MB while running make_docs()."""
+    sentiment.CACHE.clear()
+    tracemalloc.start()
+    for _ in asp.make_docs(texts, aspects=aspects, model=model):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def make_taxonomy(n_aspects: int, n_keywords: int, base: dict) -> dict:
+    """Builds a taxonomy of n_aspects, padding the base aspects with synthetic ones."""
+    aspects = {aspect: list(kws) for aspect, kws in base.items()}
+    for a in range(len(aspects), n_aspects):
+        aspects[f"aspect{a}"] = [f"keyword{a}x{k}" for k in range(n_keywords)]
+    return dict(list(aspects.items())[:n_aspects])
+
+
+def time_taxonomy_scaling(texts: list[str], model: str | None) -> dict:
+    """Times the component stages per Doc for taxonomies of increasing size."""
+    nlp = asp.get_nlp(model)
+    base = utils.get_default_aspects()
+    results = {}
+    for n_aspects, n_keywords in TAXONOMY_SIZES:
+        aspects = make_taxonomy(n_aspects, n_keywords, base)
+        cfg, disable = asp.get_pipe_config(aspects, nlp=nlp)
+        disable.append("aspect_sentiment_pipe")
+        docs = list(nlp.pipe(texts, disable=disable))
+
+        sentiment.CACHE.clear()
+        start = time.perf_counter()
+        asp.aspect_sentiment_batch(docs, **cfg)
+        elapsed = time.perf_counter() - start
+
+        n_total = len(utils.get_keywords_from_aspects(aspects))
+        results[f"{n_aspects}x{n_keywords}"] = {
+            "aspects": len(aspects),
+            "keywords": n_total,
+            "index_size": len(taxonomy.compile_aspects(aspects)),
+            "us_per_doc": elapsed / len(docs) * 1e6,
+        }
+    return results
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Runs the full suite and returns its results."""
+    aspects = utils.get_default_aspects()
+    nlp = asp.get_nlp(args.model)
+    # Warm up, so that loading VADER is not counted in the first scenario
+    list(asp.make_docs(corpus.generate_corpus(10), aspects=aspects, model=args.model))
+
+    scenarios = {}
+    for length in args.lengths:
+        for density in args.densities:
+            texts = corpus.generate_corpus(args.docs, length, density, aspects)
+            n_tokens = sum(len(doc) for doc in nlp.tokenizer.pipe(texts))
+            scenarios[f"{length}/{density}"] = {
+                "length": length,
+                "density": density,
+                "mean_tokens": n_tokens / len(texts),
+                "docs_per_sec": time_throughput(texts, aspects, args.model),
+                "stages": time_stages(texts, aspects, args.model),
+                "tracemalloc_peak_mb": trace_memory(texts, aspects, args.model),
+            }
+
+    scaling_texts = corpus.generate_corpus(args.docs, "medium", 0.5, aspects)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "spacy": spacy.__version__,
+            "model": asp.get_model_name(args.model),
+            "docs": args.docs,
+        },
+        "scenarios": scenarios,
+        "taxonomy_scaling": time_taxonomy_scaling(scaling_texts, args.model),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Prints the ratio of each result to the baseline (>1 is faster)."""
+    print(f"{'scenario':<16} {'metric':<32} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, scenario in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        rows = [("docs/sec", base["docs_per_sec"], scenario["docs_per_sec"], False)]
+        for stage, timing in scenario["stages"].items():
+            base_timing = base["stages"].get(stage)
+            if base_timing is not None:
+                rows.append(
+                    (f"{stage} p50 us", base_timing["p50_us"], timing["p50_us"], True)
+                )
+        for metric, old, new, lower_is_better in rows:
+            ratio = old / new if lower_is_better else new / old
+            print(f"{name:<16} {metric:<32} {old:>10.1f} {new:>10.1f} {ratio:>7.2f}")
+
+
+def report(results: dict) -> None:
+    """Prints a summary of the results."""
+    print(f"{'scenario':<16} {'tokens':>7} {'docs/sec':>9} {'trace MB':>9}  stage p50/p95 us")
+    for name, scenario in results["scenarios"].items():
+        stages = ", ".join(
+            f"{stage.removeprefix('set_')} {t['p50_us']:.0f}/{t['p95_us']:.0f}"
+            for stage, t in scenario["stages"].items()
+        )
+        print(
+            f"{name:<16} {scenario['mean_tokens']:>7.1f} "
+            f"{scenario['docs_per_sec']:>9.1f} "
+            f"{scenario['tracemalloc_peak_mb']:>9.1f}  {stages}"
+        )
+    print()
+    print(f"{'taxonomy':<10} {'keywords':>9} {'us/doc':>9}")
+    for name, scaling in results["taxonomy_scaling"].items():
+        print(f"{name:<10} {scaling['keywords']:>9} {scaling['us_per_doc']:>9.1f}")
+    print()
+    print(f"peak RSS: {results['peak_rss_mb']:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--lengths", nargs="+", choices=LENGTHS, default=LENGTHS)
+    parser.add_argument("--densities", nargs="+", type=float, default=DENSITIES)
+    parser.add_argument("--output", default=None, help="Path to write JSON results")
+    parser.add_argument("--compare", default=None, help="JSON results to compare to")
+    args = parser.parse_args()
+
+    results = run(args)
+    report(results)
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        print()
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark of pipeline profiles and model sizes against the lg baseline.
+
+Each model and profile combination is run in a fresh interpreter, reporting
+docs/sec through make_docs(), peak RSS after loading and processing, and the
+agreement of its aspect sentiments with those of en_core_web_lg loaded in
+full. Agreement is reported as the fraction of texts with the same set of
+aspects mentioned, and the mean absolute difference of aspect sentiments where
+both runs mention the aspect.
+
+Texts are read from a file with one text per line, or generated by
+benchmarks.corpus if no file is passed. Models which are not installed are
+skipped.
+
+Usage:
+    python -m benchmarks.bench_profiles [--texts FILE] [--docs N]
+        [--models en_core_web_sm en_core_web_md en_core_web_lg]
+        [--profiles full absa absa+anonymize]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from benchmarks import corpus
+
+BASELINE = ("en_core_web_lg", "full")
+
+WORKER = """
+import json, resource, sys, time
+from la_nlp.pipes import aspect_sentiment as asp
+
+model, profile, anonymize = {model!r}, {profile!r}, {anonymize!r}
+texts = json.load(sys.stdin)
+asp.get_nlp(model, profile)
+start = time.perf_counter()
+docs = asp.make_docs(texts, anonymize=anonymize, model=model, profile=profile)
+sentiments = [doc._.aspect_sentiments for doc in docs]
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "docs_per_sec": len(texts) / elapsed,
+    "rss_mb": rss_kb / 1024,
+    "sentiments": sentiments,
+}}))
+"""
+
+
+def run(model: str, profile: str, texts: list[str]) -> dict | None:
+    """Processes texts in a fresh interpreter, or returns None on failure."""
+    code = WORKER.format(
+        model=model,
+        profile=None if profile == "full" else profile,
+        anonymize=profile in ("full", "absa+anonymize"),
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", code],
+        input=json.dumps(texts),
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        return None
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def agreement(results: list[dict], baseline: list[dict]) -> tuple[float, float]:
+    """Returns the aspect set agreement and mean absolute sentiment difference."""
+    same_aspects = 0
+    differences = []
+    for result, target in zip(results, baseline):
+        mentioned = {aspect for aspect, score in result.items() if score is not None}
+        target_mentioned = {
+            aspect for aspect, score in target.items() if score is not None
+        }
+        same_aspects += mentioned == target_mentioned
+        for aspect in mentioned & target_mentioned:
+            differences.append(abs(result[aspect] - target[aspect]))
+    mean_difference = sum(differences) / len(differences) if differences else 0.0
+    return same_aspects / len(results), mean_difference
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", default=None, help="File with one text per line")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=["en_core_web_sm", "en_core_web_md", "en_core_web_lg"],
+    )
+    parser.add_argument(
+        "--profiles", nargs="+", default=["full", "absa", "absa+anonymize"]
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if args.texts is not None:
+        with open(args.texts, encoding="utf-8") as file:
+            texts = [line.strip() for line in file if line.strip()][: args.docs]
+    else:
+        texts = corpus.generate_corpus(args.docs)
+
+    baseline = run(*BASELINE, texts)
+    results = {}
+    for model in args.models:
+        for profile in args.profiles:
+            if (model, profile) == BASELINE and baseline is not None:
+                result = baseline
+            else:
+                result = run(model, profile, texts)
+            if result is None:
+                continue
+            same, difference = (None, None)
+            if baseline is not None:
+                same, difference = agreement(
+                    result["sentiments"], baseline["sentiments"]
+                )
+            results[f"{model} {profile}"] = {
+                "docs_per_sec": result["docs_per_sec"],
+                "rss_mb": result["rss_mb"],
+                "same_aspects": same,
+                "mean_abs_diff": difference,
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(
+        f"{'':<32} {'docs/sec':>9} {'peak RSS MB':>12} "
+        f"{'same aspects':>13} {'mean |diff|':>12}"
+    )
+    for name, result in results.items():
+        same = result["same_aspects"]
+        difference = result["mean_abs_diff"]
+        print(
+            f"{name:<32} {result['docs_per_sec']:>9.1f} {result['rss_mb']:>12.1f} "
+            f"{'-' if same is None else f'{same:.3f}':>13} "
+            f"{'-' if difference is None else f'{difference:.4f}':>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
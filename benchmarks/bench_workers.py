@@ -0,0 +1,194 @@
+"""Benchmark of the memory used by each make_docs() worker process.
+
+Each start method is run in a fresh interpreter, with the model's vectors
+shared with the workers (see la_nlp.sharing) and without. While the texts are
+processed, the RSS and PSS of the parent and of each descendant process are
+sampled from /proc, and their peaks reported. PSS divides each shared page
+between the processes mapping it, so the PSS of a worker is its share of the
+memory actually used, and the sum over all processes is the total memory used.
+Descendants include multiprocessing's helper processes (the resource tracker,
+and the fork server itself), which are counted as workers.
+
+Only runs on Linux, where /proc/<pid>/smaps_rollup is available. Texts are
+read from a file with one text per line, or generated by benchmarks.corpus if
+no file is passed.
+
+Usage:
+    python -m benchmarks.bench_workers [--texts FILE] [--docs N]
+        [--n-process N] [--start-methods fork spawn forkserver] [--model NAME]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from benchmarks import corpus
+
+WORKER = """
+import json, multiprocessing, os, sys, threading, time
+multiprocessing.set_start_method({start_method!r})
+from la_nlp import sharing
+from la_nlp.pipes import aspect_sentiment as asp
+
+if not {shared!r}:
+    sharing.disable()
+
+
+def read_memory(pid):
+    memory = {{}}
+    with open(f"/proc/{{pid}}/smaps_rollup") as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                memory[name.lower() + "_mb"] = int(value.split()[0]) / 1024
+    return memory
+
+
+def get_descendants(pid):
+    parents = {{}}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{{entry}}/stat") as file:
+                    stat = file.read()
+            except OSError:
+                continue
+            parents[int(entry)] = int(stat.rpartition(")")[2].split()[1])
+    descendants = []
+    for child in parents:
+        ancestor = parents[child]
+        while ancestor in parents and ancestor != pid:
+            ancestor = parents[ancestor]
+        if ancestor == pid:
+            descendants.append(child)
+    return descendants
+
+
+peaks = {{}}
+done = threading.Event()
+
+
+def sample():
+    parent = os.getpid()
+    while not done.is_set():
+        for pid in [parent, *get_descendants(parent)]:
+            try:
+                memory = read_memory(pid)
+            except OSError:
+                continue
+            peak = peaks.setdefault(pid, memory)
+            for name, value in memory.items():
+                peak[name] = max(peak.get(name, 0), value)
+        time.sleep(0.05)
+
+
+texts = json.load(sys.stdin)
+asp.get_nlp({model!r})
+sampler = threading.Thread(target=sample, daemon=True)
+sampler.start()
+start = time.perf_counter()
+docs = asp.make_docs(texts, model={model!r}, n_process={n_process!r})
+n_docs = sum(1 for _ in docs)
+elapsed = time.perf_counter() - start
+done.set()
+sampler.join()
+
+parent = peaks.pop(os.getpid())
+workers = list(peaks.values())
+print(json.dumps({{
+    "docs_per_sec": n_docs / elapsed,
+    "parent": parent,
+    "workers": workers,
+}}))
+"""
+
+
+def run(
+    start_method: str,
+    shared: bool,
+    texts: list[str],
+    n_process: int,
+    model: str | None,
+) -> dict | None:
+    """Processes texts in a fresh interpreter, or returns None on failure."""
+    code = WORKER.format(
+        start_method=start_method,
+        shared=shared,
+        model=model,
+        n_process=n_process,
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", code],
+        input=json.dumps(texts),
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        print(process.stderr, file=sys.stderr)
+        return None
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def summarize(result: dict) -> dict:
+    """Gets the mean peak RSS and PSS per worker, and the total PSS."""
+    workers = result["workers"]
+    n_workers = len(workers) or 1
+    rss = sum(worker.get("rss_mb", 0) for worker in workers) / n_workers
+    pss = sum(worker.get("pss_mb", 0) for worker in workers) / n_workers
+    total_pss = result["parent"].get("pss_mb", 0) + pss * len(workers)
+    return {
+        "docs_per_sec": result["docs_per_sec"],
+        "workers": len(workers),
+        "parent_rss_mb": result["parent"].get("rss_mb", 0),
+        "worker_rss_mb": rss,
+        "worker_pss_mb": pss,
+        "total_pss_mb": total_pss,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", default=None, help="File with one text per line")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--n-process", type=int, default=4)
+    parser.add_argument(
+        "--start-methods", nargs="+", default=["fork", "spawn", "forkserver"]
+    )
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if args.texts is not None:
+        with open(args.texts, encoding="utf-8") as file:
+            texts = [line.strip() for line in file if line.strip()][: args.docs]
+    else:
+        texts = corpus.generate_corpus(args.docs)
+
+    results = {}
+    for start_method in args.start_methods:
+        for shared in (False, True):
+            result = run(start_method, shared, texts, args.n_process, args.model)
+            if result is None:
+                continue
+            name = f"{start_method} {'shared' if shared else 'copied'}"
+            results[name] = summarize(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(
+        f"{'':<20} {'docs/sec':>9} {'workers':>8} {'parent RSS':>11} "
+        f"{'worker RSS':>11} {'worker PSS':>11} {'total PSS':>10}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<20} {result['docs_per_sec']:>9.1f} {result['workers']:>8} "
+            f"{result['parent_rss_mb']:>11.1f} {result['worker_rss_mb']:>11.1f} "
+            f"{result['worker_pss_mb']:>11.1f} {result['total_pss_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Synthetic course evaluation corpus for the benchmarks.
+
+Comments are built from sentence templates whose subjects are either keywords
+from an aspect taxonomy or filler nouns, so the number of keywords per comment
+can be controlled. Generation is seeded, so the same arguments always give the
+same corpus.
+
+Usage:
+    python -m benchmarks.corpus [--docs N] [--length short|medium|essay]
+        [--density D] > corpus.txt
+"""
+
+import argparse
+import random
+
+from la_nlp import utils
+
+# Range of sentences per comment for each length
+LENGTHS = {
+    "short": (1, 2),
+    "medium": (4, 8),
+    "essay": (20, 40),
+}
+
+FILLER_NOUNS = [
+    "weather",
+    "building",
+    "semester",
+    "schedule",
+    "campus",
+    "experience",
+    "room",
+    "time",
+]
+
+TEMPLATES = [
+    "The {noun} was {adj}.",
+    "I thought the {noun} was {adv} {adj}, but I {verb} it overall.",
+    "Honestly, the {noun} felt {adj} and I wish it had been {adj2}.",
+    "Professor Smith made the {noun} {adj}, which I {verb}.",
+    "Although the {noun} was {adj}, the pace of the term was {adj2}.",
+    "I {verb} how {adj} the {noun} was this year.",
+]
+
+ADJECTIVES = [
+    "great",
+    "boring",
+    "confusing",
+    "excellent",
+    "fine",
+    "awful",
+    "useful",
+    "unclear",
+    "fair",
+    "rushed",
+    "helpful",
+    "engaging",
+]
+ADVERBS = ["really", "quite", "very", "somewhat", "surprisingly"]
+VERBS = ["enjoyed", "hated", "liked", "appreciated", "disliked", "tolerated"]
+
+
+def generate_sentence(rng: random.Random, keywords: list, density: float) -> str:
+    """Generates a sentence whose subject is a keyword with probability density."""
+    noun = rng.choice(keywords if rng.random() < density else FILLER_NOUNS)
+    return rng.choice(TEMPLATES).format(
+        noun=noun,
+        adj=rng.choice(ADJECTIVES),
+        adj2=rng.choice(ADJECTIVES),
+        adv=rng.choice(ADVERBS),
+        verb=rng.choice(VERBS),
+    )
+
+
+def generate_corpus(
+    n: int,
+    length: str = "medium",
+    density: float = 0.5,
+    aspects: dict | None = None,
+    seed: int = 0,
+) -> list[str]:
+    """Generates n synthetic course evaluation comments.
+
+    Args:
+        n (int): Number of comments.
+        length (str, optional): One of 'short', 'medium' or 'essay'. Defaults
+            to 'medium'.
+        density (float, optional): Fraction of sentences mentioning a keyword.
+            Defaults to 0.5.
+        aspects (dict | None, optional): Taxonomy to draw keywords from.
+            Defaults to the default aspects.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        list[str]: The comments.
+    """
+    if aspects is None:
+        aspects = utils.get_default_aspects()
+    keywords = utils.get_keywords_from_aspects(aspects)
+    low, high = LENGTHS[length]
+    rng = random.Random(seed)
+    return [
+        " ".join(
+            generate_sentence(rng, keywords, density)
+            for _ in range(rng.randint(low, high))
+        )
+        for _ in range(n)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--length", choices=list(LENGTHS), default="medium")
+    parser.add_argument("--density", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for text in generate_corpus(args.docs, args.length, args.density, seed=args.seed):
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
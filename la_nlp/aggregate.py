@@ -0,0 +1,307 @@
+"""Streaming, grouped aggregation of aspect sentiments across a corpus.
+
+Aspect sentiments are computed per text, but are usually reported per course,
+section or term. This module contains the Aggregator class, which consumes
+pipeline output one text at a time along with a group key, and keeps running
+statistics for each (group, aspect) pair: the number of texts mentioning the
+aspect, the mean, variance, minimum and maximum of their sentiments, and a
+histogram of sentiments over fixed bins. Memory use is proportional to the
+number of groups and aspects, not the number of texts.
+
+Aggregators built separately, e.g. by worker processes over shards of a
+corpus, can be merged with Aggregator.merge(). Counts and histograms merge
+exactly, and means and variances are combined with Chan et al.'s parallel
+algorithm, matching a single pass up to floating point rounding.
+
+Usage:
+    from la_nlp import aggregate
+
+    aggregator = aggregate.Aggregator()
+    for result, row in zip(make_results(texts), rows):
+        aggregator.add(result, (row["course"], row["term"]))
+
+    for record in aggregator.to_records():
+        print(record)
+"""
+
+import math
+from typing import Any, Hashable, Iterable, Iterator
+
+from la_nlp import results
+
+from spacy.tokens import Doc
+
+# Default number of histogram bins, and range of sentiments they cover
+DEFAULT_BINS = 10
+DEFAULT_RANGE = (-1.0, 1.0)
+
+
+class AspectStats:
+    """Running statistics of the sentiments of one aspect in one group.
+
+    Means and variances are updated with Welford's algorithm, which is
+    numerically stable over very many values.
+
+    Attributes:
+        count (int): Number of sentiments added.
+        mean (float): Mean of the sentiments added.
+        m2 (float): Sum of squared differences from the mean.
+        min (float): Smallest sentiment added.
+        max (float): Largest sentiment added.
+        histogram (list[int]): Number of sentiments in each bin.
+    """
+
+    __slots__ = ("count", "mean", "m2", "min", "max", "histogram")
+
+    def __init__(self, bins: int = DEFAULT_BINS):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.histogram = [0] * bins
+
+    def __repr__(self) -> str:
+        return f"AspectStats(count={self.count}, mean={self.mean!r})"
+
+    @property
+    def variance(self) -> float | None:
+        """float | None: Sample variance, or None if fewer than two values."""
+        if self.count < 2:
+            return None
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self) -> float | None:
+        """float | None: Sample standard deviation, or None if fewer than two."""
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    def add(self, value: float, bin: int) -> None:
+        """Adds a sentiment.
+
+        Args:
+            value (float): The sentiment.
+            bin (int): Index of the histogram bin the sentiment falls in.
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.histogram[bin] += 1
+
+    def merge(self, other: "AspectStats") -> None:
+        """Adds the sentiments summarized by other to these statistics.
+
+        Args:
+            other (AspectStats): Statistics with the same number of bins.
+        """
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+
+class Aggregator:
+    """Streaming aggregator of aspect sentiments, grouped by arbitrary keys.
+
+    Attributes:
+        bins (int): Number of histogram bins.
+        range (tuple[float, float]): Lowest and highest sentiments covered by
+            the histogram. Sentiments outside the range are counted in the
+            first or last bin.
+        stats (dict): AspectStats keyed by (group, aspect).
+        docs (dict): Number of texts added to each group, including texts not
+            mentioning any aspects.
+    """
+
+    def __init__(
+        self,
+        bins: int = DEFAULT_BINS,
+        range: tuple[float, float] = DEFAULT_RANGE,
+    ):
+        """Creates an empty aggregator.
+
+        Args:
+            bins (int, optional): Number of histogram bins. Defaults to
+                DEFAULT_BINS.
+            range (tuple[float, float], optional): Lowest and highest
+                sentiments covered by the histogram. Defaults to (-1.0, 1.0),
+                the range of VADER compound scores.
+
+        Raises:
+            ValueError: Raised if bins is less than 1 or the range is empty.
+        """
+        if bins < 1:
+            raise ValueError("bins must be at least 1")
+        if not range[0] < range[1]:
+            raise ValueError("range must be a (low, high) tuple with low < high")
+        self.bins = bins
+        self.range = tuple(range)
+        self.stats = {}
+        self.docs = {}
+        self._bin_width = (range[1] - range[0]) / bins
+
+    def __len__(self) -> int:
+        return len(self.stats)
+
+    def get_bin(self, value: float) -> int:
+        """Gets the index of the histogram bin a sentiment falls in.
+
+        Args:
+            value (float): The sentiment.
+
+        Returns:
+            int: Index of the bin, clamped to the first and last bins.
+        """
+        bin = int((value - self.range[0]) // self._bin_width)
+        return min(max(bin, 0), self.bins - 1)
+
+    def get_bin_edges(self) -> list[float]:
+        """Gets the edges of the histogram bins.
+
+        Returns:
+            list[float]: The bins + 1 edges, from range[0] to range[1].
+        """
+        low = self.range[0]
+        return [low + i * self._bin_width for i in range(self.bins)] + [self.range[1]]
+
+    def add(
+        self,
+        item: results.AspectSentimentResult | Doc | dict,
+        group: Hashable = None,
+    ) -> None:
+        """Adds the aspect sentiments of a text to its group.
+
+        Args:
+            item (results.AspectSentimentResult | Doc | dict): The result or
+                Doc of the text, or its dictionary of aspect sentiments.
+            group (Hashable, optional): Key of the text's group, e.g. a
+                (course, section, term) tuple. Defaults to None.
+        """
+        if isinstance(item, results.AspectSentimentResult):
+            aspect_sentiments = zip(item.aspect_names, item.sentiments)
+        elif isinstance(item, Doc):
+            aspect_sentiments = (item._.aspect_sentiments or {}).items()
+        else:
+            aspect_sentiments = item.items()
+
+        self.docs[group] = self.docs.get(group, 0) + 1
+        for aspect, score in aspect_sentiments:
+            if score is None or math.isnan(score):
+                continue
+            key = (group, aspect)
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = AspectStats(self.bins)
+            stats.add(score, self.get_bin(score))
+
+    def add_many(
+        self,
+        items: Iterable[results.AspectSentimentResult | Doc | dict],
+        groups: Iterable[Hashable],
+    ) -> "Aggregator":
+        """Adds the aspect sentiments of many texts.
+
+        Args:
+            items (Iterable[results.AspectSentimentResult | Doc | dict]): The
+                results or Docs of the texts. Consumed one at a time.
+            groups (Iterable[Hashable]): Key of each text's group.
+
+        Returns:
+            Aggregator: This aggregator.
+        """
+        for item, group in zip(items, groups):
+            self.add(item, group)
+        return self
+
+    def merge(self, other: "Aggregator") -> "Aggregator":
+        """Adds the statistics of another aggregator, e.g. from another worker.
+
+        Args:
+            other (Aggregator): Aggregator with the same bins and range.
+
+        Raises:
+            ValueError: Raised if the aggregators' bins or ranges differ.
+
+        Returns:
+            Aggregator: This aggregator.
+        """
+        if other.bins != self.bins or other.range != self.range:
+            raise ValueError("Aggregators with different histogram bins cannot merge")
+        for group, n_docs in other.docs.items():
+            self.docs[group] = self.docs.get(group, 0) + n_docs
+        for key, other_stats in other.stats.items():
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = AspectStats(self.bins)
+            stats.merge(other_stats)
+        return self
+
+    def get(self, group: Hashable, aspect: str) -> AspectStats | None:
+        """Gets the statistics of an aspect in a group.
+
+        Args:
+            group (Hashable): Key of the group.
+            aspect (str): Name of the aspect.
+
+        Returns:
+            AspectStats | None: The statistics, or None if no text in the group
+                mentioned the aspect.
+        """
+        return self.stats.get((group, aspect))
+
+    def to_records(self) -> Iterator[dict[str, Any]]:
+        """Generates one flat record per (group, aspect) pair.
+
+        Returns:
+            Iterator[dict[str, Any]]: Dictionaries of 'group', 'aspect', 'docs'
+                (texts in the group), 'count' (texts mentioning the aspect),
+                'mean', 'variance', 'std', 'min', 'max' and 'histogram'.
+        """
+        for (group, aspect), stats in self.stats.items():
+            yield {
+                "group": group,
+                "aspect": aspect,
+                "docs": self.docs.get(group, 0),
+                "count": stats.count,
+                "mean": stats.mean,
+                "variance": stats.variance,
+                "std": stats.std,
+                "min": stats.min,
+                "max": stats.max,
+                "histogram": list(stats.histogram),
+            }
+
+
+def merge(aggregators: Iterable[Aggregator]) -> Aggregator:
+    """Merges aggregators, e.g. built by separate workers, into a new one.
+
+    Args:
+        aggregators (Iterable[Aggregator]): Aggregators with the same bins and
+            range. Not modified.
+
+    Raises:
+        ValueError: Raised if no aggregators are passed, or their bins or
+            ranges differ.
+
+    Returns:
+        Aggregator: A new aggregator holding the statistics of all of them.
+    """
+    aggregators = list(aggregators)
+    if not aggregators:
+        raise ValueError("At least one aggregator is required")
+    merged = Aggregator(aggregators[0].bins, aggregators[0].range)
+    for aggregator in aggregators:
+        merged.merge(aggregator)
+    return merged
@@ -0,0 +1,179 @@
+"""Dynamic micro-batching of concurrent asyncio requests.
+
+This module contains the MicroBatcher class, which lets async code submit
+texts one at a time while processing them in batches. Requests made while a
+batch is being collected or processed are queued, then coalesced into the
+next batch once it reaches max_batch_size or its oldest request has waited
+max_wait seconds. Batches are processed one at a time in an executor, so the
+event loop is never blocked.
+
+Under light load, each request is processed after waiting at most max_wait.
+Under heavy load, requests queue up while the previous batch is processed and
+are processed together, so throughput rises with the batch size.
+
+See amake_doc() in la_nlp.pipes.aspect_sentiment for the main entry point.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable
+
+# Default maximum number of texts per batch
+DEFAULT_MAX_BATCH_SIZE = 32
+
+# Default maximum time, in seconds, a request waits for its batch to fill
+DEFAULT_MAX_WAIT = 0.005
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into batches processed off the event loop.
+
+    Each request is a text along with a dictionary of options. Requests in a
+    batch are grouped by equal options, and each group is passed to process()
+    as a single call. A batcher is bound to the event loop it is first used
+    in, and is restarted automatically if used from a new event loop.
+
+    Attributes:
+        process (Callable[[list[str], dict], list]): Function processing a
+            list of texts with a dictionary of options, returning one result
+            per text. Called in the executor.
+        max_batch_size (int): Maximum number of texts per batch.
+        max_wait (float): Maximum time in seconds a request waits for more
+            requests to join its batch.
+        executor (Executor | None): Executor to process batches in, or None
+            for the event loop's default executor.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[list[str], dict], list],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait: float = DEFAULT_MAX_WAIT,
+        executor: Executor | None = None,
+    ):
+        """Creates the batcher. No tasks are started until the first request.
+
+        Args:
+            process (Callable[[list[str], dict], list]): Function processing a
+                batch of texts with a dictionary of options.
+            max_batch_size (int, optional): Maximum number of texts per batch.
+                Defaults to DEFAULT_MAX_BATCH_SIZE.
+            max_wait (float, optional): Maximum time in seconds a request waits
+                for its batch to fill. Defaults to DEFAULT_MAX_WAIT.
+            executor (Executor | None, optional): Executor to process batches
+                in. Defaults to None, i.e. the event loop's default executor.
+        """
+        self.process = process
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait
+        self.executor = executor
+        self._loop = None
+        self._queue = None
+        self._task = None
+
+    def _start(self) -> asyncio.Queue:
+        """Starts the batching task in the running event loop, if not running."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def submit(self, text: str, **options) -> Any:
+        """Submits a text for processing and waits for its result.
+
+        Args:
+            text (str): The text to process.
+            **options: Options passed to process() along with the text.
+
+        Raises:
+            Exception: Any exception raised by process() for the text's batch.
+            ValueError: Raised if process() did not return one result per text
+                of the batch.
+
+        Returns:
+            Any: The result of process() for the text.
+        """
+        queue = self._start()
+        future = self._loop.create_future()
+        queue.put_nowait((text, options, future))
+        return await future
+
+    async def close(self) -> None:
+        """Stops the batching task. Queued requests are cancelled."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            future.cancel()
+
+    @staticmethod
+    def _fail(futures: list[asyncio.Future], exception: Exception) -> None:
+        """Sets an exception on every future of a group not yet done."""
+        for future in futures:
+            if not future.done():
+                future.set_exception(exception)
+
+    async def _collect(self, queue: asyncio.Queue) -> list[tuple]:
+        """Waits for a request, then collects more until the batch is full."""
+        batch = [await queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Requests which queued while the batch was waiting join it for free
+        while len(batch) < self.max_batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        """Collects and processes batches until cancelled."""
+        while True:
+            batch = await self._collect(queue)
+
+            # Group requests by options, as each call to process() takes one set
+            groups = []
+            for text, options, future in batch:
+                if future.done():
+                    continue
+                for group_options, texts, futures in groups:
+                    if group_options == options:
+                        texts.append(text)
+                        futures.append(future)
+                        break
+                else:
+                    groups.append((options, [text], [future]))
+
+            for options, texts, futures in groups:
+                try:
+                    results = await self._loop.run_in_executor(
+                        self.executor, self.process, texts, options
+                    )
+                except Exception as e:
+                    self._fail(futures, e)
+                    continue
+                results = list(results)
+                # Results cannot be matched to texts if any are missing or extra
+                if len(results) != len(texts):
+                    self._fail(
+                        futures,
+                        ValueError(
+                            f"process() returned {len(results)} results for "
+                            f"{len(texts)} texts"
+                        ),
+                    )
+                    continue
+                for future, result in zip(futures, results):
+                    if not future.done():
+                        future.set_result(result)
@@ -0,0 +1,828 @@
+"""Persistent caches of parsed Docs and of pipeline results.
+
+This module contains the ParseCache class, which stores the output of a spacy
+pipeline on disk as sharded DocBin files, keyed by a hash of the text along
+with the name, version and enabled components of the pipeline. Re-running the
+aspect sentiment pipeline over the same texts (e.g. while tuning a taxonomy)
+can then load the parsed Docs from the cache and run only the aspect sentiment
+components, skipping the parse entirely.
+
+Docs are stored as they were before any aspect sentiment components ran, so
+the cache stays valid whatever aspects or options are used. See
+make_docs() in la_nlp.pipes.aspect_sentiment for the main entry point.
+
+This module also contains the ResultCache class, an in-memory LRU cache of
+AspectSentimentResults with an optional SQLite tier on disk, keyed by text
+along with the aspects and options used. Exact duplicate texts, which are
+common in course evaluations ("N/A", "Great prof!"), are then processed only
+once. See make_results() in la_nlp.pipes.aspect_sentiment.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Any, Callable, Iterable, Iterator
+
+from la_nlp import results, taxonomy
+
+import numpy
+from spacy.language import Language
+from spacy.tokens import Doc, DocBin
+from spacy.vocab import Vocab
+
+# Default number of Docs written to each shard
+DEFAULT_SHARD_SIZE = 1000
+
+# Number of loaded shards kept in memory
+LOADED_SHARDS = 2
+
+SHARD_EXTENSION = ".spacy"
+KEYS_EXTENSION = ".keys"
+
+# Components which are never cached, as they run after the cache is read
+UNCACHED_COMPONENTS = ("aspect_sentiment_pipe",)
+
+# Default maximum number of results kept in memory by a ResultCache
+DEFAULT_RESULT_CACHE_SIZE = 10_000
+
+# Options of the 'aspect_sentiment_pipe' config which affect its results
+RESULT_CONFIG_KEYS = (
+    "parent_span_min_length",
+    "anonymize",
+    "anonymize_labels",
+    "anonymize_strategy",
+    "analyze_aspects",
+    "vector_matcher",
+)
+
+
+def get_model_key(nlp: Language, disable: Iterable[str] = ()) -> str:
+    """Gets a string identifying the output of a spacy pipeline.
+
+    Args:
+        nlp (Language): The spacy pipeline.
+        disable (Iterable[str], optional): Names of the pipeline's components
+            which are disabled. Defaults to ().
+
+    Returns:
+        str: Key made up of the pipeline's language, name and version and the
+            names of its enabled components.
+    """
+    disable = set(disable) | set(UNCACHED_COMPONENTS)
+    enabled = [name for name in nlp.pipe_names if name not in disable]
+    meta = nlp.meta
+    return (
+        f"{meta.get('lang')}_{meta.get('name')}-{meta.get('version')}:"
+        + ",".join(enabled)
+    )
+
+
+def get_text_key(text: str, model_key: str) -> str:
+    """Gets the cache key of a text parsed by a pipeline.
+
+    Args:
+        text (str): The text.
+        model_key (str): Key of the pipeline returned by get_model_key().
+
+    Returns:
+        str: Hex digest of the text and model key.
+    """
+    digest = hashlib.blake2b(model_key.encode("utf-8"), digest_size=16)
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_config_key(nlp: Language, cfg: dict, disable: Iterable[str] = ()) -> str:
+    """Gets a string identifying the results of a pipeline run.
+
+    Args:
+        nlp (Language): The spacy pipeline.
+        cfg (dict): The 'aspect_sentiment_pipe' config returned by
+            get_pipe_config() in la_nlp.pipes.aspect_sentiment.
+        disable (Iterable[str], optional): Names of the pipeline's components
+            which are disabled. Defaults to ().
+
+    Returns:
+        str: Hex digest of the model key, the aspects and the options which
+            affect results. Functions and backends are identified by name.
+    """
+
+    def get_name(value: Any) -> str:
+        if callable(value) and not isinstance(value, type):
+            return f"{value.__module__}.{value.__qualname__}"
+        return repr(value)
+
+    backend = type(cfg["sentiment_backend"])
+    parts = [
+        get_model_key(nlp, disable),
+        repr(taxonomy.freeze_aspects(cfg["aspect_index"].aspects)),
+        f"{backend.__module__}.{backend.__qualname__}",
+    ]
+    parts.extend(get_name(cfg[name]) for name in RESULT_CONFIG_KEYS)
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def normalize_text(text: str) -> tuple[str, int]:
+    """Normalizes a text for lookup in a ResultCache.
+
+    Only whitespace around the text is removed, as any other change (e.g.
+    case) may change its parse or sentiment.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        tuple[str, int]: The normalized text and the offset of its start in
+            the original text.
+    """
+    stripped = text.lstrip()
+    return stripped.rstrip(), len(text) - len(stripped)
+
+
+class ParseCache:
+    """An on-disk cache of parsed Docs, stored as sharded DocBin files.
+
+    Each shard is a DocBin file (<name>.spacy) holding up to shard_size Docs,
+    alongside a text file (<name>.keys) listing the key of each Doc in order.
+    The keys of all shards are read into memory when the cache is opened, while
+    shards themselves are only loaded when one of their Docs is requested. The
+    most recently loaded shards are kept in memory, so reading Docs back in the
+    order they were written loads each shard once.
+
+    If max_size is set, the least recently used shards are deleted whenever
+    the total size of the shards exceeds it.
+
+    The cache is not safe for concurrent writes from several processes.
+
+    Attributes:
+        path (str): Directory containing the shards.
+        max_size (int | None): Maximum total size of the shards in bytes, or
+            None for no limit.
+        shard_size (int): Number of Docs written to each shard.
+        hits (int): Number of lookups which found a cached Doc.
+        misses (int): Number of lookups which did not.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int | None = None,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+    ):
+        """Opens the cache, creating its directory if it does not exist.
+
+        Args:
+            path (str): Directory containing the shards.
+            max_size (int | None, optional): Maximum total size of the shards
+                in bytes. Defaults to None, i.e. no limit.
+            shard_size (int, optional): Number of Docs written to each shard.
+                Defaults to DEFAULT_SHARD_SIZE.
+        """
+        self.path = os.fspath(path)
+        self.max_size = max_size
+        self.shard_size = max(shard_size, 1)
+        self.hits = 0
+        self.misses = 0
+
+        # Key -> (shard name, position) of every cached Doc
+        self._index = {}
+        # Shard name -> size in bytes, in order of least to most recently used
+        self._shards = OrderedDict()
+        # Shard name -> keys of the Docs in the shard
+        self._shard_keys = {}
+        # Shard name -> list of loaded Docs
+        self._loaded = OrderedDict()
+        # Key -> Doc of Docs added but not yet written to a shard
+        self._pending = {}
+
+        os.makedirs(self.path, exist_ok=True)
+        self._read_index()
+
+    def __len__(self) -> int:
+        return len(self._index) + len(self._pending)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index or key in self._pending
+
+    def __enter__(self) -> "ParseCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    def _shard_path(self, name: str, extension: str) -> str:
+        return os.path.join(self.path, name + extension)
+
+    def _read_index(self) -> None:
+        """Reads the keys of all shards in the cache directory."""
+        shards = []
+        for file_name in os.listdir(self.path):
+            name, extension = os.path.splitext(file_name)
+            keys_path = self._shard_path(name, KEYS_EXTENSION)
+            if extension != SHARD_EXTENSION or not os.path.isfile(keys_path):
+                continue
+            stat = os.stat(self._shard_path(name, SHARD_EXTENSION))
+            shards.append((stat.st_mtime, name, stat.st_size))
+
+        for _, name, size in sorted(shards):
+            with open(self._shard_path(name, KEYS_EXTENSION), encoding="utf-8") as f:
+                keys = f.read().split()
+            for position, key in enumerate(keys):
+                self._index[key] = (name, position)
+            self._shards[name] = size
+            self._shard_keys[name] = keys
+
+    def _load_shard(self, name: str, vocab: Vocab) -> list[Doc]:
+        """Gets the Docs in a shard, loading it if it is not already loaded."""
+        docs = self._loaded.get(name)
+        if docs is None:
+            doc_bin = DocBin().from_disk(self._shard_path(name, SHARD_EXTENSION))
+            docs = list(doc_bin.get_docs(vocab))
+            self._loaded[name] = docs
+            # Touched so that recency of use survives reopening the cache
+            os.utime(self._shard_path(name, SHARD_EXTENSION))
+            while len(self._loaded) > LOADED_SHARDS:
+                self._loaded.popitem(last=False)
+        else:
+            self._loaded.move_to_end(name)
+        self._shards.move_to_end(name)
+        return docs
+
+    def get(self, key: str, vocab: Vocab) -> Doc | None:
+        """Gets a cached Doc by key, counting the lookup as a hit or miss.
+
+        Args:
+            key (str): Key of the Doc returned by get_text_key().
+            vocab (Vocab): Vocab of the pipeline the Doc is for.
+
+        Returns:
+            Doc | None: A new copy of the cached Doc, or None if not cached.
+        """
+        doc = self._pending.get(key)
+        if doc is None:
+            location = self._index.get(key)
+            if location is None:
+                self.misses += 1
+                return None
+
+            name, position = location
+            try:
+                docs = self._load_shard(name, vocab)
+            except FileNotFoundError:
+                self._remove_shard(name)
+                self.misses += 1
+                return None
+            doc = docs[position]
+
+        self.hits += 1
+        if doc.vocab is not vocab:
+            return Doc(vocab).from_bytes(doc.to_bytes())
+        return doc.copy()
+
+    def put(self, key: str, doc: Doc) -> None:
+        """Adds a parsed Doc to the cache.
+
+        Docs are buffered and written to disk once shard_size Docs are pending,
+        or when flush() is called. Pending Docs are served by get() from the
+        buffer.
+
+        Args:
+            key (str): Key of the Doc returned by get_text_key().
+            doc (Doc): The parsed Doc. It is copied immediately, so the Doc may
+                be modified afterwards.
+        """
+        if key in self._pending:
+            return
+        # Kept as it would be loaded from a shard, without tensor or user data
+        pending = doc.copy()
+        pending.tensor = numpy.zeros((0,), dtype="float32")
+        pending.user_data.clear()
+        self._pending[key] = pending
+        if len(self._pending) >= self.shard_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes any pending Docs to a new shard, then evicts if necessary."""
+        if not self._pending:
+            return
+
+        name = f"{time.time_ns():x}-{os.getpid()}"
+        shard_path = self._shard_path(name, SHARD_EXTENSION)
+        DocBin(store_user_data=False, docs=self._pending.values()).to_disk(shard_path)
+        keys = list(self._pending)
+        with open(self._shard_path(name, KEYS_EXTENSION), "w", encoding="utf-8") as f:
+            f.write("\n".join(keys))
+
+        for position, key in enumerate(keys):
+            self._index[key] = (name, position)
+        self._shards[name] = os.path.getsize(shard_path)
+        self._shard_keys[name] = keys
+
+        self._pending = {}
+        self.evict()
+
+    def _remove_shard(self, name: str) -> None:
+        """Deletes a shard and removes its keys from the index."""
+        for extension in (SHARD_EXTENSION, KEYS_EXTENSION):
+            try:
+                os.remove(self._shard_path(name, extension))
+            except FileNotFoundError:
+                pass
+        self._shards.pop(name, None)
+        self._loaded.pop(name, None)
+        for key in self._shard_keys.pop(name, ()):
+            if self._index.get(key, (None,))[0] == name:
+                del self._index[key]
+
+    def evict(self) -> None:
+        """Deletes least recently used shards until the cache fits max_size."""
+        if self.max_size is None:
+            return
+        while self._shards and self.size > self.max_size:
+            self._remove_shard(next(iter(self._shards)))
+
+    def clear(self) -> None:
+        """Deletes all shards and resets the hit and miss counters."""
+        for name in list(self._shards):
+            self._remove_shard(name)
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self) -> int:
+        """int: Total size of the shards in bytes."""
+        return sum(self._shards.values())
+
+    def info(self) -> dict:
+        """Gets statistics about the cache.
+
+        Returns:
+            dict: Dictionary of 'hits', 'misses', 'hit_rate', 'docs', 'shards',
+                'size' and 'max_size'.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "docs": len(self),
+            "shards": len(self._shards),
+            "size": self.size,
+            "max_size": self.max_size,
+        }
+
+    def pipe(
+        self,
+        nlp: Language,
+        texts: Iterable[str] | Iterable[tuple[str, Any]],
+        as_tuples: bool = False,
+        batch_size: int = 1000,
+        n_process: int = 1,
+        disable: Iterable[str] = (),
+    ) -> Iterator[Doc] | Iterator[tuple[Doc, Any]]:
+        """Parses a stream of texts like Language.pipe(), using cached Docs.
+
+        Texts which are not cached are parsed by a single call to nlp.pipe(),
+        so worker processes are started once for the whole stream, and are
+        added to the cache. The call is made at the first miss, so cached
+        texts before it are yielded straight away, and no workers are started
+        if every text is cached. Cached texts are loaded from disk when their
+        turn to be yielded comes, so only their keys are held while earlier
+        texts are being parsed. Docs are yielded in input order. Pending Docs
+        are written to disk once the stream is exhausted.
+
+        Args:
+            nlp (Language): The spacy pipeline to parse with.
+            texts (Iterable[str] | Iterable[tuple[str, Any]]): The texts to
+                parse, or (text, context) tuples if as_tuples is True.
+            as_tuples (bool, optional): Whether texts are (text, context)
+                tuples. Defaults to False.
+            batch_size (int, optional): Number of texts per batch passed to
+                nlp.pipe(). Defaults to 1000.
+            n_process (int, optional): Number of processes to parse misses
+                with. Defaults to 1.
+            disable (Iterable[str], optional): Names of components to disable.
+                Defaults to ().
+
+        Returns:
+            Iterator[Doc] | Iterator[tuple[Doc, Any]]: Generator of parsed Docs,
+                or (Doc, context) tuples if as_tuples is True.
+        """
+        disable = list(disable)
+        model_key = get_model_key(nlp, disable)
+        items = iter(texts)
+        order = deque()
+        ready = {}
+        contexts = {}
+        # Position -> (key, text) of cached texts, loaded when released
+        cached = {}
+
+        def check(i: int, item: Any) -> tuple[str, tuple[int, str]] | None:
+            """Sets aside a cached text, or returns a missed text to parse."""
+            text, context = item if as_tuples == True else (item, None)
+            key = get_text_key(text, model_key)
+            order.append(i)
+            contexts[i] = context
+            if key in self:
+                cached[i] = (key, text)
+                ready[i] = None
+                return None
+            self.misses += 1
+            return (text, (i, key))
+
+        def misses(
+            position: int, first: tuple[str, tuple[int, str]]
+        ) -> Iterator[tuple[str, tuple[int, str]]]:
+            """Yields the texts to parse, setting aside cached texts."""
+            yield first
+            for i, item in enumerate(items, position + 1):
+                miss = check(i, item)
+                if miss is not None:
+                    yield miss
+
+        def release() -> Iterator:
+            """Yields ready Docs at the front of the stream, in order."""
+            while order and order[0] in ready:
+                i = order.popleft()
+                doc = ready.pop(i)
+                if doc is None:
+                    key, text = cached.pop(i)
+                    doc = self.get(key, nlp.vocab)
+                    if doc is None:
+                        # The Doc's shard was evicted since it was checked
+                        doc = nlp(text, disable=disable)
+                        self.put(key, doc)
+                context = contexts.pop(i)
+                yield (doc, context) if as_tuples == True else doc
+
+        # Cached texts are yielded straight away until the first miss
+        first = None
+        for i, item in enumerate(items):
+            first = check(i, item)
+            if first is not None:
+                break
+            yield from release()
+
+        if first is not None:
+            parsed = nlp.pipe(
+                misses(i, first),
+                as_tuples=True,
+                batch_size=batch_size,
+                n_process=n_process,
+                disable=disable,
+            )
+            for doc, (i, key) in parsed:
+                self.put(key, doc)
+                ready[i] = doc
+                yield from release()
+            yield from release()
+
+        self.flush()
+
+
+class ResultCache:
+    """A cache of AspectSentimentResults, in memory with an optional SQLite tier.
+
+    Results are keyed by the text, normalized by normalize_text(), and a
+    config key from get_config_key(), so that they are only reused with the
+    same model, aspects and options. The most recently used max_size results
+    are kept in memory. If path is set, all results are also stored in a
+    SQLite database at path, which is read on memory misses, so that results
+    are reused across runs.
+
+    Along with each result, the time taken to compute it is stored, so that
+    the cache can report the processing time saved by its hits.
+
+    The cache is not safe for concurrent use from several threads or
+    processes.
+
+    Attributes:
+        max_size (int): Maximum number of results kept in memory.
+        path (str | None): Path of the SQLite database, if any.
+        hits (int): Number of lookups which found a cached result.
+        misses (int): Number of lookups which did not.
+        seconds_saved (float): Processing time saved by hits, in seconds.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_RESULT_CACHE_SIZE,
+        path: str | None = None,
+    ):
+        """Creates the cache, opening or creating its database if path is set.
+
+        Args:
+            max_size (int, optional): Maximum number of results kept in
+                memory. Defaults to DEFAULT_RESULT_CACHE_SIZE.
+            path (str | None, optional): Path of a SQLite database to store
+                results in. Defaults to None, i.e. memory only.
+        """
+        self.max_size = max(max_size, 0)
+        self.path = None if path is None else os.fspath(path)
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+        # Key -> (result, seconds), in order of least to most recently used
+        self._entries = OrderedDict()
+        self._db = None
+        if self.path is not None:
+            self._db = sqlite3.connect(self.path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, result BLOB NOT NULL, seconds REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _lookup(self, key: str) -> tuple | None:
+        """Gets a (result, seconds) entry, counting the lookup."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self._db is not None:
+            row = self._db.execute(
+                "SELECT result, seconds FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                state = pickle.loads(row[0])
+                result = results.AspectSentimentResult.__new__(
+                    results.AspectSentimentResult
+                )
+                result.__setstate__(state)
+                result.aspect_names = results.get_aspect_names(result.aspect_names)
+                entry = (result, row[1])
+                self._remember(key, entry)
+
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.seconds_saved += entry[1]
+        return entry
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        """Adds an entry to memory, evicting the least recently used."""
+        if self.max_size == 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> results.AspectSentimentResult | None:
+        """Gets a cached result by key, counting the lookup as a hit or miss.
+
+        Args:
+            key (str): Key of the result returned by get_text_key(), with the
+                normalized text and a config key.
+
+        Returns:
+            results.AspectSentimentResult | None: The cached result, which is
+                shared and should not be modified, or None if not cached.
+        """
+        entry = self._lookup(key)
+        return None if entry is None else entry[0]
+
+    def put(
+        self,
+        key: str,
+        result: results.AspectSentimentResult,
+        seconds: float = 0.0,
+    ) -> None:
+        """Adds a result to the cache.
+
+        Results added are written to the database when flush() is called.
+
+        Args:
+            key (str): Key of the result returned by get_text_key().
+            result (results.AspectSentimentResult): The result of the
+                normalized text. Its id is not stored.
+            seconds (float, optional): Time taken to compute the result.
+                Defaults to 0.0.
+        """
+        result = results.AspectSentimentResult(
+            None,
+            result.aspect_names,
+            result.sentiments,
+            result.lemmas,
+            result.offsets,
+            result.scores,
+            result.anonymized,
+        )
+        self._remember(key, (result, seconds))
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                (key, pickle.dumps(result.__getstate__()), seconds),
+            )
+
+    def flush(self) -> None:
+        """Commits results added to the database, if any."""
+        if self._db is not None:
+            self._db.commit()
+
+    def close(self) -> None:
+        """Commits results added to the database and closes it."""
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
+
+    def clear(self) -> None:
+        """Removes all results, including from the database, and resets stats."""
+        self._entries.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def info(self) -> dict:
+        """Gets statistics about the cache.
+
+        Returns:
+            dict: Dictionary of 'hits', 'misses', 'hit_rate', 'results' (number
+                in memory), 'max_size' and 'seconds_saved'.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "results": len(self),
+            "max_size": self.max_size,
+            "seconds_saved": self.seconds_saved,
+        }
+
+    def pipe(
+        self,
+        texts: Iterable[str] | Iterable[tuple[str, Any]],
+        config_key: str,
+        process: Callable[
+            [Iterator[tuple[str, str]]], Iterable[results.AspectSentimentResult]
+        ],
+        as_tuples: bool = False,
+        batch_size: int = 1000,
+    ) -> Iterator[results.AspectSentimentResult]:
+        """Generates results for a stream of texts, processing only misses.
+
+        Each distinct normalized text which is not cached is passed to a
+        single, lazily started call to process(), once, and its result added
+        to the cache. Texts are yielded straight from the cache until the
+        first miss, and process() is never called if every text is cached.
+        Results are yielded in input order, with offsets and anonymized texts
+        adjusted for any whitespace removed by normalization.
+
+        Args:
+            texts (Iterable[str] | Iterable[tuple[str, Any]]): The texts, or
+                (text, row ID) tuples if as_tuples is True.
+            config_key (str): Key of the pipeline config from get_config_key().
+            process (Callable): Function taking an iterator of (normalized
+                text, key) tuples and yielding the result of each text in the
+                same order, with the key as its id.
+            as_tuples (bool, optional): Whether texts are (text, row ID)
+                tuples. Defaults to False.
+            batch_size (int, optional): Number of results added between commits
+                to the database. Defaults to 1000.
+
+        Returns:
+            Iterator[results.AspectSentimentResult]: Generator of results, in
+                input order, with the row IDs of the texts.
+        """
+        items = iter(texts)
+        order = deque()
+        ready = {}
+        rows = {}
+        # Key -> positions of the texts waiting on the result of a missed text
+        waiting = {}
+
+        def check(i: int, item: Any) -> tuple[str, str] | None:
+            """Sets aside a cached text, or returns a missed text and its key."""
+            original, row_id = item if as_tuples == True else (item, None)
+            text, start = normalize_text(original)
+            key = get_text_key(text, config_key)
+            order.append(i)
+            rows[i] = (original, start, len(text), row_id)
+            # Duplicates of a missed text are processed once
+            if key in waiting:
+                waiting[key].append(i)
+                return None
+            entry = self._lookup(key)
+            if entry is not None:
+                ready[i] = entry
+                return None
+            waiting[key] = [i]
+            return (text, key)
+
+        def release() -> Iterator[results.AspectSentimentResult]:
+            """Yields ready results at the front of the stream, in order."""
+            while order and order[0] in ready:
+                i = order.popleft()
+                result, _ = ready.pop(i)
+                original, start, length, row_id = rows.pop(i)
+                yield restore_result(result, original, start, length, row_id)
+
+        def misses(position: int, first: tuple[str, str]) -> Iterator[tuple[str, str]]:
+            """Yields the texts to process, setting aside cached texts."""
+            yield first
+            for i, item in enumerate(items, position + 1):
+                miss = check(i, item)
+                if miss is not None:
+                    yield miss
+
+        first = None
+        for i, item in enumerate(items):
+            first = check(i, item)
+            if first is not None:
+                break
+            yield from release()
+        if first is None:
+            return
+
+        processed = iter(process(misses(i, first)))
+        seconds_total = 0.0
+        count = 0
+        while True:
+            start = time.perf_counter()
+            result = next(processed, None)
+            if result is None:
+                break
+            # Processing is batched, so its time is spread over all results
+            seconds_total += time.perf_counter() - start
+            count += 1
+            seconds = seconds_total / count
+
+            self.put(result.id, result, seconds)
+            if count % batch_size == 0:
+                self.flush()
+            positions = waiting.pop(result.id)
+            for position in positions:
+                ready[position] = (result, seconds)
+            self.hits += len(positions) - 1
+            self.seconds_saved += seconds * (len(positions) - 1)
+            yield from release()
+
+        self.flush()
+        yield from release()
+
+
+def restore_result(
+    result: results.AspectSentimentResult,
+    text: str,
+    start: int,
+    length: int,
+    row_id: Any = None,
+) -> results.AspectSentimentResult:
+    """Maps a cached result of a normalized text back onto the original text.
+
+    Args:
+        result (results.AspectSentimentResult): Result of the normalized text.
+        text (str): The original text.
+        start (int): Offset of the normalized text in the original text.
+        length (int): Length of the normalized text.
+        row_id (Any, optional): Row ID of the original text. Defaults to None.
+
+    Returns:
+        results.AspectSentimentResult: A new result sharing the cached
+            result's arrays where possible.
+    """
+    offsets = result.offsets
+    anonymized = result.anonymized
+    if start:
+        offsets = array("l", offsets)
+        for i, offset in enumerate(offsets):
+            if i % results.OFFSETS_PER_KEYWORD != results.OFFSETS_PER_KEYWORD - 1:
+                offsets[i] = offset + start
+        offsets = offsets if result.lemmas else ()
+    if anonymized is not None and length != len(text):
+        anonymized = text[:start] + anonymized + text[start + length :]
+
+    return results.AspectSentimentResult(
+        row_id,
+        result.aspect_names,
+        result.sentiments,
+        result.lemmas,
+        offsets,
+        result.scores,
+        anonymized,
+    )
@@ -0,0 +1,173 @@
+"""Splitting of long documents into chunks, and merging of their results.
+
+Essays and discussion threads can exceed spacy's max_length, and parsing them
+as a single Doc is slow and memory hungry. This module contains split_text(),
+which splits a text into contiguous chunks of bounded length on paragraph,
+then sentence, then word boundaries, and merge_results(), which merges the
+results of the chunks into a single result for the whole text.
+
+Chunks are processed independently, so a keyword's parent span never crosses a
+chunk boundary. As chunks are split on paragraph and sentence boundaries where
+possible, this rarely changes the spans found.
+
+See make_long_results() in la_nlp.pipes.aspect_sentiment for the main entry
+point.
+"""
+
+import math
+import re
+from array import array
+from typing import Any
+
+from la_nlp import results
+
+# Default maximum length of a chunk in characters
+DEFAULT_MAX_CHUNK_CHARS = 5000
+
+# Boundaries to split on, in order of preference. Each match's end is a boundary
+BOUNDARY_REGEXES = [
+    re.compile(r"\n\s*\n"),
+    re.compile(r"(?<=[.!?])\s+"),
+    re.compile(r"\s+"),
+]
+
+
+def split_text(
+    text: str,
+    max_chars: int = DEFAULT_MAX_CHUNK_CHARS,
+) -> list[tuple[int, int]]:
+    """Splits a text into contiguous chunks of at most max_chars characters.
+
+    Consecutive paragraphs are packed into the same chunk while they fit.
+    Paragraphs longer than max_chars are split into sentences, and sentences
+    longer than max_chars into words. Only words longer than max_chars are
+    split at arbitrary characters.
+
+    Args:
+        text (str): The text to split.
+        max_chars (int, optional): Maximum length of a chunk. Defaults to
+            DEFAULT_MAX_CHUNK_CHARS.
+
+    Raises:
+        ValueError: Raised if max_chars is less than 1.
+
+    Returns:
+        list[tuple[int, int]]: (start, end) character offsets of each chunk.
+            Chunks cover the whole text, in order, so joining them gives back
+            the text. An empty text gives a single empty chunk.
+    """
+    if max_chars < 1:
+        raise ValueError("max_chars must be at least 1")
+    return _split(text, 0, len(text), max_chars, 0)
+
+
+def _split(
+    text: str,
+    start: int,
+    end: int,
+    max_chars: int,
+    level: int,
+) -> list[tuple[int, int]]:
+    """Splits text[start:end] on the boundaries of BOUNDARY_REGEXES[level:]."""
+    if end - start <= max_chars:
+        return [(start, end)]
+    if level == len(BOUNDARY_REGEXES):
+        return [(i, min(i + max_chars, end)) for i in range(start, end, max_chars)]
+
+    boundaries = [
+        match.end()
+        for match in BOUNDARY_REGEXES[level].finditer(text, start, end)
+        if start < match.end() < end
+    ]
+    pieces = zip([start, *boundaries], [*boundaries, end])
+
+    # Packs consecutive pieces into chunks, splitting pieces that are too long
+    chunks = []
+    chunk_start = chunk_end = start
+    for piece_start, piece_end in pieces:
+        if piece_end - chunk_start <= max_chars:
+            chunk_end = piece_end
+            continue
+        if chunk_end > chunk_start:
+            chunks.append((chunk_start, chunk_end))
+        if piece_end - piece_start <= max_chars:
+            chunk_start, chunk_end = piece_start, piece_end
+        else:
+            chunks.extend(_split(text, piece_start, piece_end, max_chars, level + 1))
+            chunk_start = chunk_end = piece_end
+    if chunk_end > chunk_start:
+        chunks.append((chunk_start, chunk_end))
+    return chunks
+
+
+def merge_results(
+    chunk_results: list[results.AspectSentimentResult],
+    starts: list[int],
+    row_id: Any = None,
+) -> results.AspectSentimentResult:
+    """Merges the results of a text's chunks into a result for the whole text.
+
+    The sentiment of each aspect is the mean of its sentiment in each chunk,
+    weighted by the number of the aspect's keywords in the chunk. This equals
+    the mean over all of the aspect's keywords, as for a single Doc. Keyword
+    offsets are shifted by the start of their chunk, so that they refer to the
+    whole text.
+
+    Args:
+        chunk_results (list[results.AspectSentimentResult]): Results of each
+            chunk, in order, all with the same aspect names.
+        starts (list[int]): Character offset of the start of each chunk.
+        row_id (Any, optional): The row ID of the text. Defaults to None.
+
+    Returns:
+        results.AspectSentimentResult: The merged result.
+    """
+    aspect_names = chunk_results[0].aspect_names
+    totals = [0.0] * len(aspect_names)
+    counts = [0] * len(aspect_names)
+    lemmas = []
+    offsets = array("l")
+    scores = array("d")
+
+    for result, start in zip(chunk_results, starts):
+        chunk_counts = [0] * len(aspect_names)
+        for i in range(len(result.lemmas)):
+            keyword_start, keyword_end, span_start, span_end, aspect = result.offsets[
+                i * results.OFFSETS_PER_KEYWORD : (i + 1) * results.OFFSETS_PER_KEYWORD
+            ]
+            offsets.extend(
+                (
+                    keyword_start + start,
+                    keyword_end + start,
+                    span_start + start,
+                    span_end + start,
+                    aspect,
+                )
+            )
+            chunk_counts[aspect] += 1
+        lemmas.extend(result.lemmas)
+        scores.extend(result.scores)
+
+        for i, (score, count) in enumerate(zip(result.sentiments, chunk_counts)):
+            if count and not math.isnan(score):
+                totals[i] += score * count
+                counts[i] += count
+
+    sentiments = array(
+        "d",
+        [total / count if count else math.nan for total, count in zip(totals, counts)],
+    )
+
+    anonymized = None
+    if chunk_results[0].anonymized is not None:
+        anonymized = "".join(result.anonymized for result in chunk_results)
+
+    return results.AspectSentimentResult(
+        row_id,
+        aspect_names,
+        sentiments,
+        tuple(lemmas) if lemmas else (),
+        offsets if lemmas else (),
+        scores if lemmas else (),
+        anonymized,
+    )
@@ -0,0 +1,402 @@
+"""Command-line runner for the aspect sentiment pipeline.
+
+Processes a CSV or JSONL file of texts with make_results(), writing one record
+per text to a JSONL, CSV or Parquet file via la_nlp.writers. Parsing can be
+spread across several worker processes, and progress and throughput are
+reported as the run goes.
+
+Every --checkpoint-every records, the output is flushed to disk and the number
+of input rows completed is saved to a checkpoint file next to the output. If a
+run is interrupted, re-running the same command with --resume truncates the
+output to the last checkpoint and continues from the following row.
+
+Usage:
+    la-nlp comments.csv results.jsonl --text-column comment --id-column id \\
+        --n-process 4 --resume
+
+    python -m la_nlp.cli --help
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import chain, islice
+from typing import Any, Iterator
+
+from la_nlp import cache, prefiltering, writers
+from la_nlp.pipes import aspect_sentiment
+
+# Suffix of the checkpoint file, which is written next to the output file
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+# Input formats keyed by file extension
+INPUT_EXTENSIONS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+def get_input_format(path: str, input_format: str | None = None) -> str:
+    """Gets the format of an input file, inferring it from its extension.
+
+    Args:
+        path (str): Path of the input file.
+        input_format (str | None, optional): Explicit format, 'csv' or 'jsonl'.
+            Defaults to None.
+
+    Raises:
+        ValueError: Raised if the format is not supported or cannot be inferred.
+
+    Returns:
+        str: 'csv' or 'jsonl'.
+    """
+    if input_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in INPUT_EXTENSIONS:
+            raise ValueError(f"Cannot infer input format of {path!r}")
+        input_format = INPUT_EXTENSIONS[extension]
+    if input_format not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported input format {input_format!r}")
+    return input_format
+
+
+def read_rows(
+    path: str,
+    text_column: str = "text",
+    id_column: str | None = None,
+    input_format: str | None = None,
+) -> Iterator[tuple[str, Any]]:
+    """Reads (text, row ID) tuples from a CSV or JSONL file.
+
+    Args:
+        path (str): Path of the input file.
+        text_column (str, optional): Name of the column, or JSON key, holding
+            the text. Defaults to 'text'.
+        id_column (str | None, optional): Name of the column, or JSON key,
+            holding the row ID. Defaults to None, in which case the index of
+            the row is used.
+        input_format (str | None, optional): 'csv' or 'jsonl'. Defaults to
+            None, in which case it is inferred from the extension.
+
+    Raises:
+        ValueError: Raised if a row has no text column, or the format is not
+            supported.
+
+    Returns:
+        Iterator[tuple[str, Any]]: Generator of (text, row ID) tuples.
+    """
+    input_format = get_input_format(path, input_format)
+
+    with open(path, encoding="utf-8", newline="") as file:
+        if input_format == "csv":
+            rows = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+
+        for i, row in enumerate(rows):
+            if text_column not in row:
+                raise ValueError(f"Row {i} of {path!r} has no {text_column!r} column")
+            text = row[text_column]
+            row_id = i if id_column is None else row.get(id_column)
+            yield ("" if text is None else str(text), row_id)
+
+
+def get_checkpoint_path(output: str) -> str:
+    """Gets the path of the checkpoint file for an output file."""
+    return output + CHECKPOINT_SUFFIX
+
+
+def get_checkpoint_options(args: argparse.Namespace, output_format: str) -> dict:
+    """Gets the options of a run which change its output, to check on resume.
+
+    Args:
+        args (argparse.Namespace): Arguments parsed by get_parser().
+        output_format (str): Format of the output file.
+
+    Returns:
+        dict: The options, as stored in checkpoints.
+    """
+    return {
+        "input_format": get_input_format(args.input, args.input_format),
+        "text_column": args.text_column,
+        "id_column": args.id_column,
+        "output_format": output_format,
+        "aspects": None if args.aspects is None else os.path.abspath(args.aspects),
+        "parent_span_min_length": args.parent_span_min_length,
+        "anonymize": args.anonymize,
+        "similarity_threshold": args.similarity_threshold,
+        "model": args.model,
+        "profile": args.profile,
+    }
+
+
+def read_checkpoint(output: str) -> dict | None:
+    """Reads the checkpoint for an output file.
+
+    Args:
+        output (str): Path of the output file.
+
+    Returns:
+        dict | None: Dictionary of 'input' (input path), 'options' (see
+            get_checkpoint_options()), 'rows' (number of input rows completed)
+            and 'bytes' (size of the output file at the checkpoint), or None
+            if there is no checkpoint.
+    """
+    try:
+        with open(get_checkpoint_path(output), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(output: str, checkpoint: dict) -> None:
+    """Atomically writes the checkpoint for an output file.
+
+    Args:
+        output (str): Path of the output file.
+        checkpoint (dict): The checkpoint. See read_checkpoint().
+    """
+    path = get_checkpoint_path(output)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(temp_path, path)
+
+
+def report_progress(rows: int, start_rows: int, start_time: float) -> None:
+    """Prints the number of rows completed and the throughput to stderr."""
+    elapsed = time.perf_counter() - start_time
+    rate = (rows - start_rows) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{rows} rows done, {rate:.1f} docs/sec, {elapsed:.0f}s elapsed",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    """Runs the pipeline over the input file as configured by args.
+
+    Args:
+        args (argparse.Namespace): Arguments parsed by get_parser().
+
+    Raises:
+        ValueError: Raised if the run cannot be resumed, or if an option is
+            invalid.
+
+    Returns:
+        int: Total number of rows completed, including any from previous runs.
+    """
+    output_format = args.output_format
+    if output_format is None:
+        extension = os.path.splitext(args.output)[1].lower()
+        output_format = writers.EXTENSIONS.get(extension)
+    # Parquet files are only valid once closed, so cannot be checkpointed
+    checkpointing = output_format != "parquet"
+
+    if args.checkpoint_every < 1:
+        raise ValueError("--checkpoint-every must be at least 1")
+
+    done = 0
+    options = get_checkpoint_options(args, output_format)
+    checkpoint = read_checkpoint(args.output) if args.resume else None
+    if args.resume and not checkpointing:
+        raise ValueError("Runs writing Parquet files cannot be resumed")
+    if checkpoint is not None:
+        if checkpoint["input"] != os.path.abspath(args.input):
+            raise ValueError(
+                f"Checkpoint for {args.output!r} is for a different input file, "
+                f"{checkpoint['input']!r}"
+            )
+        checkpoint_options = checkpoint.get("options", {})
+        changed = [
+            name for name in options if checkpoint_options.get(name) != options[name]
+        ]
+        if changed:
+            raise ValueError(
+                f"Checkpoint for {args.output!r} was written with different "
+                f"options: {', '.join(changed)}"
+            )
+        done = checkpoint["rows"]
+
+    # Read the first row before touching the output, so that a missing or
+    # malformed input leaves any existing output as it was
+    reader = read_rows(args.input, args.text_column, args.id_column, args.input_format)
+    first = next(reader, None)
+    rows = islice(chain([] if first is None else [first], reader), done, None)
+
+    if checkpoint is not None:
+        with open(args.output, "r+b") as file:
+            file.truncate(checkpoint["bytes"])
+        if not args.quiet:
+            print(f"Resuming after row {done}", file=sys.stderr)
+    elif os.path.exists(get_checkpoint_path(args.output)):
+        # A checkpoint left by an earlier run does not apply to this output
+        os.remove(get_checkpoint_path(args.output))
+
+    result_cache = None
+    if args.result_cache is not None:
+        result_cache = cache.ResultCache(path=args.result_cache)
+    pipeline = aspect_sentiment.AspectSentimentPipeline(
+        aspects=args.aspects,
+        parent_span_min_length=args.parent_span_min_length,
+        anonymize=args.anonymize,
+        model=args.model,
+        profile=args.profile,
+        similarity_threshold=args.similarity_threshold,
+    )
+    # The run's own pre-filter, so that its skip rate counts only this run
+    prefilter = False
+    if args.prefilter:
+        prefilter = prefiltering.KeywordPrefilter(pipeline.aspect_index, pipeline.nlp)
+    results = pipeline.make_results(
+        rows,
+        as_tuples=True,
+        result_cache=result_cache,
+        batch_size=args.batch_size,
+        n_process=args.n_process,
+        parse_cache=args.parse_cache,
+        prefilter=prefilter,
+    )
+
+    start_rows = done
+    start_time = time.perf_counter()
+    last_report = start_time
+    with writers.get_writer(
+        args.output,
+        format=output_format,
+        buffer_size=args.batch_size,
+        append=checkpoint is not None,
+    ) as writer:
+        for result in results:
+            writer.write(result)
+            done += 1
+
+            if checkpointing and done % args.checkpoint_every == 0:
+                size = writer.sync()
+                write_checkpoint(
+                    args.output,
+                    {
+                        "input": os.path.abspath(args.input),
+                        "options": options,
+                        "rows": done,
+                        "bytes": size,
+                    },
+                )
+
+            now = time.perf_counter()
+            if not args.quiet and now - last_report >= args.progress_interval:
+                report_progress(done, start_rows, start_time)
+                last_report = now
+
+    # The run is complete, so there is nothing left to resume
+    if os.path.exists(get_checkpoint_path(args.output)):
+        os.remove(get_checkpoint_path(args.output))
+    if not args.quiet:
+        report_progress(done, start_rows, start_time)
+    if result_cache is not None:
+        info = result_cache.info()
+        result_cache.close()
+        if not args.quiet:
+            print(
+                f"Result cache: {info['hits']} hits, {info['hit_rate']:.1%} hit rate, "
+                f"{info['seconds_saved']:.1f}s saved",
+                file=sys.stderr,
+            )
+    if prefilter is not False and not args.quiet:
+        info = prefilter.info()
+        print(
+            f"Prefilter: {info['skipped']} skipped, {info['skip_rate']:.1%} skip rate",
+            file=sys.stderr,
+        )
+    return done
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Builds the command-line argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="la-nlp",
+        description="Runs aspect-based sentiment analysis over a file of texts.",
+    )
+    parser.add_argument("input", help="Input CSV or JSONL file")
+    parser.add_argument("output", help="Output JSONL, CSV or Parquet file")
+    parser.add_argument("--text-column", default="text", help="Column of the text")
+    parser.add_argument(
+        "--id-column",
+        default=None,
+        help="Column of the row ID. Defaults to the index of the row",
+    )
+    parser.add_argument("--input-format", choices=["csv", "jsonl"], default=None)
+    parser.add_argument(
+        "--output-format", choices=list(writers.WRITERS), default=None
+    )
+    parser.add_argument("--aspects", default=None, help="Path to an aspects .toml file")
+    parser.add_argument("--parent-span-min-length", type=int, default=7)
+    parser.add_argument("--anonymize", action="store_true")
+    parser.add_argument(
+        "--similarity-threshold",
+        type=float,
+        default=None,
+        help="Also match tokens whose word vectors are this similar to a keyword",
+    )
+    parser.add_argument("--model", default=None, help="spaCy model name or path")
+    parser.add_argument(
+        "--profile", choices=list(aspect_sentiment.PROFILES), default=None
+    )
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--parse-cache", default=None, help="Directory of a parse cache to use"
+    )
+    parser.add_argument(
+        "--result-cache",
+        default=None,
+        help="SQLite file of a result cache to use, reusing results of duplicate texts",
+    )
+    parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help="Skip parsing texts which cannot contain any keywords",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=10_000,
+        help="Number of rows between checkpoints",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume from the output's checkpoint, if there is one",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between progress reports",
+    )
+    parser.add_argument("--quiet", action="store_true", help="Don't report progress")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point of the la-nlp command.
+
+    Args:
+        argv (list[str] | None, optional): Command-line arguments. Defaults to
+            None, in which case sys.argv is used.
+    """
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    try:
+        run(args)
+    except (ValueError, OSError) as e:
+        parser.exit(1, f"la-nlp: error: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
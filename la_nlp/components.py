@@ -8,11 +8,37 @@ assembled into a pipeline, building upon one another and customizing the spacy
 default pipeline.
 """
 
-from spacy.tokens import Doc, Span, Token
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from typing import Callable, Iterable
+
+from la_nlp import instrumentation, sentiment, taxonomy
 
-# Initializing the VADER sentiment analyzer for use within sentiment components
-ANALYZER = SentimentIntensityAnalyzer()
+from spacy.attrs import DEP, HEAD
+from spacy.matcher import Matcher
+from spacy.tokens import Doc, Span, Token
+from spacy.util import filter_spans
+
+# Key under which subtree bounds are cached in Doc.user_data
+SUBTREE_BOUNDS_KEY = ("la_nlp", "subtree_bounds")
+
+# Names of all extensions set by the components in this module
+EXTENSION_NAMES = (
+    "contains_aspect",
+    "aspects",
+    "keywords",
+    "aspect",
+    "keyword_span",
+    "parent_span",
+    "sentiment",
+    "aspect_sentiments",
+    "anonymized",
+)
+
+
+def __getattr__(name: str) -> any:
+    """Lazily provides the ANALYZER module attribute."""
+    if name == "ANALYZER":
+        return sentiment.get_analyzer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Helper functions
 def set_extension(
@@ -33,12 +59,223 @@ def set_extension(
         target_obj.set_extension(extension_name, default=default_val)
 
 
+def reset_extensions(doc: Doc) -> Doc:
+    """Clears the values of all extensions set by this module's components.
+
+    Values are removed from the Doc's user_data, so the Doc, its Tokens and
+    its Spans all revert to the extensions' default values. Cached subtree
+    bounds are kept, as they only depend on the parse.
+
+    Args:
+        doc (Doc): The Doc to reset.
+
+    Returns:
+        Doc: The Doc with its extension values cleared.
+    """
+    names = set(EXTENSION_NAMES)
+    stale = [
+        key
+        for key in doc.user_data
+        if isinstance(key, tuple) and key[0] == "._." and key[1] in names
+    ]
+    for key in stale:
+        del doc.user_data[key]
+    return doc
+
+
+def get_keyword_index(base_keywords: list) -> taxonomy.AspectIndex:
+    """Gets a compiled index for matching a flat list of keywords.
+
+    Args:
+        base_keywords (list): List of keywords to match.
+
+    Returns:
+        taxonomy.AspectIndex: Index mapping each keyword to itself.
+    """
+    return taxonomy.compile_aspects({keyword: [keyword] for keyword in base_keywords})
+
+
+def match_keyword_phrases(
+    doc: Doc,
+    phrase_matcher: Matcher,
+) -> list[Span]:
+    """Finds the multi-word keywords within a Doc.
+
+    Spans are matched by phrase_matcher (see
+    taxonomy.AspectIndex.get_phrase_matcher()), and labelled with the keyword
+    they matched. Overlapping matches are resolved in favour of the longest.
+    The Doc is not modified, so neither are its tokens nor the shared Vocab.
+
+    Args:
+        doc (Doc): The Doc object to search for keywords.
+        phrase_matcher (Matcher): Matcher labelling matches with the keyword
+            they correspond to.
+
+    Returns:
+        list[Span]: The matched spans, in order.
+    """
+    matches = phrase_matcher(doc, as_spans=True, allow_missing=True)
+    if not matches:
+        return []
+    return sorted(filter_spans(matches), key=lambda span: span.start)
+
+
+def get_keyword_span(token: Token) -> Span:
+    """Gets the span of the keyword a keyword token was matched as part of.
+
+    Multi-word keywords are matched as spans, whose syntactic root is used as
+    the keyword token, and which are kept in the token's 'keyword_span'
+    attribute. All other keywords span only their own token.
+
+    Args:
+        token (Token): A keyword token, e.g. from 'Doc._.keywords'.
+
+    Returns:
+        Span: The keyword's span, labelled with the keyword's lemma (or the
+            keyword itself, for multi-word keywords).
+    """
+    if Token.has_extension("keyword_span"):
+        span = token._.keyword_span
+        if span is not None:
+            return span
+    return Span(token.doc, token.i, token.i + 1, label=token.lemma)
+
+
+def get_subtree_bounds(doc: Doc) -> dict:
+    """Computes the bounds of every token's subtree within a Doc.
+
+    Subtrees exclude children with the dependency tags 'cc' and 'conj' (and
+    their own children), as these generally mark the border between separate
+    clauses. Bounds for all tokens are computed in a single iterative pass over
+    the dependency tree, and cached on the Doc so that they are only computed
+    once per Doc.
+
+    Args:
+        doc (Doc): The Doc to compute subtree bounds for.
+
+    Returns:
+        dict: Dictionary containing the lists 'heads' (index of each token's
+            head), 'starts' and 'ends' (start and exclusive end index of each
+            token's subtree), along with 'parent_spans', a cache of parent span
+            bounds keyed by minimum length.
+    """
+    bounds = doc.user_data.get(SUBTREE_BOUNDS_KEY)
+    # Retokenizing changes the length of the Doc, invalidating cached bounds
+    if bounds is not None and bounds["length"] == len(doc):
+        return bounds
+
+    n = len(doc)
+    offsets = doc.to_array(HEAD).astype("int64").tolist()
+    heads = [i + offset for i, offset in enumerate(offsets)]
+    deps = doc.to_array(DEP).tolist()
+    excluded = {doc.vocab.strings["cc"], doc.vocab.strings["conj"]}
+
+    # Order tokens breadth-first from the roots, so every head precedes its children
+    children = [[] for _ in range(n)]
+    order = []
+    for i, head in enumerate(heads):
+        if head == i:
+            order.append(i)
+        else:
+            children[head].append(i)
+    position = 0
+    while position < len(order):
+        order.extend(children[order[position]])
+        position += 1
+
+    # Visiting children before heads, widen each head's bounds to its children's
+    starts = list(range(n))
+    ends = list(range(1, n + 1))
+    for i in reversed(order):
+        head = heads[i]
+        if head == i or deps[i] in excluded:
+            continue
+        if starts[i] < starts[head]:
+            starts[head] = starts[i]
+        if ends[i] > ends[head]:
+            ends[head] = ends[i]
+
+    bounds = {
+        "length": n,
+        "heads": heads,
+        "starts": starts,
+        "ends": ends,
+        "parent_spans": {},
+    }
+    doc.user_data[SUBTREE_BOUNDS_KEY] = bounds
+    return bounds
+
+
+def get_parent_span_bounds(
+    doc: Doc,
+    min_length: int,
+) -> list[tuple[int, int]]:
+    """Computes the parent span bounds of every token within a Doc.
+
+    A token's parent span is the subtree of its head (see get_subtree_bounds()).
+    If this is shorter than min_length, the parent span of the token's head is
+    used instead, provided it contains the token, and so on up the tree until
+    the span is long enough or the root of the sentence is reached.
+
+    Results are cached on the Doc for each min_length, and computed in time
+    linear in the length of the Doc.
+
+    Args:
+        doc (Doc): The Doc to compute parent span bounds for.
+        min_length (int): Minimum length of parent spans. This will be ignored
+            if the sentence itself is shorter than min_length.
+
+    Returns:
+        list[tuple[int, int]]: (start, end) of each token's parent span, indexed
+            by token.
+    """
+    bounds = get_subtree_bounds(doc)
+    parent_spans = bounds["parent_spans"].get(min_length)
+    if parent_spans is not None:
+        return parent_spans
+
+    heads = bounds["heads"]
+    starts = bounds["starts"]
+    ends = bounds["ends"]
+    parent_spans = [None] * len(heads)
+
+    for i in range(len(heads)):
+        # Walk up the tree for as long as each span depends on the head's span
+        chain = [i]
+        while True:
+            head = heads[chain[-1]]
+            if (
+                ends[head] - starts[head] >= min_length
+                or head == heads[head]
+                or parent_spans[head] is not None
+            ):
+                break
+            chain.append(head)
+
+        # Then resolve the chain from the top down
+        for token in reversed(chain):
+            if parent_spans[token] is not None:
+                continue
+            head = heads[token]
+            span = (starts[head], ends[head])
+            if span[1] - span[0] < min_length and head != heads[head]:
+                head_span = parent_spans[head]
+                if head_span[0] <= token < head_span[1]:
+                    span = head_span
+            parent_spans[token] = span
+
+    bounds["parent_spans"][min_length] = parent_spans
+    return parent_spans
+
+
 def get_token_parent_span(
     token: Token,
     min_length: int,
 ) -> Span:
     """Takes a Token object and returns its Span from the parent Doc.
 
+    See get_parent_span_bounds() for how parent spans are computed.
+
     Args:
         token (Token): spacy Token object to get the parent span of.
         min_length (int): Minimum length of parent span. This will be ignored
@@ -47,42 +284,9 @@ def get_token_parent_span(
     Returns:
         Span: spacy Span object containing the Token passed into the function.
     """
-
-    def get_children_indices(head: Token) -> list:
-        """Recursively gets indices of head's children and children of children.
-
-        Args:
-            head (Token): Token to get the indices of children for.
-
-        Returns:
-            list: List of indices of child tokens (indices are the locations of
-                the children within the parent Doc object).
-        """
-        children = [
-            child
-            for child in head.children
-            if child.dep_ != "cc" and child.dep_ != "conj"
-        ]
-        indices = [child.i for child in children]
-        indices.append(head.i)
-        for child in children:
-            indices.extend(get_children_indices(child))
-        indices.sort()
-        return indices
-
-    indices = get_children_indices(token.head)
     doc = token.doc
-    first = indices[0]
-    last = indices[-1]
-    if last >= len(doc):
-        span = doc[first:]
-    else:
-        span = doc[first : last + 1]
-    if len(span) < min_length and token.head != token.head.head:
-        new_span = get_token_parent_span(token.head, min_length=min_length)
-        if token in new_span:
-            span = new_span
-    return span
+    start, end = get_parent_span_bounds(doc, min_length)[token.i]
+    return doc[start:end]
 
 
 # Component functions
@@ -110,10 +314,8 @@ def set_doc_contains_aspect(
     """
     set_extension("contains_aspect", default_val=False)
 
-    for token in doc:
-        if token.lemma_ in base_keywords or token.lemma_.lower() in base_keywords:
-            doc._.contains_aspect = True
-            break
+    if get_keyword_index(base_keywords).match(doc):
+        doc._.contains_aspect = True
 
     return doc
 
@@ -125,7 +327,8 @@ def set_doc_aspects(
     """Takes a Doc and returns a new Doc with the 'aspects' attribute.
 
     Accessed via 'Doc._.aspects', the 'aspects' attribute contains a list of the
-    aspects discussed by the Doc.
+    aspects discussed by the Doc. A keyword listed under several aspects counts
+    towards all of them.
 
     Target object: spacy Doc
     Attribute type: list
@@ -144,13 +347,11 @@ def set_doc_aspects(
     set_extension("aspects")
 
     if doc._.contains_aspect == True:
+        index = taxonomy.compile_aspects(base_aspects)
         aspects_contained = []
-        for token in doc:
-            for aspect in base_aspects:
-                if aspect in aspects_contained:
-                    continue
-                keywords = base_aspects[aspect]
-                if token.lemma_ in keywords or token.lemma_.lower() in keywords:
+        for i, _ in index.match(doc):
+            for aspect in index.get_token_aspects(doc[i]):
+                if aspect not in aspects_contained:
                     aspects_contained.append(aspect)
         doc._.aspects = aspects_contained
     return doc
@@ -180,11 +381,8 @@ def set_doc_keywords(
     set_extension("keywords")
 
     if doc._.contains_aspect == True:
-        keywords = []
-        for token in doc:
-            if token.lemma_ in base_keywords or token.lemma_.lower() in base_keywords:
-                keywords.append(token)
-        doc._.keywords = keywords
+        matches = get_keyword_index(base_keywords).match(doc)
+        doc._.keywords = [doc[i] for i, _ in matches]
     return doc
 
 
@@ -196,8 +394,9 @@ def set_token_aspects(
 
     Accessed via 'Token._.aspect', the 'aspect' attribute is applied only to the
     Token objects contained within the 'keywords' attribute of the Doc. The
-    attribute itself reflects the corresponding aspect of the keyword. Non-
-    keyword Token objects receive a None value.
+    attribute itself reflects the corresponding aspect of the keyword, or the
+    last of its aspects if it is listed under several. Non-keyword Token
+    objects receive a None value.
 
     Target object: spacy Token
     Attribute type: string
@@ -220,23 +419,147 @@ def set_token_aspects(
     if doc._.keywords == None:
         return doc
 
+    index = taxonomy.compile_aspects(base_aspects)
     for doc_keyword in doc._.keywords:
-        for aspect in base_aspects:
-            for keyword in base_aspects[aspect]:
-                if (
-                    doc_keyword.lemma_ == keyword
-                    or doc_keyword.lemma_.lower() == keyword
-                ):
-                    doc_keyword._.aspect = aspect
-                continue
-            if doc_keyword._.aspect != None:
-                continue
-        if doc_keyword._.aspect != None:
-            continue
+        aspects = index.get_token_aspects(doc_keyword)
+        doc_keyword._.aspect = aspects[-1] if aspects else None
 
     return doc
 
 
+def set_doc_aspect_matches(
+    doc: Doc,
+    aspect_index: taxonomy.AspectIndex,
+    phrase_matcher: Matcher | None = None,
+    vector_matcher: taxonomy.VectorMatcher | None = None,
+) -> Doc:
+    """Takes a Doc and sets all keyword matching attributes in a single pass.
+
+    Equivalent to calling set_doc_contains_aspect(), set_doc_aspects(),
+    set_doc_keywords() and set_token_aspects() in sequence, but walks the Doc
+    only once, looking up each token's lemma in a precompiled AspectIndex. The
+    cost of this is constant per token, regardless of the number of aspects or
+    keywords in the taxonomy. Unlike those components, a keyword listed under
+    several aspects is only matched to the first of them.
+
+    If a phrase_matcher is passed, multi-word keywords are matched as spans
+    via match_keyword_phrases(). The root of each span is used as the keyword
+    token, with the span set as its 'keyword_span' attribute, and the span's
+    other tokens are not matched separately. If a vector_matcher is passed,
+    tokens whose word vectors are similar to a keyword's are also matched.
+
+    Target object: spacy Doc, spacy Token
+    Attribute type: see set_doc_contains_aspect(), set_doc_aspects(),
+        set_doc_keywords() and set_token_aspects()
+    Default value: see above
+    Dependency path: N/A
+
+    Args:
+        doc (Doc): The Doc object to set the attributes on.
+        aspect_index (taxonomy.AspectIndex): Compiled aspects to match against,
+            as returned by taxonomy.compile_aspects().
+        phrase_matcher (Matcher | None, optional): Matcher for multi-word
+            keywords, as returned by AspectIndex.get_phrase_matcher(). Defaults
+            to None.
+        vector_matcher (taxonomy.VectorMatcher | None, optional): Matcher for
+            tokens similar to keywords, as returned by
+            AspectIndex.get_vector_matcher(). Defaults to None.
+
+    Returns:
+        Doc: Processed Doc object with the 'contains_aspect', 'aspects' and
+            'keywords' attributes, and Token objects containing the 'aspect'
+            and 'keyword_span' attributes.
+    """
+    return set_batch_aspect_matches(
+        [doc], aspect_index, phrase_matcher, vector_matcher
+    )[0]
+
+
+def set_batch_aspect_matches(
+    docs: list[Doc],
+    aspect_index: taxonomy.AspectIndex,
+    phrase_matcher: Matcher | None = None,
+    vector_matcher: taxonomy.VectorMatcher | None = None,
+) -> list[Doc]:
+    """Takes a batch of Docs and sets all keyword matching attributes.
+
+    Batched form of set_doc_aspect_matches(). If a vector_matcher is passed,
+    the tokens of all Docs in the batch which do not match a keyword exactly
+    are scored against the keywords together, in a single matrix
+    multiplication.
+
+    Args:
+        docs (list[Doc]): The Doc objects to set the attributes on.
+        aspect_index (taxonomy.AspectIndex): Compiled aspects to match against.
+        phrase_matcher (Matcher | None, optional): Matcher for multi-word
+            keywords. Defaults to None.
+        vector_matcher (taxonomy.VectorMatcher | None, optional): Matcher for
+            tokens similar to keywords. Defaults to None.
+
+    Returns:
+        list[Doc]: The processed Doc objects. See set_doc_aspect_matches().
+    """
+    set_extension("contains_aspect", default_val=False)
+    set_extension("aspects")
+    set_extension("keywords")
+    set_extension("aspect", target_obj=Token)
+    set_extension("keyword_span", target_obj=Token)
+
+    batch_matches = []
+    batch_phrases = []
+    batch_covered = []
+    for doc in docs:
+        matches = aspect_index.match(doc)
+        phrases = {}
+        covered = set()
+        if phrase_matcher is not None:
+            for span in match_keyword_phrases(doc, phrase_matcher):
+                aspect = aspect_index.get_lemma_aspect(span.label, doc)
+                if aspect is not None:
+                    phrases[span.root.i] = (span, aspect)
+                    covered.update(range(span.start, span.end))
+        if phrases:
+            matches = sorted(
+                [(i, aspect) for i, aspect in matches if i not in covered]
+                + [(i, aspect) for i, (_, aspect) in phrases.items()]
+            )
+        batch_matches.append(matches)
+        batch_phrases.append(phrases)
+        batch_covered.append(covered)
+
+    if vector_matcher is not None:
+        excludes = [
+            covered.union(i for i, _ in matches)
+            for matches, covered in zip(batch_matches, batch_covered)
+        ]
+        similar = vector_matcher.match_batch(docs, excludes)
+        batch_matches = [
+            sorted(matches + similar_matches) if similar_matches else matches
+            for matches, similar_matches in zip(batch_matches, similar)
+        ]
+
+    for doc, matches, phrases in zip(docs, batch_matches, batch_phrases):
+        if not matches:
+            continue
+
+        keywords = []
+        aspects_contained = []
+        for i, aspect in matches:
+            token = doc[i]
+            token._.aspect = aspect
+            if i in phrases:
+                token._.keyword_span = phrases[i][0]
+            keywords.append(token)
+            if aspect not in aspects_contained:
+                aspects_contained.append(aspect)
+
+        doc._.contains_aspect = True
+        doc._.aspects = aspects_contained
+        doc._.keywords = keywords
+
+    return docs
+
+
 def set_token_parent_span(
     doc: Doc,
     include_non_keywords: bool = False,
@@ -283,9 +606,10 @@ def set_token_parent_span(
     else:
         raise ValueError("include_non_keywords takes only True or False")
 
+    parent_spans = get_parent_span_bounds(doc, min_length)
     for token in tokens:
-        span = get_token_parent_span(token, min_length=min_length)
-        token._.parent_span = span
+        start, end = parent_spans[token.i]
+        token._.parent_span = doc[start:end]
 
     return doc
 
@@ -293,15 +617,19 @@ def set_token_parent_span(
 def set_span_sentiment(
     doc: Doc,
     include_non_keywords: bool = False,  # Can only be True if parent_span True
+    backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
 ) -> Doc:
     """Takes a Doc and adds the 'sentiment' attribute to its Span objects.
 
     Accessed via 'Span._.sentiment', the 'sentiment' attribute is a measure of
-    the compound polarity of a span of text, as calculated by VADER (via the
-    vaderSentiment package). This function calculates this sentiment for the
-    parent Span objects of the Token objects in a Doc. If include_non_keywords
-    is set to False, sentiment will only be calculated for the parents of
-    the Doc's keywords
+    the polarity of a span of text, as calculated by a sentiment backend (by
+    default, the compound polarity from VADER via the vaderSentiment package).
+    This function calculates this sentiment for the parent Span objects of the
+    Token objects in a Doc. If include_non_keywords is set to False, sentiment
+    will only be calculated for the parents of the Doc's keywords
+
+    All distinct parent spans in the Doc are scored in a single call to the
+    backend. See set_batch_span_sentiment() for scoring many Docs at once.
 
     Target object: spacy Span
     Attribute type: float
@@ -316,6 +644,9 @@ def set_span_sentiment(
         include_non_keywords (bool, optional): Whether or not to assign
             sentiments to parent spans of non-keyword Token objects. Defaults to
             False.
+        backend (str | sentiment.SentimentBackend, optional): The sentiment
+            backend, or name of a registered backend, to score spans with.
+            Defaults to 'vader'.
 
     Raises:
         ValueError: Raised if passing a non-bool object to include_non_keywords.
@@ -324,24 +655,62 @@ def set_span_sentiment(
         Doc: Processed Doc object with Span objects containing the
             'sentiment' attribute.
     """
+    return set_batch_span_sentiment([doc], include_non_keywords, backend)[0]
+
+
+def set_batch_span_sentiment(
+    docs: list[Doc],
+    include_non_keywords: bool = False,
+    backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
+) -> list[Doc]:
+    """Takes a batch of Docs and adds the 'sentiment' attribute to their Spans.
+
+    Batched form of set_span_sentiment(). Parent spans are de-duplicated by
+    their start and end within each Doc, and the distinct spans of all Docs are
+    then scored in a single call to the backend's score_batch().
+
+    Args:
+        docs (list[Doc]): The Doc objects for whose Token objects to set the
+            attribute on.
+        include_non_keywords (bool, optional): Whether or not to assign
+            sentiments to parent spans of non-keyword Token objects. Defaults to
+            False.
+        backend (str | sentiment.SentimentBackend, optional): The sentiment
+            backend, or name of a registered backend, to score spans with.
+            Defaults to 'vader'.
+
+    Raises:
+        ValueError: Raised if passing a non-bool object to include_non_keywords.
+
+    Returns:
+        list[Doc]: Processed Doc objects with Span objects containing the
+            'sentiment' attribute.
+    """
     set_extension("sentiment", target_obj=Span)
 
-    if include_non_keywords == True:
-        tokens = doc
-    elif include_non_keywords == False:
-        tokens = doc._.keywords
-    else:
+    if include_non_keywords not in (True, False):
         raise ValueError("include_non_keywords takes only True or False")
 
-    if tokens == None:
-        return doc
+    spans = []
+    for doc in docs:
+        tokens = doc if include_non_keywords == True else doc._.keywords
+        if tokens == None:
+            continue
+        doc_spans = {}
+        for token in tokens:
+            span = token._.parent_span
+            doc_spans.setdefault((span.start, span.end), span)
+        spans.extend(doc_spans.values())
 
-    for token in tokens:
-        scores = ANALYZER.polarity_scores(token._.parent_span.text)
-        sentiment = scores["compound"]
-        token._.parent_span._.sentiment = sentiment
+    if not spans:
+        return docs
 
-    return doc
+    instrumentation.count("spans_scored", len(spans))
+    scores = sentiment.get_backend(backend).score_batch(spans)
+    for span, score in zip(spans, scores.tolist()):
+        span._.sentiment = score
+
+    return docs
 
 
 def set_doc_aspect_sentiments(
@@ -381,33 +750,154 @@ def set_doc_aspect_sentiments(
     if doc._.keywords is not None:
         for keyword in doc._.keywords:
             aspect = keyword._.aspect
-            sentiment = keyword._.parent_span._.sentiment
+            span_sentiment = keyword._.parent_span._.sentiment
 
             if aspect_sentiments[aspect] is None:
                 aspect_sentiments[aspect] = []
-            aspect_sentiments[aspect].append(sentiment)
+            aspect_sentiments[aspect].append(span_sentiment)
 
         for aspect in aspect_sentiments:
             sentiments = aspect_sentiments[aspect]
             if sentiments == None:
                 continue
-            sentiment = sum(sentiments) / len(sentiments)
-            aspect_sentiments[aspect] = sentiment
+            aspect_sentiments[aspect] = sum(sentiments) / len(sentiments)
 
     doc._.aspect_sentiments = aspect_sentiments
 
     return doc
 
 
+def get_batch_aspect_sentiment_sweep(
+    docs: list[Doc],
+    base_aspects: dict,
+    min_lengths: Iterable[int],
+    backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
+) -> list[dict]:
+    """Computes aspect sentiments of a batch of Docs for several span lengths.
+
+    Equivalent to running set_token_parent_span(), set_span_sentiment() and
+    set_doc_aspect_sentiments() once per min_length, but without setting any
+    attributes. Each Doc's dependency tree is walked once for all lengths (see
+    get_subtree_bounds()), and the distinct parent spans across all Docs and
+    lengths are scored in a single call to the backend.
+
+    Dependency path: set_doc_aspect_matches() ->
+
+    Args:
+        docs (list[Doc]): The Docs, with keywords already matched.
+        base_aspects (dict): Dictionary of keywords mapped to aspects.
+        min_lengths (Iterable[int]): The minimum parent span lengths to compute
+            aspect sentiments for.
+        backend (str | sentiment.SentimentBackend, optional): The sentiment
+            backend, or name of a registered backend, to score spans with.
+            Defaults to 'vader'.
+
+    Returns:
+        list[dict]: For each Doc, a dictionary mapping each min_length to the
+            Doc's aspect sentiments (as in 'Doc._.aspect_sentiments') for that
+            length.
+    """
+    min_lengths = list(dict.fromkeys(min_lengths))
+
+    # Distinct spans of each Doc, and the (aspect, span index) pairs per length
+    texts = []
+    doc_keyword_spans = []
+    for doc in docs:
+        keywords = doc._.keywords or []
+        span_ids = {}
+        keyword_spans = {}
+        for min_length in min_lengths:
+            parent_spans = get_parent_span_bounds(doc, min_length)
+            pairs = []
+            for keyword in keywords:
+                bounds = parent_spans[keyword.i]
+                if bounds not in span_ids:
+                    span_ids[bounds] = len(texts)
+                    texts.append(doc[bounds[0] : bounds[1]].text)
+                pairs.append((keyword._.aspect, span_ids[bounds]))
+            keyword_spans[min_length] = pairs
+        doc_keyword_spans.append(keyword_spans)
+
+    if texts:
+        scores = sentiment.get_backend(backend).score_batch(texts).tolist()
+    else:
+        scores = []
+
+    results = []
+    for keyword_spans in doc_keyword_spans:
+        doc_results = {}
+        for min_length, pairs in keyword_spans.items():
+            aspect_scores = {aspect: None for aspect in base_aspects}
+            for aspect, span_id in pairs:
+                if aspect_scores[aspect] is None:
+                    aspect_scores[aspect] = []
+                aspect_scores[aspect].append(scores[span_id])
+            for aspect, aspect_score in aspect_scores.items():
+                if aspect_score is not None:
+                    aspect_scores[aspect] = sum(aspect_score) / len(aspect_score)
+            doc_results[min_length] = aspect_scores
+        results.append(doc_results)
+
+    return results
+
+
+def get_entity_replacement(
+    ent: Span,
+    strategy: str | Callable[[Span], str],
+    pseudonyms: dict,
+) -> str:
+    """Gets the text to replace a named entity with when anonymizing.
+
+    Args:
+        ent (Span): The named entity to replace.
+        strategy (str | Callable[[Span], str]): One of 'mask' (replace each
+            character of each token with '*'), 'label' (replace the entity with
+            its label, e.g. '[PERSON]') or 'pseudonym' (replace the entity with
+            a numbered pseudonym, e.g. 'PERSON_1', consistent for each distinct
+            entity within the Doc), or a function taking the entity and
+            returning its replacement.
+        pseudonyms (dict): Pseudonyms assigned so far within the Doc, as a dict
+            of entity texts to pseudonyms for each label. Updated in place with
+            any new pseudonym.
+
+    Raises:
+        ValueError: Raised if strategy is not a known strategy or a function.
+
+    Returns:
+        str: The replacement text.
+    """
+    if strategy == "mask":
+        # Masks tokens individually, preserving the whitespace between them
+        return "".join(
+            "*" * len(token) + token.whitespace_ for token in ent[:-1]
+        ) + "*" * len(ent[-1])
+    if strategy == "label":
+        return f"[{ent.label_}]"
+    if strategy == "pseudonym":
+        label_pseudonyms = pseudonyms.setdefault(ent.label_, {})
+        if ent.text not in label_pseudonyms:
+            count = len(label_pseudonyms) + 1
+            label_pseudonyms[ent.text] = f"{ent.label_}_{count}"
+        return label_pseudonyms[ent.text]
+    if callable(strategy):
+        return strategy(ent)
+    raise ValueError("strategy must be 'mask', 'label', 'pseudonym' or a function")
+
+
 def set_anonymized(
     doc: Doc,
+    labels: Iterable[str] | None = None,
+    strategy: str | Callable[[Span], str] = "mask",
 ) -> Doc:
     """Takes a Doc and returns a new Doc with the 'anonymized' attribute.
 
     As its name implies, the 'anonymized' attribute is an anonymized version of the
-    input text. The function uses named entity recognition and is agnostic to the type
-    of named entity. As a result, all named entities will be anonymized, not only
-    persons.
+    input text. The function uses named entity recognition and, by default, is
+    agnostic to the type of named entity. As a result, all named entities will be
+    anonymized, not only persons, unless labels is passed.
+
+    The anonymized text is built in a single pass over the Doc's entities, so the
+    cost is linear in the length of the text.
 
     Target object: spacy Doc
     Attribute type: string
@@ -416,21 +906,36 @@ def set_anonymized(
 
     Args:
         doc (Doc): The Doc object to set the attribute on.
+        labels (Iterable[str] | None, optional): Entity labels to anonymize,
+            e.g. ['PERSON', 'ORG']. Defaults to None, in which case all named
+            entities are anonymized.
+        strategy (str | Callable[[Span], str], optional): How to replace
+            entities. See get_entity_replacement(). Defaults to 'mask', which
+            replaces each character of the entity's tokens with '*'.
+
+    Raises:
+        ValueError: Raised if strategy is not a known strategy or a function.
 
     Returns:
         Doc: Processed Doc object with 'anonymized' attribute.
     """
     set_extension("anonymized")
 
-    anonymized = doc.text
+    if labels is not None:
+        labels = set(labels)
 
-    for token in doc:
-        if token.ent_type_ == "":
+    text = doc.text
+    chunks = []
+    pseudonyms = {}
+    position = 0
+    for ent in doc.ents:
+        if labels is not None and ent.label_ not in labels:
             continue
-        start = token.idx
-        stop = token.idx + len(token)
-        anonymized = anonymized[:start] + ("*" * len(token)) + anonymized[stop:]
+        chunks.append(text[position : ent.start_char])
+        chunks.append(get_entity_replacement(ent, strategy, pseudonyms))
+        position = ent.end_char
+    chunks.append(text[position:])
 
-    doc._.anonymized = anonymized
+    doc._.anonymized = "".join(chunks)
 
     return doc
@@ -0,0 +1,246 @@
+"""Opt-in timing and counter instrumentation for the aspect sentiment pipeline.
+
+When enabled (with enable(), or by setting the LA_NLP_INSTRUMENT environment
+variable to 1), the pipeline records the wall time spent in each of its
+stages, along with counters such as the number of keywords found and spans
+scored. Aggregated statistics can be read with get_stats(), or dumped as JSON
+or Prometheus text with to_json() and to_prometheus(). Hooks registered with
+add_hook() are called after every timed stage, e.g. to forward timings to a
+metrics client.
+
+When disabled, timer() returns a shared no-op context manager and count()
+returns immediately, so instrumentation costs next to nothing.
+
+Usage:
+    from la_nlp import instrumentation
+
+    instrumentation.enable()
+    docs = list(make_docs(texts))
+    print(instrumentation.to_prometheus())
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable
+
+ENV_VAR = "LA_NLP_INSTRUMENT"
+
+_enabled = os.environ.get(ENV_VAR, "") not in ("", "0")
+_lock = threading.Lock()
+_stages = {}
+_counters = {}
+_hooks = []
+
+
+class _NullTimer:
+    """Context manager which does nothing, returned by timer() when disabled."""
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    """Context manager recording the wall time of one run of a stage."""
+
+    def __init__(self, stage: str, n_docs: int):
+        self.stage = stage
+        self.n_docs = n_docs
+
+    def __enter__(self) -> "_StageTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        seconds = time.perf_counter() - self.start
+        record(self.stage, seconds, self.n_docs)
+
+
+def enable() -> None:
+    """Enables instrumentation."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Disables instrumentation. Statistics recorded so far are kept."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """Checks whether instrumentation is enabled.
+
+    Returns:
+        bool: True if enabled.
+    """
+    return _enabled
+
+
+def timer(stage: str, n_docs: int = 1) -> _StageTimer | _NullTimer:
+    """Gets a context manager timing a run of a pipeline stage.
+
+    Args:
+        stage (str): Name of the stage, e.g. 'match'.
+        n_docs (int, optional): Number of Docs processed by this run of the
+            stage. Defaults to 1.
+
+    Returns:
+        _StageTimer | _NullTimer: Context manager recording the time spent in
+            its body, or a no-op context manager if instrumentation is disabled.
+    """
+    if not _enabled:
+        return _NULL_TIMER
+    return _StageTimer(stage, n_docs)
+
+
+def record(stage: str, seconds: float, n_docs: int = 1) -> None:
+    """Records a run of a pipeline stage and calls any hooks.
+
+    Args:
+        stage (str): Name of the stage.
+        seconds (float): Wall time of the run.
+        n_docs (int, optional): Number of Docs processed. Defaults to 1.
+    """
+    with _lock:
+        stats = _stages.get(stage)
+        if stats is None:
+            stats = _stages[stage] = {
+                "calls": 0,
+                "docs": 0,
+                "seconds": 0.0,
+                "max_seconds": 0.0,
+            }
+        stats["calls"] += 1
+        stats["docs"] += n_docs
+        stats["seconds"] += seconds
+        if seconds > stats["max_seconds"]:
+            stats["max_seconds"] = seconds
+        hooks = list(_hooks)
+
+    for hook in hooks:
+        hook(stage, seconds, n_docs)
+
+
+def count(counter: str, n: int = 1) -> None:
+    """Adds to a counter, if instrumentation is enabled.
+
+    Args:
+        counter (str): Name of the counter, e.g. 'keywords_found'.
+        n (int, optional): Amount to add. Defaults to 1.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[counter] = _counters.get(counter, 0) + n
+
+
+def add_hook(hook: Callable[[str, float, int], None]) -> None:
+    """Registers a function to be called after every timed stage.
+
+    Hooks are called with the stage name, its wall time in seconds and the
+    number of Docs processed, from the thread that ran the stage.
+
+    Args:
+        hook (Callable[[str, float, int], None]): The function to call.
+    """
+    with _lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[str, float, int], None]) -> None:
+    """Unregisters a hook added by add_hook().
+
+    Args:
+        hook (Callable[[str, float, int], None]): The function to remove.
+
+    Raises:
+        ValueError: Raised if the hook is not registered.
+    """
+    with _lock:
+        _hooks.remove(hook)
+
+
+def reset() -> None:
+    """Clears all recorded statistics. Hooks remain registered."""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+def get_stats() -> dict:
+    """Gets the statistics recorded so far.
+
+    Returns:
+        dict: Dictionary of 'enabled', 'stages' (for each stage, a dictionary of
+            'calls', 'docs', 'seconds', 'max_seconds' and 'seconds_per_doc')
+            and 'counters' (counter name -> value).
+    """
+    with _lock:
+        stages = {
+            stage: {
+                **stats,
+                "seconds_per_doc": stats["seconds"] / stats["docs"]
+                if stats["docs"]
+                else 0.0,
+            }
+            for stage, stats in _stages.items()
+        }
+        counters = dict(_counters)
+    return {"enabled": _enabled, "stages": stages, "counters": counters}
+
+
+def to_json(indent: int | None = None) -> str:
+    """Dumps the statistics recorded so far as JSON.
+
+    Args:
+        indent (int | None, optional): Indentation passed to json.dumps().
+            Defaults to None.
+
+    Returns:
+        str: The statistics returned by get_stats(), as JSON.
+    """
+    return json.dumps(get_stats(), indent=indent)
+
+
+def to_prometheus(prefix: str = "la_nlp") -> str:
+    """Dumps the statistics recorded so far in the Prometheus text format.
+
+    Stage statistics are exported as the counters <prefix>_stage_seconds_total,
+    <prefix>_stage_calls_total and <prefix>_stage_docs_total, labelled by
+    stage, and each counter as <prefix>_<counter>_total.
+
+    Args:
+        prefix (str, optional): Prefix of the metric names. Defaults to
+            'la_nlp'.
+
+    Returns:
+        str: The statistics in the Prometheus text exposition format.
+    """
+    stats = get_stats()
+    lines = []
+    stage_metrics = [
+        ("seconds", "Total wall time spent in each pipeline stage."),
+        ("calls", "Number of runs of each pipeline stage."),
+        ("docs", "Number of Docs processed by each pipeline stage."),
+    ]
+    for key, description in stage_metrics:
+        name = f"{prefix}_stage_{key}_total"
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for stage, stage_stats in stats["stages"].items():
+            lines.append(f'{name}{{stage="{stage}"}} {stage_stats[key]}')
+
+    for counter, value in stats["counters"].items():
+        name = f"{prefix}_{counter}_total"
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -4,100 +4,1194 @@ This module contains a pipeline for performing aspect-based sentiment analysis
 via the spacy NLP package and the VADER sentiment model. The pipeline can be
 called via the make_doc() function, which accepts a string as input and returns
 a spacy Doc object containing a number of attributes useful for this type of
-analysis. See documentation for a list of attributes assigned by this pipeline.
+analysis, or via make_docs() for efficiently processing large collections of
+texts. See documentation for a list of attributes assigned by this pipeline.
 """
 
 import os
-import re
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Iterator
 
-from la_nlp import components, utils
+from la_nlp import (
+    batching,
+    cache,
+    chunking,
+    components,
+    instrumentation,
+    prefiltering,
+    results,
+    sentiment,
+    sharing,
+    taxonomy,
+    utils,
+)
 
 from spacy import load as load_model
 from spacy.language import Language
-from spacy.tokens import Doc
+from spacy.matcher import Matcher
+from spacy.tokens import Doc, Span
+from spacy.util import minibatch
 
-DEFAULT_ASPECTS = utils.get_default_aspects()
+# Name of, or path to, the spacy model used when none is passed explicitly. Can be
+# overridden with the environment variable named by MODEL_ENV_VAR.
+DEFAULT_MODEL = "en_core_web_lg"
+MODEL_ENV_VAR = "LA_NLP_MODEL"
 
-NLP = load_model("en_core_web_lg")
+# Named pipeline profiles. Each profile lists the spacy components excluded when
+# loading a model, and whether the profile supports aspect sentiment analysis
+# ('aspects') and anonymization ('ner'). Components not present in a model are
+# ignored, so profiles work with any of the en_core_web_sm/md/lg models.
+PROFILES = {
+    "absa": {
+        "exclude": ["ner", "textcat", "senter"],
+        "aspects": True,
+        "ner": False,
+    },
+    "absa+anonymize": {
+        "exclude": ["textcat", "senter"],
+        "aspects": True,
+        "ner": True,
+    },
+    "anonymize-only": {
+        "exclude": [
+            "tok2vec",
+            "tagger",
+            "parser",
+            "attribute_ruler",
+            "lemmatizer",
+            "textcat",
+            "senter",
+        ],
+        "aspects": False,
+        "ner": True,
+    },
+}
+
+# Arguments of make_docs() which control how texts are processed, rather than
+# the results
+PIPE_OPTIONS = ("batch_size", "n_process", "parse_cache", "prefilter")
+
+# Models and default aspects are loaded on first use rather than at import, so
+# that importing this module is cheap.
+_MODELS = {}
+_MODELS_LOCK = threading.Lock()
+_DEFAULT_ASPECTS = None
+_BATCHER = None
+
+
+def __getattr__(name: str) -> Any:
+    """Lazily provides the NLP and DEFAULT_ASPECTS module attributes."""
+    if name == "NLP":
+        return get_nlp()
+    if name == "DEFAULT_ASPECTS":
+        return get_default_aspects()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_model_name(model: str | None = None) -> str:
+    """Resolves the name of, or path to, the spacy model to use.
+
+    Args:
+        model (str | None, optional): Explicit model name or path. Defaults to
+            None, in which case the value of the LA_NLP_MODEL environment
+            variable is used if set, or DEFAULT_MODEL if not.
+
+    Returns:
+        str: The model name or path.
+    """
+    if model is not None:
+        return model
+    return os.environ.get(MODEL_ENV_VAR, DEFAULT_MODEL)
+
+
+def get_profile(profile: str) -> dict:
+    """Gets a pipeline profile by name.
+
+    Args:
+        profile (str): Name of the profile. See PROFILES.
+
+    Raises:
+        ValueError: Raised if there is no profile with the name.
+
+    Returns:
+        dict: Dictionary of 'exclude' (components excluded at load time),
+            'aspects' and 'ner' (whether aspect sentiment analysis and
+            anonymization are supported).
+    """
+    if profile not in PROFILES:
+        raise ValueError(
+            f"Unknown profile {profile!r}. Profiles are: {', '.join(PROFILES)}"
+        )
+    return PROFILES[profile]
+
+
+def get_nlp(model: str | None = None, profile: str | None = None) -> Language:
+    """Gets the spacy pipeline for a model, loading it on first use.
+
+    Each model is loaded once per process and profile, with the aspect
+    sentiment component added to the end of its pipeline, and reused by all
+    subsequent calls.
+
+    Args:
+        model (str | None, optional): Name of, or path to, the spacy model to
+            load. Defaults to None, in which case get_model_name() is used.
+        profile (str | None, optional): Name of the profile (see PROFILES)
+            whose components are excluded when loading the model. Defaults to
+            None, in which case the full pipeline is loaded.
+
+    Raises:
+        ValueError: Raised if there is no profile with the name passed.
+
+    Returns:
+        Language: The loaded spacy pipeline.
+    """
+    model = get_model_name(model)
+    exclude = get_profile(profile)["exclude"] if profile is not None else []
+    key = (model, profile)
+    nlp = _MODELS.get(key)
+    if nlp is None:
+        with _MODELS_LOCK:
+            nlp = _MODELS.get(key)
+            if nlp is None:
+                nlp = load_model(model, exclude=exclude)
+                nlp.add_pipe("aspect_sentiment_pipe")
+                _MODELS[key] = nlp
+    return nlp
+
+
+def get_default_aspects() -> dict:
+    """Gets the default aspects at la_nlp/data/aspects.toml, loading on first use.
+
+    Returns:
+        dict: Dictionary of aspects and corresponding keywords.
+    """
+    global _DEFAULT_ASPECTS
+    if _DEFAULT_ASPECTS is None:
+        _DEFAULT_ASPECTS = utils.get_default_aspects()
+    return _DEFAULT_ASPECTS
+
+
+def get_pipe_config(
+    aspects: dict | str | None = None,
+    parent_span_min_length: int = 7,
+    anonymize: bool = False,
+    nlp: Language | None = None,
+    sentiment_backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
+    anonymize_labels: Iterable[str] | None = None,
+    anonymize_strategy: str | Callable[[Span], str] = "mask",
+    profile: str | None = None,
+    similarity_threshold: float | None = None,
+) -> tuple[dict, list]:
+    """Builds the component config and disabled components for a pipeline run.
+
+    Shared by make_doc() and make_docs() so that both entry points validate and
+    interpret their options identically.
+
+    Args:
+        aspects (dict | str | None, optional): The aspects to use for
+            aspect-based sentiment analysis, or a path to a .toml file
+            containing them. Defaults to default aspects at
+            la_nlp/data/aspects.toml.
+        parent_span_min_length (int, optional): Minimum length from which to
+            generate token parent spans. Defaults to 7.
+        anonymize (bool, optional): Indicates whether or not to set the
+            'anonymized' Doc attribute. Defaults to False.
+        nlp (Language | None, optional): The spacy pipeline the config is for.
+            Defaults to None, in which case get_nlp() is used.
+        sentiment_backend (str | sentiment.SentimentBackend, optional): The
+            sentiment backend, or name of a registered backend, to score spans
+            with. Defaults to 'vader'.
+        anonymize_labels (Iterable[str] | None, optional): Entity labels to
+            anonymize. Defaults to None, in which case all entities are.
+        anonymize_strategy (str | Callable[[Span], str], optional): How to
+            replace anonymized entities. Defaults to 'mask'.
+        profile (str | None, optional): Name of the profile nlp was loaded
+            with. Profiles not supporting aspect sentiment analysis always
+            anonymize. Defaults to None.
+        similarity_threshold (float | None, optional): If set, tokens whose
+            word vectors have at least this cosine similarity to a keyword's
+            are also matched. Defaults to None, i.e. exact matches only.
+
+    Raises:
+        ValueError: Raised if value passed to aspects is not a file path or
+            a dictionary, if no sentiment backend is registered under the
+            name passed to sentiment_backend, if anonymize is True with a
+            profile which does not support anonymization, or if
+            similarity_threshold is not in (0, 1] or no keyword has a vector.
+
+    Returns:
+        tuple[dict, list]: The 'aspect_sentiment_pipe' component config and the
+            list of spacy components to disable.
+    """
+
+    if nlp is None:
+        nlp = get_nlp(profile=profile)
+
+    analyze_aspects = True
+    if profile is not None:
+        profile_cfg = get_profile(profile)
+        analyze_aspects = profile_cfg["aspects"]
+        if analyze_aspects == False:
+            anonymize = True
+        elif anonymize == True and profile_cfg["ner"] == False:
+            raise ValueError(f"Profile {profile!r} does not support anonymization")
+
+    if aspects is None:
+        aspect_index = taxonomy.compile_aspects(get_default_aspects())
+    elif isinstance(aspects, (dict, MappingProxyType)):
+        aspect_index = taxonomy.compile_aspects(aspects)
+    elif isinstance(aspects, str):
+        # Files are parsed once and only read again when they change
+        try:
+            aspect_index = taxonomy.load_aspects(aspects)
+        except OSError:
+            raise ValueError("Aspects must be either a dict or path to .toml file")
+    else:
+        raise ValueError("Aspects must be either a dict or path to .toml file")
+
+    vector_matcher = None
+    if similarity_threshold is not None:
+        vector_matcher = aspect_index.get_vector_matcher(nlp, similarity_threshold)
+
+    cfg = {
+        "aspect_index": aspect_index,
+        "phrase_matcher": aspect_index.get_phrase_matcher(nlp),
+        "vector_matcher": vector_matcher,
+        "parent_span_min_length": parent_span_min_length,
+        "anonymize": anonymize,
+        "sentiment_backend": sentiment.get_backend(sentiment_backend),
+        "anonymize_labels": anonymize_labels,
+        "anonymize_strategy": anonymize_strategy,
+        "analyze_aspects": analyze_aspects,
+    }
+
+    disable = ["textcat"]
+    if anonymize == False:
+        disable.append("ner")
+
+    return cfg, disable
 
 
 def make_doc(
     text: str,
-    aspects: dict | str = DEFAULT_ASPECTS,
+    aspects: dict | str | None = None,
     parent_span_min_length: int = 7,
     anonymize: bool = False,
+    model: str | None = None,
+    sentiment_backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
+    anonymize_labels: Iterable[str] | None = None,
+    anonymize_strategy: str | Callable[[Span], str] = "mask",
+    profile: str | None = None,
+    similarity_threshold: float | None = None,
 ) -> Doc:
     """Generates a spacy Doc object via the aspect sentiment pipeline.
 
     Args:
         text (str): The text to process.
-        aspects (dict | str, optional): The aspects to use for aspect-based
-            sentiment analysis. Can be either a dictionary of aspects with
-            corresponding arrays of keywords, or a path to a .toml file
-            containing the aspect-keyword mappings. Defaults to default aspects
-            at la_nlp/data/aspects.toml.
+        aspects (dict | str | None, optional): The aspects to use for
+            aspect-based sentiment analysis. Can be either a dictionary of
+            aspects with corresponding arrays of keywords, or a path to a .toml
+            file containing the aspect-keyword mappings. Defaults to default
+            aspects at la_nlp/data/aspects.toml.
         parent_span_min_length (int, optional): Minimum length from which to
             generate token parent spans. Defaults to 7.
         anonymize (bool, optional): Indicates whether or not to set the 'anonymized'
             Doc attribute. Defaults to False.
+        model (str | None, optional): Name of, or path to, the spacy model to
+            use. Defaults to the LA_NLP_MODEL environment variable if set, or
+            en_core_web_lg if not.
+        sentiment_backend (str | sentiment.SentimentBackend, optional): The
+            sentiment backend, or name of a registered backend (see
+            la_nlp.sentiment), to score spans with. Defaults to 'vader'.
+        anonymize_labels (Iterable[str] | None, optional): Entity labels to
+            anonymize if anonymize is True, e.g. ['PERSON', 'ORG']. Defaults to
+            None, in which case all named entities are anonymized.
+        anonymize_strategy (str | Callable[[Span], str], optional): How to
+            replace anonymized entities: 'mask' (replace characters with '*'),
+            'label' (e.g. '[PERSON]'), 'pseudonym' (e.g. 'PERSON_1', consistent
+            within the Doc) or a function taking the entity Span and returning
+            its replacement. Defaults to 'mask'.
+        profile (str | None, optional): Name of a profile (see PROFILES) whose
+            unneeded spacy components are excluded when loading the model:
+            'absa', 'absa+anonymize' or 'anonymize-only'. With 'anonymize-only',
+            only the 'anonymized' attribute is set. Defaults to None, in which
+            case the full model is loaded.
+        similarity_threshold (float | None, optional): If set, tokens which
+            are not keywords are also matched to the aspect of the keyword
+            their word vector is most similar to, if their cosine similarity
+            is at least this threshold (e.g. 'lectures' or 'prof' to
+            'lecturer'). Requires a model with word vectors, such as
+            en_core_web_lg. Defaults to None, i.e. only keywords are matched.
 
     Raises:
         ValueError: Raised if value passed to aspects is not a file path or
-            a dictionary.
+            a dictionary, if sentiment_backend is not a registered backend, if
+            the profile is unknown or does not support anonymization, or if
+            similarity_threshold is not in (0, 1] or no keyword has a vector.
 
     Returns:
         Doc: Processed Doc object from input text containing attributes
             generated by the aspect_sentiment pipeline.
     """
+    nlp = get_nlp(model, profile)
+    cfg, disable = get_pipe_config(
+        aspects,
+        parent_span_min_length,
+        anonymize,
+        nlp,
+        sentiment_backend,
+        anonymize_labels,
+        anonymize_strategy,
+        profile,
+        similarity_threshold,
+    )
 
-    def except_multi_word_expressions(keywords: list) -> None:
-        """Creates exception for multi-word expression keywords to not be tokenized.
+    return nlp(text, component_cfg={"aspect_sentiment_pipe": cfg}, disable=disable)
 
-        Checks for keywords containing characters used for token splitting. For each
-        keyword containing a splitter, adds the keyword and its pluralized form to the
-        spacy tokenizer as an exception.
-        """
-        rules = NLP.tokenizer.rules
-        regex = r"[-\s/']"
-        for keyword in keywords:
-            if keyword in rules:
-                continue
-            if re.search(regex, keyword):
-                rules[keyword] = [{65: keyword}]
-                rules[keyword + "s"] = [{65: keyword + "s"}]
-        NLP.tokenizer.rules = rules
-
-    if isinstance(aspects, str) and os.path.isfile(aspects):
-        aspects = utils.get_aspects_from_file(aspects)
-    elif not isinstance(aspects, dict):
-        raise ValueError("Aspects must be either a dict or path to .toml file")
 
-    keywords = utils.get_keywords_from_aspects(aspects)
-    except_multi_word_expressions(keywords)
+def make_docs(
+    texts: Iterable[str] | Iterable[tuple[str, Any]],
+    aspects: dict | str | None = None,
+    parent_span_min_length: int = 7,
+    anonymize: bool = False,
+    batch_size: int = 1000,
+    n_process: int = 1,
+    as_tuples: bool = False,
+    model: str | None = None,
+    sentiment_backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
+    anonymize_labels: Iterable[str] | None = None,
+    anonymize_strategy: str | Callable[[Span], str] = "mask",
+    parse_cache: str | cache.ParseCache | None = None,
+    profile: str | None = None,
+    similarity_threshold: float | None = None,
+    prefilter: bool | prefiltering.KeywordPrefilter = False,
+) -> Iterator[Doc] | Iterator[tuple[Doc, Any]]:
+    """Generates spacy Doc objects for a stream of texts via the pipeline.
+
+    Batched counterpart to make_doc(), built on spacy's Language.pipe(). Texts
+    are consumed and Docs are yielded one batch at a time, so memory use stays
+    flat regardless of the size of the input.
 
-    cfg = {
-        "aspect_sentiment_pipe": {
-            "aspects": aspects,
-            "keywords": keywords,
-            "parent_span_min_length": parent_span_min_length,
-            "anonymize": anonymize,
+    Parsing is done by Language.pipe() (across n_process worker processes if
+    requested), while the aspect sentiment components are always run in the
+    calling process. This is necessary as the custom attributes hold Token and
+    Span objects, which cannot be sent back from worker processes. The spans of
+    each batch are scored by the sentiment backend in a single call. Workers
+    map the model's vectors file rather than each holding a copy of the
+    vectors (see la_nlp.sharing).
+
+    If parse_cache is passed, parsed Docs are stored in and loaded from an
+    on-disk cache (see la_nlp.cache.ParseCache), so that re-running over the
+    same texts with the same model only runs the aspect sentiment components.
+
+    Args:
+        texts (Iterable[str] | Iterable[tuple[str, Any]]): The texts to process.
+            If as_tuples is True, should instead be (text, context) tuples.
+        aspects (dict | str | None, optional): The aspects to use for
+            aspect-based sentiment analysis. See make_doc(). Defaults to default
+            aspects at la_nlp/data/aspects.toml.
+        parent_span_min_length (int, optional): Minimum length from which to
+            generate token parent spans. Defaults to 7.
+        anonymize (bool, optional): Indicates whether or not to set the
+            'anonymized' Doc attribute. Defaults to False.
+        batch_size (int, optional): Number of texts to buffer per batch.
+            Defaults to 1000.
+        n_process (int, optional): Number of processes to parse with. Set to -1
+            to use all available CPUs. Defaults to 1.
+        as_tuples (bool, optional): Whether texts are (text, context) tuples,
+            e.g. a text and its row ID. If True, (Doc, context) tuples are
+            yielded. Defaults to False.
+        model (str | None, optional): Name of, or path to, the spacy model to
+            use. See make_doc().
+        sentiment_backend (str | sentiment.SentimentBackend, optional): The
+            sentiment backend to score spans with. See make_doc().
+        anonymize_labels (Iterable[str] | None, optional): Entity labels to
+            anonymize. See make_doc().
+        anonymize_strategy (str | Callable[[Span], str], optional): How to
+            replace anonymized entities. See make_doc().
+        parse_cache (str | cache.ParseCache | None, optional): A ParseCache,
+            or path to the directory of one, to load and store parsed Docs.
+            Defaults to None, in which case every text is parsed.
+        profile (str | None, optional): Name of a profile whose unneeded
+            components are excluded when loading the model. See make_doc().
+        similarity_threshold (float | None, optional): Minimum similarity of
+            a token to a keyword for it to be matched by its word vector. See
+            make_doc(). Defaults to None.
+        prefilter (bool | prefiltering.KeywordPrefilter, optional): Whether to
+            skip parsing texts which cannot contain any keywords, as decided
+            from their tokens alone (see la_nlp.prefiltering). Skipped texts
+            are only tokenized, so their Docs have no tags, parse or entities.
+            A KeywordPrefilter may be passed to read its skip rate afterwards.
+            Cannot be used with anonymize. Defaults to False.
+
+    Raises:
+        ValueError: Raised if value passed to aspects is not a file path or
+            a dictionary, if sentiment_backend is not a registered backend, if
+            the profile is unknown or does not support anonymization, if
+            similarity_threshold is not in (0, 1] or no keyword has a vector,
+            or if prefilter is used with anonymize or similarity_threshold.
+
+    Returns:
+        Iterator[Doc] | Iterator[tuple[Doc, Any]]: Generator of processed Doc
+            objects, in input order, or (Doc, context) tuples if as_tuples is
+            True.
+    """
+
+    # Config is built eagerly so that invalid aspects raise at call time rather
+    # than on the first iteration of the returned generator.
+    nlp = get_nlp(model, profile)
+    cfg, disable = get_pipe_config(
+        aspects,
+        parent_span_min_length,
+        anonymize,
+        nlp,
+        sentiment_backend,
+        anonymize_labels,
+        anonymize_strategy,
+        profile,
+        similarity_threshold,
+    )
+
+    return pipe_docs(
+        nlp,
+        cfg,
+        disable,
+        texts,
+        as_tuples,
+        batch_size,
+        n_process,
+        parse_cache,
+        prefilter,
+    )
+
+
+def pipe_docs(
+    nlp: Language,
+    cfg: dict,
+    disable: list,
+    texts: Iterable[str] | Iterable[tuple[str, Any]],
+    as_tuples: bool = False,
+    batch_size: int = 1000,
+    n_process: int = 1,
+    parse_cache: str | cache.ParseCache | None = None,
+    prefilter: bool | prefiltering.KeywordPrefilter = False,
+) -> Iterator[Doc] | Iterator[tuple[Doc, Any]]:
+    """Parses a stream of texts and runs the aspect sentiment components on them.
+
+    Should not be called publically. Shared by make_docs() and
+    AspectSentimentPipeline.pipe(), which build cfg and disable with
+    get_pipe_config(). Neither is modified.
+    """
+
+    def analyze(docs: Iterator, as_tuples: bool) -> Iterator:
+        """Runs the aspect sentiment components over parsed Docs, batch by batch."""
+        batches = iter(minibatch(docs, size=batch_size))
+        while True:
+            # Docs are parsed lazily, so waiting on a batch is time spent parsing
+            start = time.perf_counter()
+            batch = next(batches, None)
+            if batch is None:
+                break
+            if instrumentation.is_enabled():
+                instrumentation.record("parse", time.perf_counter() - start, len(batch))
+
+            if as_tuples == True:
+                batch_docs = aspect_sentiment_batch([doc for doc, _ in batch], **cfg)
+                yield from zip(batch_docs, [context for _, context in batch])
+            else:
+                yield from aspect_sentiment_batch(batch, **cfg)
+
+    def parse(texts: Iterable, as_tuples: bool) -> Iterator:
+        """Parses texts with the pipeline, or loads them from the parse cache."""
+        if parse_cache is None:
+            return nlp.pipe(
+                texts,
+                as_tuples=as_tuples,
+                batch_size=batch_size,
+                n_process=n_process,
+                disable=disable,
+            )
+        return parse_cache.pipe(
+            nlp,
+            texts,
+            as_tuples=as_tuples,
+            batch_size=batch_size,
+            n_process=n_process,
+            disable=disable,
+        )
+
+    def skip(doc: Doc) -> Doc:
+        """Sets the attributes of a tokenized Doc containing no keywords."""
+        # The phrase matcher needs lemmas, which tokenized Docs do not have
+        return aspect_sentiment_batch([doc], **{**cfg, "phrase_matcher": None})[0]
+
+    disable = [*disable, "aspect_sentiment_pipe"]
+    if n_process != 1 and sharing.is_enabled():
+        # Workers map the model's vectors file rather than each copying it
+        sharing.share_vectors(nlp)
+    if parse_cache is not None and not isinstance(parse_cache, cache.ParseCache):
+        parse_cache = cache.ParseCache(parse_cache)
+
+    if prefilter is False or prefilter is None:
+        return analyze(parse(texts, as_tuples), as_tuples)
+
+    if cfg["anonymize"] == True:
+        raise ValueError("prefilter cannot be used with anonymize, which needs NER")
+    if cfg["vector_matcher"] is not None:
+        raise ValueError("prefilter cannot be used with similarity_threshold")
+    if prefilter is True:
+        prefilter = prefiltering.get_prefilter(cfg["aspect_index"], nlp)
+    elif prefilter.aspect_index is not cfg["aspect_index"] or prefilter.nlp is not nlp:
+        raise ValueError("prefilter was built for different aspects or model")
+
+    return prefilter.pipe(
+        texts,
+        lambda items: analyze(parse(items, True), True),
+        skip,
+        as_tuples,
+    )
+
+
+def make_results(
+    texts: Iterable[str] | Iterable[tuple[str, Any]],
+    as_tuples: bool = False,
+    result_cache: cache.ResultCache | None = None,
+    **kwargs,
+) -> Iterator[results.AspectSentimentResult]:
+    """Generates compact, detached results for a stream of texts.
+
+    Like make_docs(), but yields an AspectSentimentResult (see la_nlp.results)
+    for each text instead of a Doc. Each Doc is released as soon as its result
+    has been copied out of it, so results for very many texts can be kept in
+    memory at a few hundred bytes each.
+
+    If result_cache is passed, results of texts already processed with the
+    same model, aspects and options are taken from the cache rather than
+    computed again, and duplicate texts within a batch are processed once.
+
+    Args:
+        texts (Iterable[str] | Iterable[tuple[str, Any]]): The texts to process.
+            If as_tuples is True, should instead be (text, row ID) tuples.
+        as_tuples (bool, optional): Whether texts are (text, row ID) tuples. If
+            True, the row ID is stored as the id of each result. Defaults to
+            False.
+        result_cache (cache.ResultCache | None, optional): Cache of results to
+            use. Defaults to None.
+        **kwargs: Other arguments are passed to make_docs().
+
+    Raises:
+        ValueError: Raised if value passed to aspects is not a file path or
+            a dictionary, or if sentiment_backend is not a registered backend.
+
+    Returns:
+        Iterator[results.AspectSentimentResult]: Generator of results, in input
+            order.
+    """
+    if result_cache is not None:
+        pipe_kwargs = {
+            name: kwargs.pop(name) for name in PIPE_OPTIONS if name in kwargs
         }
-    }
+        pipeline = AspectSentimentPipeline(**kwargs)
+        return pipeline.make_results(texts, as_tuples, result_cache, **pipe_kwargs)
+
+    def detach(docs: Iterator) -> Iterator[results.AspectSentimentResult]:
+        """Copies results out of Docs, which are then freed."""
+        aspect_names = None
+        for item in docs:
+            doc, row_id = item if as_tuples == True else (item, None)
+            if aspect_names is None:
+                aspect_names = results.get_aspect_names(doc._.aspect_sentiments or {})
+            yield results.from_doc(doc, row_id, aspect_names)
+
+    return detach(make_docs(texts, as_tuples=as_tuples, **kwargs))
 
-    disable = ["textcat"]
-    if anonymize == False:
-        disable.append("ner")
 
-    return NLP(text, component_cfg=cfg, disable=disable)
+def make_result(
+    text: str,
+    result_cache: cache.ResultCache | None = None,
+    **kwargs,
+) -> results.AspectSentimentResult:
+    """Generates a compact, detached result for a single text.
+
+    Args:
+        text (str): The text to process.
+        result_cache (cache.ResultCache | None, optional): Cache of results to
+            use. See make_results(). Defaults to None.
+        **kwargs: Other arguments are passed to make_doc().
+
+    Raises:
+        ValueError: Raised if value passed to aspects is not a file path or
+            a dictionary, or if sentiment_backend is not a registered backend.
+
+    Returns:
+        results.AspectSentimentResult: The result. See la_nlp.results.
+    """
+    if result_cache is not None:
+        return next(make_results([text], result_cache=result_cache, **kwargs))
+    return results.from_doc(make_doc(text, **kwargs))
+
+
+def make_long_results(
+    texts: Iterable[str] | Iterable[tuple[str, Any]],
+    as_tuples: bool = False,
+    max_chunk_chars: int = chunking.DEFAULT_MAX_CHUNK_CHARS,
+    **kwargs,
+) -> Iterator[results.AspectSentimentResult]:
+    """Generates results for a stream of possibly very long texts, in chunks.
+
+    Like make_results(), but each text is first split into chunks of at most
+    max_chunk_chars characters on paragraph, sentence or word boundaries (see
+    la_nlp.chunking), so that texts longer than the model's max_length can be
+    processed, and memory use and latency per Doc stay bounded. Chunks of all
+    texts are processed as one stream by make_docs(), in parallel if
+    n_process is passed, and the results of each text's chunks are merged into
+    a single result. Aspect sentiments are weighted by the number of keywords
+    in each chunk, and keyword offsets refer to the whole text.
+
+    Args:
+        texts (Iterable[str] | Iterable[tuple[str, Any]]): The texts to process.
+            If as_tuples is True, should instead be (text, row ID) tuples.
+        as_tuples (bool, optional): Whether texts are (text, row ID) tuples. If
+            True, the row ID is stored as the id of each result. Defaults to
+            False.
+        max_chunk_chars (int, optional): Maximum length of a chunk in
+            characters. Defaults to chunking.DEFAULT_MAX_CHUNK_CHARS.
+        **kwargs: Other arguments are passed to make_docs().
+
+    Raises:
+        ValueError: Raised if value passed to aspects is not a file path or
+            a dictionary, if sentiment_backend is not a registered backend, or
+            if max_chunk_chars is less than 1.
+
+    Returns:
+        Iterator[results.AspectSentimentResult]: Generator of results, one per
+            text, in input order.
+    """
+    if max_chunk_chars < 1:
+        raise ValueError("max_chunk_chars must be at least 1")
+
+    def get_chunks() -> Iterator[tuple[str, tuple]]:
+        """Yields (chunk, (chunk start, number of chunks, row ID)) tuples."""
+        for item in texts:
+            text, row_id = item if as_tuples == True else (item, None)
+            chunks = chunking.split_text(text, max_chunk_chars)
+            for start, end in chunks:
+                yield (text[start:end], (start, len(chunks), row_id))
+
+    def merge(chunk_results: Iterator) -> Iterator[results.AspectSentimentResult]:
+        """Merges the results of each text's consecutive chunks."""
+        pending = []
+        for result in chunk_results:
+            pending.append(result)
+            _, n_chunks, row_id = result.id
+            if len(pending) == n_chunks:
+                starts = [pending_result.id[0] for pending_result in pending]
+                yield chunking.merge_results(pending, starts, row_id)
+                pending = []
+
+    return merge(make_results(get_chunks(), as_tuples=True, **kwargs))
+
+
+def make_long_result(text: str, **kwargs) -> results.AspectSentimentResult:
+    """Generates a result for a single, possibly very long, text, in chunks.
+
+    Args:
+        text (str): The text to process.
+        **kwargs: Other arguments are passed to make_long_results().
+
+    Raises:
+        ValueError: Raised if value passed to aspects is not a file path or
+            a dictionary, or if sentiment_backend is not a registered backend.
+
+    Returns:
+        results.AspectSentimentResult: The merged result. See la_nlp.results.
+    """
+    return next(make_long_results([text], **kwargs))
+
+
+def make_docs_batch(texts: list[str], options: dict) -> list[Doc]:
+    """Processes one batch of texts for a MicroBatcher.
+
+    Args:
+        texts (list[str]): The texts to process.
+        options (dict): Keyword arguments passed to make_docs(). Any
+            batch_size is ignored, as the whole batch is processed at once.
+
+    Returns:
+        list[Doc]: Processed Doc objects, in input order.
+    """
+    options = {name: value for name, value in options.items() if name != "batch_size"}
+    return list(make_docs(texts, batch_size=len(texts), **options))
+
+
+def get_batcher() -> batching.MicroBatcher:
+    """Gets the shared MicroBatcher used by amake_doc() by default.
+
+    Returns:
+        batching.MicroBatcher: The shared batcher, with the default maximum
+            batch size and wait.
+    """
+    global _BATCHER
+    if _BATCHER is None:
+        _BATCHER = batching.MicroBatcher(make_docs_batch)
+    return _BATCHER
+
+
+async def amake_doc(
+    text: str,
+    batcher: batching.MicroBatcher | None = None,
+    **kwargs,
+) -> Doc:
+    """Generates a spacy Doc object via the pipeline, without blocking.
+
+    Async counterpart to make_doc() for serving concurrent requests. Calls made
+    at about the same time are coalesced into a single make_docs() batch (see
+    la_nlp.batching), which is processed in an executor while the event loop
+    keeps running. Batches are processed one at a time, so requests arriving
+    under load queue up and are processed together in the next batch.
+
+    Args:
+        text (str): The text to process.
+        batcher (batching.MicroBatcher | None, optional): The batcher to submit
+            the text to, e.g. one with a larger max_batch_size or max_wait,
+            created with make_docs_batch() as its process function. Defaults
+            to None, in which case the batcher returned by get_batcher() is
+            used.
+        **kwargs: Other arguments are passed to make_docs(). Only calls with
+            equal arguments are processed in the same batch.
+
+    Raises:
+        ValueError: Raised if value passed to aspects is not a file path or
+            a dictionary, or if sentiment_backend is not a registered backend.
+
+    Returns:
+        Doc: Processed Doc object from input text.
+    """
+    if batcher is None:
+        batcher = get_batcher()
+    return await batcher.submit(text, **kwargs)
+
+
+async def amake_result(
+    text: str,
+    batcher: batching.MicroBatcher | None = None,
+    **kwargs,
+) -> results.AspectSentimentResult:
+    """Generates a compact, detached result for a text, without blocking.
+
+    Args:
+        text (str): The text to process.
+        batcher (batching.MicroBatcher | None, optional): The batcher to submit
+            the text to. See amake_doc().
+        **kwargs: Other arguments are passed to make_docs().
+
+    Raises:
+        ValueError: Raised if value passed to aspects is not a file path or
+            a dictionary, or if sentiment_backend is not a registered backend.
+
+    Returns:
+        results.AspectSentimentResult: The result. See la_nlp.results.
+    """
+    return results.from_doc(await amake_doc(text, batcher, **kwargs))
+
+
+def reanalyze(
+    docs: Doc | Iterable[Doc],
+    aspects: dict | str | None = None,
+    parent_span_min_length: int = 7,
+    anonymize: bool = False,
+    model: str | None = None,
+    sentiment_backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
+    anonymize_labels: Iterable[str] | None = None,
+    anonymize_strategy: str | Callable[[Span], str] = "mask",
+    batch_size: int = 1000,
+    similarity_threshold: float | None = None,
+    profile: str | None = None,
+) -> Doc | list[Doc]:
+    """Re-runs the aspect sentiment components on already processed Docs.
+
+    Clears all attributes set by the pipeline, then sets them again with the
+    new options, without parsing the texts again. Useful for trying different
+    aspects or parent span lengths on the same Docs.
+
+    Anonymization requires the Docs to have been processed with named
+    entities, i.e. by make_doc() or make_docs() with anonymize=True.
+
+    Args:
+        docs (Doc | Iterable[Doc]): The Doc, or Docs, to re-analyze, e.g. as
+            returned by make_doc() or make_docs().
+        aspects (dict | str | None, optional): The aspects to use. See
+            make_doc(). Defaults to default aspects at la_nlp/data/aspects.toml.
+        parent_span_min_length (int, optional): Minimum length from which to
+            generate token parent spans. Defaults to 7.
+        anonymize (bool, optional): Indicates whether or not to set the
+            'anonymized' Doc attribute. Defaults to False.
+        model (str | None, optional): Name of, or path to, the spacy model the
+            Docs were processed with. See make_doc().
+        sentiment_backend (str | sentiment.SentimentBackend, optional): The
+            sentiment backend to score spans with. See make_doc().
+        anonymize_labels (Iterable[str] | None, optional): Entity labels to
+            anonymize. See make_doc().
+        anonymize_strategy (str | Callable[[Span], str], optional): How to
+            replace anonymized entities. See make_doc().
+        batch_size (int, optional): Number of Docs whose spans are scored by
+            the sentiment backend at once. Defaults to 1000.
+        similarity_threshold (float | None, optional): Minimum similarity of
+            a token to a keyword for it to be matched by its word vector. See
+            make_doc(). Defaults to None.
+        profile (str | None, optional): Name of the profile the Docs were
+            processed with, so that the model is not loaded again without it.
+            See make_doc(). Defaults to None.
+
+    Raises:
+        ValueError: Raised if value passed to aspects is not a file path or
+            a dictionary, if sentiment_backend is not a registered backend, or
+            if the profile is unknown or does not support anonymization.
+
+    Returns:
+        Doc | list[Doc]: The re-analyzed Doc, or list of Docs if an iterable
+            was passed. Docs are modified in place.
+    """
+    single = isinstance(docs, Doc)
+    docs = [docs] if single else list(docs)
+
+    cfg, _ = get_pipe_config(
+        aspects,
+        parent_span_min_length,
+        anonymize,
+        get_nlp(model, profile),
+        sentiment_backend,
+        anonymize_labels,
+        anonymize_strategy,
+        profile,
+        similarity_threshold,
+    )
+
+    for batch in minibatch(docs, size=batch_size):
+        for doc in batch:
+            components.reset_extensions(doc)
+        aspect_sentiment_batch(batch, **cfg)
+
+    return docs[0] if single else docs
+
+
+def sweep_parent_span_lengths(
+    docs: Doc | Iterable[Doc],
+    min_lengths: Iterable[int],
+    aspects: dict | str | None = None,
+    model: str | None = None,
+    sentiment_backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
+    batch_size: int = 1000,
+    profile: str | None = None,
+) -> dict | list[dict]:
+    """Computes aspect sentiments of processed Docs for several span lengths.
+
+    Intended for calibrating parent_span_min_length, e.g. against hand-labelled
+    sentiments. Keywords are matched once per Doc and each Doc's dependency
+    tree is walked once for all lengths, with the parent spans of each batch
+    scored in a single call to the sentiment backend.
+
+    The Docs' keyword attributes ('contains_aspect', 'aspects', 'keywords' and
+    'Token._.aspect') are reset and set using the given aspects, while all
+    other attributes are cleared.
+
+    Args:
+        docs (Doc | Iterable[Doc]): The Doc, or Docs, to compute sentiments
+            for, e.g. as returned by make_doc() or make_docs().
+        min_lengths (Iterable[int]): The values of parent_span_min_length to
+            compute aspect sentiments for.
+        aspects (dict | str | None, optional): The aspects to use. See
+            make_doc(). Defaults to default aspects at la_nlp/data/aspects.toml.
+        model (str | None, optional): Name of, or path to, the spacy model the
+            Docs were processed with. See make_doc().
+        sentiment_backend (str | sentiment.SentimentBackend, optional): The
+            sentiment backend to score spans with. See make_doc().
+        batch_size (int, optional): Number of Docs whose spans are scored by
+            the sentiment backend at once. Defaults to 1000.
+        profile (str | None, optional): Name of the profile the Docs were
+            processed with, so that the model is not loaded again without it.
+            See make_doc(). Defaults to None.
+
+    Raises:
+        ValueError: Raised if value passed to aspects is not a file path or
+            a dictionary, if sentiment_backend is not a registered backend, or
+            if the profile is unknown.
+
+    Returns:
+        dict | list[dict]: For each Doc, a dictionary mapping each min_length to
+            the aspect sentiments (as in 'Doc._.aspect_sentiments') the Doc
+            would have with that parent_span_min_length. A single dictionary is
+            returned if a single Doc was passed.
+    """
+    single = isinstance(docs, Doc)
+    docs = [docs] if single else docs
+    min_lengths = list(min_lengths)
+
+    cfg, _ = get_pipe_config(
+        aspects,
+        nlp=get_nlp(model, profile),
+        sentiment_backend=sentiment_backend,
+    )
+    aspect_index = cfg["aspect_index"]
+
+    results = []
+    for batch in minibatch(docs, size=batch_size):
+        for doc in batch:
+            components.reset_extensions(doc)
+            components.set_doc_aspect_matches(doc, aspect_index, cfg["phrase_matcher"])
+        results.extend(
+            components.get_batch_aspect_sentiment_sweep(
+                batch,
+                aspect_index.aspects,
+                min_lengths,
+                cfg["sentiment_backend"],
+            )
+        )
+
+    return results[0] if single else results
+
+
+class AspectSentimentPipeline:
+    """An aspect sentiment pipeline built once for a taxonomy and set of options.
+
+    make_doc() and make_docs() resolve their options (loading aspect files,
+    compiling the taxonomy, looking up the sentiment backend) on every call.
+    A pipeline does this once, when created, and keeps the resulting config,
+    so calling it only parses and analyzes the text. Pipelines are immutable,
+    and share the spacy model loaded by get_nlp() rather than loading their
+    own, so any number of pipelines (e.g. one per department's taxonomy) can
+    be used concurrently from many threads in a single process. Processing a
+    text does not modify the model's vocab or vectors, and the only state
+    shared between calls, such as the taxonomy's memo of lemma lookups, is
+    bounded in size.
+
+    Attributes:
+        nlp (Language): The shared spacy pipeline used for parsing.
+        aspect_index (taxonomy.AspectIndex): The compiled taxonomy.
+        config (MappingProxyType): Read-only 'aspect_sentiment_pipe' config.
+        disable (tuple[str, ...]): Spacy components not run.
+    """
+
+    __slots__ = ("nlp", "aspect_index", "config", "disable")
+
+    def __init__(
+        self,
+        aspects: dict | str | None = None,
+        parent_span_min_length: int = 7,
+        anonymize: bool = False,
+        model: str | None = None,
+        sentiment_backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
+        anonymize_labels: Iterable[str] | None = None,
+        anonymize_strategy: str | Callable[[Span], str] = "mask",
+        profile: str | None = None,
+        similarity_threshold: float | None = None,
+    ):
+        """Builds the pipeline, loading the spacy model if not already loaded.
+
+        Args:
+            aspects (dict | str | None, optional): The aspects to use, or path
+                to a .toml file containing them. Copied, so later changes to a
+                dictionary passed here do not affect the pipeline. Defaults to
+                default aspects at la_nlp/data/aspects.toml.
+            parent_span_min_length (int, optional): Minimum length from which
+                to generate token parent spans. Defaults to 7.
+            anonymize (bool, optional): Indicates whether or not to set the
+                'anonymized' Doc attribute. Defaults to False.
+            model (str | None, optional): Name of, or path to, the spacy model
+                to use. See make_doc().
+            sentiment_backend (str | sentiment.SentimentBackend, optional): The
+                sentiment backend to score spans with. See make_doc().
+            anonymize_labels (Iterable[str] | None, optional): Entity labels to
+                anonymize. See make_doc().
+            anonymize_strategy (str | Callable[[Span], str], optional): How to
+                replace anonymized entities. See make_doc().
+            profile (str | None, optional): Name of a profile whose unneeded
+                components are excluded when loading the model. See make_doc().
+            similarity_threshold (float | None, optional): Minimum similarity
+                of a token to a keyword for it to be matched by its word
+                vector. See make_doc(). Defaults to None.
+
+        Raises:
+            ValueError: Raised if value passed to aspects is not a file path or
+                a dictionary, if sentiment_backend is not a registered backend,
+                if the profile is unknown or does not support anonymization, or
+                if similarity_threshold is not in (0, 1] or no keyword has a
+                vector.
+        """
+        if anonymize_labels is not None:
+            anonymize_labels = tuple(anonymize_labels)
+        nlp = get_nlp(model, profile)
+        cfg, disable = get_pipe_config(
+            aspects,
+            parent_span_min_length,
+            anonymize,
+            nlp,
+            sentiment_backend,
+            anonymize_labels,
+            anonymize_strategy,
+            profile,
+            similarity_threshold,
+        )
+        disable.append("aspect_sentiment_pipe")
+
+        object.__setattr__(self, "nlp", nlp)
+        object.__setattr__(self, "aspect_index", cfg["aspect_index"])
+        object.__setattr__(self, "config", MappingProxyType(cfg))
+        object.__setattr__(self, "disable", tuple(disable))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} objects are immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} objects are immutable")
+
+    def __repr__(self) -> str:
+        return (
+            f"AspectSentimentPipeline(aspects={list(self.aspect_index.aspects)!r}, "
+            f"model={self.nlp.meta.get('name')!r})"
+        )
+
+    def __call__(self, text: str) -> Doc:
+        """Processes a single text, as make_doc() does.
+
+        Args:
+            text (str): The text to process.
+
+        Returns:
+            Doc: Processed Doc object from input text.
+        """
+        doc = self.nlp(text, disable=self.disable)
+        return aspect_sentiment_batch([doc], **self.config)[0]
+
+    def pipe(
+        self,
+        texts: Iterable[str] | Iterable[tuple[str, Any]],
+        as_tuples: bool = False,
+        batch_size: int = 1000,
+        n_process: int = 1,
+        parse_cache: str | cache.ParseCache | None = None,
+        prefilter: bool | prefiltering.KeywordPrefilter = False,
+    ) -> Iterator[Doc] | Iterator[tuple[Doc, Any]]:
+        """Processes a stream of texts, as make_docs() does.
+
+        Args:
+            texts (Iterable[str] | Iterable[tuple[str, Any]]): The texts to
+                process. If as_tuples is True, should instead be
+                (text, context) tuples.
+            as_tuples (bool, optional): Whether texts are (text, context)
+                tuples. Defaults to False.
+            batch_size (int, optional): Number of texts to buffer per batch.
+                Defaults to 1000.
+            n_process (int, optional): Number of processes to parse with.
+                Defaults to 1.
+            parse_cache (str | cache.ParseCache | None, optional): A
+                ParseCache, or path to the directory of one. Defaults to None.
+            prefilter (bool | prefiltering.KeywordPrefilter, optional): Whether
+                to skip parsing texts which cannot contain any keywords. See
+                make_docs(). Defaults to False.
+
+        Returns:
+            Iterator[Doc] | Iterator[tuple[Doc, Any]]: Generator of processed
+                Doc objects, or (Doc, context) tuples if as_tuples is True.
+        """
+        return pipe_docs(
+            self.nlp,
+            self.config,
+            list(self.disable),
+            texts,
+            as_tuples,
+            batch_size,
+            n_process,
+            parse_cache,
+            prefilter,
+        )
+
+    def make_result(
+        self,
+        text: str,
+        result_cache: cache.ResultCache | None = None,
+    ) -> results.AspectSentimentResult:
+        """Processes a single text into a detached result, like make_result().
+
+        Args:
+            text (str): The text to process.
+            result_cache (cache.ResultCache | None, optional): Cache of results
+                to use. Defaults to None.
+
+        Returns:
+            results.AspectSentimentResult: The result. See la_nlp.results.
+        """
+        if result_cache is not None:
+            return next(self.make_results([text], result_cache=result_cache))
+        return results.from_doc(self(text), aspect_names=self._get_aspect_names())
+
+    def make_results(
+        self,
+        texts: Iterable[str] | Iterable[tuple[str, Any]],
+        as_tuples: bool = False,
+        result_cache: cache.ResultCache | None = None,
+        **kwargs,
+    ) -> Iterator[results.AspectSentimentResult]:
+        """Processes a stream of texts into detached results, like make_results().
+
+        Args:
+            texts (Iterable[str] | Iterable[tuple[str, Any]]): The texts to
+                process. If as_tuples is True, should instead be
+                (text, row ID) tuples.
+            as_tuples (bool, optional): Whether texts are (text, row ID)
+                tuples. Defaults to False.
+            result_cache (cache.ResultCache | None, optional): Cache of results
+                to use. Defaults to None.
+            **kwargs: Other arguments are passed to pipe().
+
+        Returns:
+            Iterator[results.AspectSentimentResult]: Generator of results, in
+                input order.
+        """
+        aspect_names = self._get_aspect_names()
+
+        def detach(
+            items: Iterable, as_tuples: bool = False
+        ) -> Iterator[results.AspectSentimentResult]:
+            """Copies results out of Docs, which are then freed."""
+            for item in self.pipe(items, as_tuples=as_tuples, **kwargs):
+                doc, row_id = item if as_tuples == True else (item, None)
+                yield results.from_doc(doc, row_id, aspect_names)
+
+        if result_cache is None:
+            return detach(texts, as_tuples)
+
+        # Only the distinct texts missing from the cache are processed, in a
+        # single stream keyed by their cache keys
+        return result_cache.pipe(
+            texts,
+            cache.get_config_key(self.nlp, self.config, self.disable),
+            lambda items: detach(items, as_tuples=True),
+            as_tuples=as_tuples,
+            batch_size=kwargs.get("batch_size", 1000),
+        )
+
+    def _get_aspect_names(self) -> tuple[str, ...] | None:
+        """Gets the shared aspect names of the pipeline's results."""
+        if self.config["analyze_aspects"] == False:
+            return ()
+        return results.get_aspect_names(self.aspect_index.aspects)
 
 
 @Language.component("aspect_sentiment_pipe")
 def aspect_sentiment_pipe(
     doc: Doc,
-    aspects: dict,
-    keywords: list,
+    aspect_index: taxonomy.AspectIndex,
+    phrase_matcher: Matcher | None = None,
     parent_span_min_length: int = 7,
     anonymize: bool = False,
+    sentiment_backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
+    anonymize_labels: Iterable[str] | None = None,
+    anonymize_strategy: str | Callable[[Span], str] = "mask",
+    analyze_aspects: bool = True,
+    vector_matcher: taxonomy.VectorMatcher | None = None,
 ) -> Doc:
     """Compiles the pipeline components into a single function.
 
@@ -105,16 +1199,63 @@ def aspect_sentiment_pipe(
     between the spacy pipeline and the pipeline components contained within this
     package.
     """
-    doc = components.set_doc_contains_aspect(doc, keywords)
-    doc = components.set_doc_aspects(doc, aspects)
-    doc = components.set_doc_keywords(doc, keywords)
-    doc = components.set_token_aspects(doc, aspects)
-    doc = components.set_token_parent_span(doc, min_length=parent_span_min_length)
-    doc = components.set_span_sentiment(doc)
-    doc = components.set_doc_aspect_sentiments(doc, aspects)
-    if anonymize == True:
-        doc = components.set_anonymized(doc)
-    return doc
+    return aspect_sentiment_batch(
+        [doc],
+        aspect_index,
+        phrase_matcher,
+        parent_span_min_length,
+        anonymize,
+        sentiment_backend,
+        anonymize_labels,
+        anonymize_strategy,
+        analyze_aspects,
+        vector_matcher,
+    )[0]
+
 
+def aspect_sentiment_batch(
+    docs: list[Doc],
+    aspect_index: taxonomy.AspectIndex,
+    phrase_matcher: Matcher | None = None,
+    parent_span_min_length: int = 7,
+    anonymize: bool = False,
+    sentiment_backend: str | sentiment.SentimentBackend = sentiment.DEFAULT_BACKEND,
+    anonymize_labels: Iterable[str] | None = None,
+    anonymize_strategy: str | Callable[[Span], str] = "mask",
+    analyze_aspects: bool = True,
+    vector_matcher: taxonomy.VectorMatcher | None = None,
+) -> list[Doc]:
+    """Runs the pipeline components over a batch of parsed Docs.
+
+    Should not be called publically. Batched form of aspect_sentiment_pipe(),
+    scoring the parent spans of all Docs in the batch in a single call to the
+    sentiment backend. If analyze_aspects is False, only anonymization is run.
+    """
+    n_docs = len(docs)
+    instrumentation.count("docs", n_docs)
+
+    if analyze_aspects == True:
+        with instrumentation.timer("match", n_docs):
+            components.set_batch_aspect_matches(
+                docs, aspect_index, phrase_matcher, vector_matcher
+            )
+        with instrumentation.timer("parent_span", n_docs):
+            for doc in docs:
+                components.set_token_parent_span(doc, min_length=parent_span_min_length)
+        with instrumentation.timer("sentiment", n_docs):
+            components.set_batch_span_sentiment(docs, backend=sentiment_backend)
+        with instrumentation.timer("aspect_sentiments", n_docs):
+            for doc in docs:
+                components.set_doc_aspect_sentiments(doc, aspect_index.aspects)
+
+        if instrumentation.is_enabled():
+            n_keywords = [len(doc._.keywords or ()) for doc in docs]
+            instrumentation.count("keywords_found", sum(n_keywords))
+            instrumentation.count("docs_skipped", n_keywords.count(0))
+
+    if anonymize == True:
+        with instrumentation.timer("anonymize", n_docs):
+            for doc in docs:
+                components.set_anonymized(doc, anonymize_labels, anonymize_strategy)
 
-NLP.add_pipe("aspect_sentiment_pipe")
+    return docs
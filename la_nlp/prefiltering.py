@@ -0,0 +1,299 @@
+"""Keyword pre-filter for skipping the full parse of texts without aspects.
+
+Most comments in a typical corpus mention none of the taxonomy's keywords,
+but are only found not to after being tagged, parsed and lemmatized. This
+module contains the KeywordPrefilter class, which decides from the output of
+the tokenizer alone whether a text could possibly contain a keyword, so that
+texts which cannot are never parsed.
+
+The pre-filter is conservative: it only skips a text if no token could be
+lemmatized to a keyword, whatever part of speech the tagger assigns it. For a
+rule-based lemmatizer, this is done by inverting its rules and exceptions
+into the set of every surface form which could have a keyword as its lemma.
+For a lookup lemmatizer, each token's lemma is looked up directly. If the
+pipeline sets lemmas in any other way, nothing is skipped.
+
+See the prefilter parameter of make_docs() in la_nlp.pipes.aspect_sentiment
+for the main entry point.
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Iterator
+
+from la_nlp import instrumentation, taxonomy
+
+from spacy.language import Language
+from spacy.pipeline import AttributeRuler, Lemmatizer
+from spacy.tokens import Doc
+
+# Universal part of speech tags, lowercased, as used by lemmatizer tables
+UNIVERSAL_POS = (
+    "adj",
+    "adp",
+    "adv",
+    "aux",
+    "cconj",
+    "det",
+    "intj",
+    "noun",
+    "num",
+    "part",
+    "pron",
+    "propn",
+    "punct",
+    "sconj",
+    "sym",
+    "verb",
+    "x",
+)
+
+# Factories of components known to set lemmas in ways which cannot be inverted
+UNSUPPORTED_FACTORIES = ("trainable_lemmatizer",)
+
+
+def get_rule_forms(lemmatizer: Lemmatizer, keywords: set[str]) -> set[str]:
+    """Gets every lowercase form a rule-based lemmatizer could map to keywords.
+
+    Args:
+        lemmatizer (Lemmatizer): Lemmatizer in 'rule' mode.
+        keywords (set[str]): Lowercase keywords.
+
+    Returns:
+        set[str]: The keywords, along with every lowercase form which some
+            rule or exception of some part of speech maps to a keyword.
+    """
+    rules_table = lemmatizer.lookups.get_table("lemma_rules", {})
+    exc_table = lemmatizer.lookups.get_table("lemma_exc", {})
+
+    forms = set(keywords)
+    for pos in UNIVERSAL_POS:
+        for old, new in rules_table.get(pos, []):
+            # Rules replace a suffix 'old' of the form with 'new', which may be
+            # the whole form, leaving no stem
+            for keyword in keywords:
+                if keyword.endswith(new):
+                    stem = keyword[: len(keyword) - len(new)]
+                    if stem or old:
+                        forms.add(stem + old)
+        for form, lemmas in exc_table.get(pos, {}).items():
+            if any(lemma.lower() in keywords for lemma in lemmas):
+                forms.add(form.lower())
+    return forms
+
+
+def get_attribute_ruler_forms(
+    ruler: AttributeRuler,
+    keywords: set[str],
+) -> set[str] | None:
+    """Gets the lowercase forms an attribute ruler assigns keyword lemmas to.
+
+    Args:
+        ruler (AttributeRuler): The attribute ruler.
+        keywords (set[str]): Lowercase keywords.
+
+    Returns:
+        set[str] | None: Forms matched by patterns assigning a keyword as a
+            lemma, or None if such a pattern does not match a single token by
+            its text.
+    """
+    forms = set()
+    for pattern in ruler.patterns:
+        lemma = pattern.get("attrs", {}).get("LEMMA")
+        if lemma is None or lemma.lower() not in keywords:
+            continue
+        for token_patterns in pattern["patterns"]:
+            index = pattern.get("index", 0)
+            token_pattern = token_patterns[index] if token_patterns else {}
+            text = None
+            for attr in ("ORTH", "TEXT", "LOWER", "NORM"):
+                if isinstance(token_pattern.get(attr), str):
+                    text = token_pattern[attr]
+                    break
+            if text is None:
+                return None
+            forms.add(text.lower())
+    return forms
+
+
+class KeywordPrefilter:
+    """Decides from its tokens alone whether a text could contain a keyword.
+
+    Attributes:
+        aspect_index (taxonomy.AspectIndex): The taxonomy filtered for.
+        nlp (Language): The spacy pipeline whose tokenizer and lemmatizer are
+            used.
+        forms (frozenset[str] | None): Lowercase forms of tokens which could be
+            lemmatized to a keyword, or None if the pipeline's lemmas cannot
+            be predicted, in which case no text is skipped.
+        checked (int): Number of texts checked.
+        skipped (int): Number of texts found not to contain any keywords.
+    """
+
+    def __init__(self, aspect_index: taxonomy.AspectIndex, nlp: Language):
+        """Builds the pre-filter for a taxonomy and pipeline.
+
+        Args:
+            aspect_index (taxonomy.AspectIndex): The taxonomy to filter for.
+            nlp (Language): The spacy pipeline texts will be processed with.
+        """
+        self.aspect_index = aspect_index
+        self.nlp = nlp
+        self.checked = 0
+        self.skipped = 0
+        self._lookup_table = None
+
+        keywords = {keyword.lower() for keyword in aspect_index.keywords}
+        # The phrase matcher matches the first word of a multi-word keyword as is
+        for keyword in aspect_index.multi_word_keywords:
+            words = nlp.tokenizer(keyword)
+            if len(words) > 1:
+                keywords.add(words[0].lower_)
+        forms = set(keywords)
+
+        for name, component in nlp.pipeline:
+            if nlp.get_pipe_meta(name).factory in UNSUPPORTED_FACTORIES:
+                forms = None
+                break
+            if isinstance(component, Lemmatizer):
+                if component.mode == "rule":
+                    forms |= get_rule_forms(component, keywords)
+                elif component.mode == "lookup":
+                    lookups = component.lookups
+                    self._lookup_table = lookups.get_table("lemma_lookup", {})
+                else:
+                    forms = None
+                    break
+            elif isinstance(component, AttributeRuler):
+                ruler_forms = get_attribute_ruler_forms(component, keywords)
+                if ruler_forms is None:
+                    forms = None
+                    break
+                forms |= ruler_forms
+
+        self.forms = None if forms is None else frozenset(forms)
+        self._keywords = frozenset(keywords)
+
+    @property
+    def skip_rate(self) -> float:
+        """float: Proportion of texts checked which were skipped."""
+        return self.skipped / self.checked if self.checked else 0.0
+
+    def info(self) -> dict:
+        """Gets statistics about the texts checked.
+
+        Returns:
+            dict: Dictionary of 'checked', 'skipped' and 'skip_rate'.
+        """
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_rate": self.skip_rate,
+        }
+
+    def may_contain_keyword(self, doc: Doc) -> bool:
+        """Checks whether a tokenized text could contain a keyword.
+
+        Args:
+            doc (Doc): The text, as tokenized by the pipeline's tokenizer.
+
+        Returns:
+            bool: False if no token can be lemmatized to a keyword, True
+                otherwise.
+        """
+        if self.forms is None:
+            return True
+        forms = self.forms
+        lookup_table = self._lookup_table
+        for token in doc:
+            if token.lower_ in forms:
+                return True
+            if lookup_table is not None:
+                lemma = lookup_table.get(token.text, token.text)
+                if isinstance(lemma, list):
+                    lemma = lemma[0] if lemma else token.text
+                if lemma.lower() in self._keywords:
+                    return True
+        return False
+
+    def pipe(
+        self,
+        texts: Iterable[str] | Iterable[tuple[str, Any]],
+        parse: Callable[[Iterator[tuple[str, int]]], Iterator[tuple[Doc, int]]],
+        skip: Callable[[Doc], Doc],
+        as_tuples: bool = False,
+    ) -> Iterator[Doc] | Iterator[tuple[Doc, Any]]:
+        """Processes a stream of texts, parsing only those which may match.
+
+        Texts are tokenized and checked as they are consumed. Texts which may
+        contain a keyword are passed on to parse() as (text, sequence number)
+        tuples, while the tokenized Docs of the rest are passed to skip().
+        Docs are yielded in input order.
+
+        Args:
+            texts (Iterable[str] | Iterable[tuple[str, Any]]): The texts, or
+                (text, context) tuples if as_tuples is True.
+            parse (Callable): Function taking an iterator of (text, sequence
+                number) tuples and yielding (Doc, sequence number) tuples in
+                the same order.
+            skip (Callable[[Doc], Doc]): Function setting the attributes of a
+                tokenized Doc which contains no keywords.
+            as_tuples (bool, optional): Whether texts are (text, context)
+                tuples. Defaults to False.
+
+        Returns:
+            Iterator[Doc] | Iterator[tuple[Doc, Any]]: Generator of Docs, or
+                (Doc, context) tuples if as_tuples is True.
+        """
+        order = deque()
+        ready = {}
+        contexts = {}
+
+        def check() -> Iterator[tuple[str, int]]:
+            """Yields the texts to parse, setting aside the rest."""
+            for i, item in enumerate(texts):
+                text, context = item if as_tuples == True else (item, None)
+                order.append(i)
+                contexts[i] = context
+                self.checked += 1
+                doc = self.nlp.make_doc(text)
+                if self.may_contain_keyword(doc):
+                    yield (text, i)
+                else:
+                    self.skipped += 1
+                    instrumentation.count("docs_prefiltered")
+                    ready[i] = skip(doc)
+
+        def release() -> Iterator:
+            """Yields ready Docs at the front of the stream, in order."""
+            while order and order[0] in ready:
+                i = order.popleft()
+                doc = ready.pop(i)
+                context = contexts.pop(i)
+                yield (doc, context) if as_tuples == True else doc
+
+        for doc, i in parse(check()):
+            ready[i] = doc
+            yield from release()
+        yield from release()
+
+
+@lru_cache(maxsize=32)
+def get_prefilter(
+    aspect_index: taxonomy.AspectIndex,
+    nlp: Language,
+) -> KeywordPrefilter:
+    """Gets the shared KeywordPrefilter for a taxonomy and pipeline.
+
+    The pre-filter, and so its checked and skipped counts, is shared by every
+    caller passing prefilter=True, in any thread. To read the counts of a
+    single run, build a KeywordPrefilter and pass it instead.
+
+    Args:
+        aspect_index (taxonomy.AspectIndex): The taxonomy to filter for.
+        nlp (Language): The spacy pipeline texts will be processed with.
+
+    Returns:
+        KeywordPrefilter: The pre-filter, built on first use.
+    """
+    return KeywordPrefilter(aspect_index, nlp)
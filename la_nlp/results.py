@@ -0,0 +1,234 @@
+"""Compact aspect sentiment results, detached from their spacy Doc.
+
+The attributes set by the aspect sentiment pipeline hold Token and Span
+objects, so keeping them keeps the whole Doc (and its arrays, tensors and
+user_data) alive. This module contains AspectSentimentResult, a __slots__
+record holding only the results of the pipeline in flat arrays, so that the
+Doc can be freed as soon as it has been processed. A result for a typical
+comment takes a few hundred bytes.
+
+Results are created from processed Docs with from_doc(), or directly from
+texts with make_results() in la_nlp.pipes.aspect_sentiment.
+"""
+
+import math
+import sys
+from array import array
+from typing import Any, Iterable
+
+from la_nlp import components
+
+from spacy.tokens import Doc
+
+# Number of offsets stored per keyword: keyword start and end, parent span
+# start and end (all character offsets), and the index of the keyword's aspect
+OFFSETS_PER_KEYWORD = 5
+
+# Canonical tuples of aspect names, shared by all results with the same aspects
+_ASPECT_NAMES = {}
+
+
+def get_aspect_names(aspects: dict | tuple | list) -> tuple[str, ...]:
+    """Gets the shared tuple of aspect names for a set of aspects.
+
+    Args:
+        aspects (dict | tuple | list): Aspects, or aspect names.
+
+    Returns:
+        tuple[str, ...]: The aspect names, as a tuple shared with every other
+            caller passing the same names.
+    """
+    names = tuple(aspects)
+    return _ASPECT_NAMES.setdefault(names, names)
+
+
+class AspectSentimentResult:
+    """The results of the aspect sentiment pipeline for a single text.
+
+    Aspect sentiments are stored as an array aligned with aspect_names (with
+    NaN for aspects not mentioned), and keywords as a tuple of their lemmas
+    with a flat array of offsets and an array of their parent span sentiments.
+    Use the properties below to read these as the corresponding Doc
+    attributes would be. As the Doc's text is not kept, keywords are
+    identified by their lemmas rather than their text.
+
+    Attributes:
+        id (Any): The row ID of the text, if any.
+        aspect_names (tuple[str, ...]): The names of all aspects in the
+            taxonomy used.
+        sentiments (array): Sentiment of each aspect, aligned with aspect_names.
+        lemmas (tuple[str, ...]): Lemma of each keyword found, in order.
+        offsets (array | tuple): OFFSETS_PER_KEYWORD integers per keyword.
+        scores (array | tuple): Sentiment of each keyword's parent span.
+        anonymized (str | None): Anonymized text, if anonymization was run.
+    """
+
+    __slots__ = (
+        "id",
+        "aspect_names",
+        "sentiments",
+        "lemmas",
+        "offsets",
+        "scores",
+        "anonymized",
+    )
+
+    def __init__(
+        self,
+        id: Any,
+        aspect_names: tuple[str, ...],
+        sentiments: array,
+        lemmas: tuple[str, ...] = (),
+        offsets: array | tuple = (),
+        scores: array | tuple = (),
+        anonymized: str | None = None,
+    ):
+        self.id = id
+        self.aspect_names = aspect_names
+        self.sentiments = sentiments
+        self.lemmas = lemmas
+        self.offsets = offsets
+        self.scores = scores
+        self.anonymized = anonymized
+
+    def __repr__(self) -> str:
+        return (
+            f"AspectSentimentResult(id={self.id!r}, "
+            f"aspect_sentiments={self.aspect_sentiments!r})"
+        )
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state: tuple) -> None:
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    @property
+    def contains_aspect(self) -> bool:
+        """bool: Whether any keywords were found, as in 'Doc._.contains_aspect'."""
+        return bool(self.lemmas)
+
+    @property
+    def aspect_sentiments(self) -> dict:
+        """dict: Sentiment of each aspect, as in 'Doc._.aspect_sentiments'."""
+        return {
+            aspect: None if math.isnan(score) else score
+            for aspect, score in zip(self.aspect_names, self.sentiments)
+        }
+
+    @property
+    def aspects(self) -> list[str] | None:
+        """list[str] | None: Aspects mentioned, as in 'Doc._.aspects'."""
+        if not self.lemmas:
+            return None
+        indexes = self.offsets[OFFSETS_PER_KEYWORD - 1 :: OFFSETS_PER_KEYWORD]
+        return [self.aspect_names[i] for i in dict.fromkeys(indexes)]
+
+    @property
+    def keywords(self) -> list[dict]:
+        """list[dict]: Keywords, as in writers.get_keyword_records()."""
+        keywords = []
+        for i, lemma in enumerate(self.lemmas):
+            start, end, span_start, span_end, aspect = self.offsets[
+                i * OFFSETS_PER_KEYWORD : (i + 1) * OFFSETS_PER_KEYWORD
+            ]
+            keywords.append(
+                {
+                    "keyword": lemma,
+                    "aspect": self.aspect_names[aspect],
+                    "start": start,
+                    "end": end,
+                    "span_start": span_start,
+                    "span_end": span_end,
+                    "sentiment": self.scores[i],
+                }
+            )
+        return keywords
+
+    def to_record(
+        self,
+        row_id: Any = None,
+        aspects: Iterable[str] | None = None,
+    ) -> dict:
+        """Flattens the result into a record, as in writers.get_record().
+
+        Args:
+            row_id (Any, optional): The ID of the row. Defaults to None, in
+                which case the result's id is used.
+            aspects (Iterable[str] | None, optional): The aspects to include as
+                columns. Defaults to None, i.e. all aspects of the result.
+
+        Returns:
+            dict: Dictionary of the row ID, the sentiment of each aspect and the
+                list of keywords.
+        """
+        aspect_sentiments = self.aspect_sentiments
+        if aspects is None:
+            aspects = aspect_sentiments
+        record = {"id": self.id if row_id is None else row_id}
+        for aspect in aspects:
+            record[aspect] = aspect_sentiments.get(aspect)
+        record["keywords"] = self.keywords
+        return record
+
+
+def from_doc(
+    doc: Doc,
+    row_id: Any = None,
+    aspect_names: tuple[str, ...] | None = None,
+) -> AspectSentimentResult:
+    """Copies the results of the aspect sentiment pipeline out of a Doc.
+
+    The result holds no references to the Doc, its Tokens or its Spans.
+
+    Args:
+        doc (Doc): Doc processed by the aspect sentiment pipeline.
+        row_id (Any, optional): The row ID of the text. Defaults to None.
+        aspect_names (tuple[str, ...] | None, optional): The names of all
+            aspects in the taxonomy, as returned by get_aspect_names(). Defaults
+            to None, in which case they are taken from the Doc.
+
+    Returns:
+        AspectSentimentResult: The detached result.
+    """
+    aspect_sentiments = doc._.aspect_sentiments or {}
+    if aspect_names is None:
+        aspect_names = get_aspect_names(aspect_sentiments)
+
+    sentiments = array("d")
+    for aspect in aspect_names:
+        score = aspect_sentiments.get(aspect)
+        sentiments.append(math.nan if score is None else score)
+
+    lemmas = ()
+    offsets = ()
+    scores = ()
+    keywords = doc._.keywords
+    if keywords:
+        aspect_indexes = {aspect: i for i, aspect in enumerate(aspect_names)}
+        keyword_spans = [components.get_keyword_span(keyword) for keyword in keywords]
+        lemmas = tuple(sys.intern(span.label_) for span in keyword_spans)
+        offsets = array("l")
+        scores = array("d")
+        for keyword, keyword_span in zip(keywords, keyword_spans):
+            span = keyword._.parent_span
+            offsets.extend(
+                (
+                    keyword_span.start_char,
+                    keyword_span.end_char,
+                    span.start_char,
+                    span.end_char,
+                    aspect_indexes[keyword._.aspect],
+                )
+            )
+            score = span._.sentiment
+            scores.append(math.nan if score is None else score)
+
+    anonymized = None
+    if Doc.has_extension("anonymized"):
+        anonymized = doc._.anonymized
+
+    return AspectSentimentResult(
+        row_id, aspect_names, sentiments, lemmas, offsets, scores, anonymized
+    )
@@ -0,0 +1,317 @@
+"""Sentiment scoring backends used by the sentiment components.
+
+This module contains a registry of sentiment backends, which score batches of
+spans of text, along with the bundled VADER backend. Backends are chosen by name
+(see get_backend()), so that a faster or vectorized scorer can be swapped in for
+VADER without changing any components. New backends are added by subclassing
+SentimentBackend and decorating the class with register_backend().
+
+Each backend memoizes its scores in a bounded LRU cache keyed by text. Short
+stock phrases recur across thousands of documents, so this means a backend
+only runs once per distinct span of text.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+import numpy
+from spacy.tokens import Span
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+# Name of the backend used when none is specified
+DEFAULT_BACKEND = "vader"
+
+# Default maximum number of texts whose scores are kept in the cache
+DEFAULT_CACHE_SIZE = 100_000
+
+# The VADER sentiment analyzer is initialized on first use (see get_analyzer()),
+# as loading its lexicon is relatively slow.
+_ANALYZER = None
+
+
+class SentimentCache:
+    """A thread-safe, bounded LRU cache of sentiment scores keyed by text.
+
+    Attributes:
+        maxsize (int): Maximum number of scores to keep. Least recently used
+            scores are evicted first once the cache is full. Set to 0 to disable
+            caching.
+        hits (int): Number of lookups which found a cached score.
+        misses (int): Number of lookups which did not.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        """Creates an empty cache.
+
+        Args:
+            maxsize (int, optional): Maximum number of scores to keep. Defaults
+                to DEFAULT_CACHE_SIZE.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def get(self, text: str) -> float | None:
+        """Gets the cached score for a text, counting the lookup as a hit or miss.
+
+        Args:
+            text (str): The text to look up.
+
+        Returns:
+            float | None: The cached score, or None if not cached.
+        """
+        with self._lock:
+            score = self._scores.get(text)
+            if score is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._scores.move_to_end(text)
+            return score
+
+    def put(self, text: str, score: float) -> None:
+        """Caches the score for a text, evicting old scores if necessary.
+
+        Args:
+            text (str): The text that was scored.
+            score (float): Its score.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._scores[text] = score
+            self._scores.move_to_end(text)
+            while len(self._scores) > self.maxsize:
+                self._scores.popitem(last=False)
+
+    def resize(self, maxsize: int) -> None:
+        """Changes the maximum size of the cache, evicting scores if necessary.
+
+        Args:
+            maxsize (int): New maximum number of scores to keep.
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._scores) > max(maxsize, 0):
+                self._scores.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes all cached scores and resets the hit and miss counters."""
+        with self._lock:
+            self._scores.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict:
+        """Gets statistics about the cache.
+
+        Returns:
+            dict: Dictionary of 'hits', 'misses', 'maxsize' and 'currsize'.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "maxsize": self.maxsize,
+            "currsize": len(self._scores),
+        }
+
+
+# Cache used by the VADER backend
+CACHE = SentimentCache()
+
+# Registered backend factories and their instances, keyed by name
+BACKENDS = {}
+_BACKEND_INSTANCES = {}
+_BACKENDS_LOCK = threading.Lock()
+
+
+class SentimentBackend:
+    """Base class for sentiment backends.
+
+    Backends score batches of spans via score_batch(). Subclasses need only
+    implement score_texts(), which is called once per batch with the distinct
+    texts not already in the backend's cache. Backends which can do better
+    than this (e.g. by scoring Span objects directly) may override score_batch()
+    instead.
+
+    Attributes:
+        cache (SentimentCache): Cache of scores keyed by text.
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE):
+        """Creates the backend.
+
+        Args:
+            cache_size (int, optional): Maximum number of scores to cache. Set
+                to 0 to disable caching. Defaults to DEFAULT_CACHE_SIZE.
+        """
+        self.cache = SentimentCache(cache_size)
+
+    def score_texts(self, texts: list[str]) -> numpy.ndarray:
+        """Scores a batch of texts.
+
+        Args:
+            texts (list[str]): The texts to score.
+
+        Returns:
+            numpy.ndarray: Sentiment scores between -1 and 1, aligned with texts.
+        """
+        raise NotImplementedError
+
+    def score_batch(self, spans: Iterable[Span | str]) -> numpy.ndarray:
+        """Scores a batch of spans, calling score_texts() once for any misses.
+
+        Args:
+            spans (Iterable[Span | str]): The spans, or texts, to score.
+
+        Returns:
+            numpy.ndarray: Sentiment scores between -1 and 1, aligned with spans.
+        """
+        texts = [span if isinstance(span, str) else span.text for span in spans]
+        scores = numpy.empty(len(texts), dtype="float64")
+
+        missing = {}
+        for i, text in enumerate(texts):
+            score = self.cache.get(text)
+            if score is None:
+                missing.setdefault(text, []).append(i)
+            else:
+                scores[i] = score
+
+        if missing:
+            missing_texts = list(missing)
+            missing_scores = numpy.asarray(self.score_texts(missing_texts))
+            for text, score in zip(missing_texts, missing_scores.tolist()):
+                scores[missing[text]] = score
+                self.cache.put(text, score)
+
+        return scores
+
+
+def register_backend(name: str) -> Callable:
+    """Registers a sentiment backend under a name.
+
+    Intended to be used as a class decorator. The decorated class (or any
+    callable returning a SentimentBackend) is called without arguments the
+    first time the backend is requested via get_backend().
+
+    Args:
+        name (str): The name to register the backend under.
+
+    Returns:
+        Callable: Decorator registering the backend factory.
+    """
+
+    def register(factory: Callable) -> Callable:
+        with _BACKENDS_LOCK:
+            BACKENDS[name] = factory
+            _BACKEND_INSTANCES.pop(name, None)
+        return factory
+
+    return register
+
+
+def get_backend(
+    backend: str | SentimentBackend = DEFAULT_BACKEND,
+) -> SentimentBackend:
+    """Gets a sentiment backend by name, creating it on first use.
+
+    Args:
+        backend (str | SentimentBackend, optional): Name of a registered
+            backend, or a backend instance (which is returned as is). Defaults
+            to DEFAULT_BACKEND.
+
+    Raises:
+        ValueError: Raised if no backend is registered under the name.
+
+    Returns:
+        SentimentBackend: The backend instance, shared by all callers.
+    """
+    if isinstance(backend, SentimentBackend):
+        return backend
+
+    instance = _BACKEND_INSTANCES.get(backend)
+    if instance is None:
+        with _BACKENDS_LOCK:
+            instance = _BACKEND_INSTANCES.get(backend)
+            if instance is None:
+                if backend not in BACKENDS:
+                    raise ValueError(f"No sentiment backend registered as {backend!r}")
+                instance = BACKENDS[backend]()
+                _BACKEND_INSTANCES[backend] = instance
+    return instance
+
+
+@register_backend("vader")
+class VaderBackend(SentimentBackend):
+    """Sentiment backend scoring spans by their VADER compound polarity."""
+
+    def __init__(self, cache: SentimentCache = CACHE):
+        """Creates the backend.
+
+        Args:
+            cache (SentimentCache, optional): Cache of scores keyed by text.
+                Defaults to the module cache, CACHE.
+        """
+        self.cache = cache
+
+    def score_texts(self, texts: list[str]) -> numpy.ndarray:
+        analyzer = get_analyzer()
+        return numpy.array(
+            [analyzer.polarity_scores(text)["compound"] for text in texts],
+            dtype="float64",
+        )
+
+
+def get_analyzer() -> SentimentIntensityAnalyzer:
+    """Gets the VADER sentiment analyzer, initializing it on first use.
+
+    Returns:
+        SentimentIntensityAnalyzer: The shared VADER analyzer.
+    """
+    global _ANALYZER
+    if _ANALYZER is None:
+        _ANALYZER = SentimentIntensityAnalyzer()
+    return _ANALYZER
+
+
+def get_text_sentiment(
+    text: str,
+    backend: str | SentimentBackend = DEFAULT_BACKEND,
+) -> float:
+    """Gets the sentiment score of a single text.
+
+    Args:
+        text (str): The text to score.
+        backend (str | SentimentBackend, optional): The backend, or name of the
+            backend, to score with. Defaults to DEFAULT_BACKEND.
+
+    Returns:
+        float: The sentiment score, between -1 and 1.
+    """
+    return get_backend(backend).score_batch([text]).tolist()[0]
+
+
+def set_cache_size(maxsize: int) -> None:
+    """Sets the maximum size of the VADER backend's sentiment cache.
+
+    Args:
+        maxsize (int): Maximum number of scores to keep. Set to 0 to disable
+            caching.
+    """
+    CACHE.resize(maxsize)
+
+
+def get_cache_info() -> dict:
+    """Gets statistics about the VADER backend's sentiment cache.
+
+    Returns:
+        dict: Dictionary of 'hits', 'misses', 'maxsize' and 'currsize'.
+    """
+    return CACHE.info()
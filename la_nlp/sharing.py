@@ -0,0 +1,224 @@
+"""Sharing of a model's word vectors with worker processes via memory mapping.
+
+The vectors table of en_core_web_lg takes several hundred MB, more than the
+rest of the model combined. When texts are parsed with n_process workers
+started with the 'spawn' or 'forkserver' method (the default on macOS, and on
+Linux from Python 3.14), the pipeline is pickled and each worker unpickles its
+own copy of the table.
+
+This module contains share_vectors(), which finds a .npy file holding the
+same data as a pipeline's vectors table: the model's own vectors file, or a
+copy written once to a directory. While this module is imported, a shared
+table is sent to multiprocessing workers as the path of its file, and each
+worker maps the file read-only instead of receiving a copy. Pages of the file
+are shared by all workers through the page cache, and can be dropped and
+reread under memory pressure rather than swapped.
+
+The calling process keeps its own copy of the table, which the pipeline only
+reads. Forked workers already share the caller's copy, so are unaffected.
+
+Sharing is enabled by default, and is used by make_docs() and the other
+entry points in la_nlp.pipes.aspect_sentiment when n_process is not 1. It can
+be disabled with disable(), or by setting the LA_NLP_SHARE_VECTORS environment
+variable to 0.
+"""
+
+import hashlib
+import os
+import tempfile
+import weakref
+from multiprocessing.reduction import ForkingPickler
+
+import numpy
+from spacy.language import Language
+from spacy.vectors import Vectors
+
+ENV_VAR = "LA_NLP_SHARE_VECTORS"
+
+# Path of a model's vectors file, relative to the model's directory
+MODEL_VECTORS_PATH = os.path.join("vocab", "vectors")
+
+_enabled = os.environ.get(ENV_VAR, "1") != "0"
+
+# id() of each shared Vectors -> (weak reference to its data, number of keys,
+# path of the file holding the data)
+_shared = {}
+
+
+def enable() -> None:
+    """Enables sharing of vectors with worker processes."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Disables sharing of vectors with worker processes."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """Checks whether sharing of vectors with worker processes is enabled.
+
+    Returns:
+        bool: True if enabled.
+    """
+    return _enabled
+
+
+def get_shared_path(vectors: Vectors) -> str | None:
+    """Gets the path of the file holding a shared vectors table's data.
+
+    Args:
+        vectors (Vectors): The vectors table.
+
+    Returns:
+        str | None: Path of the .npy file, or None if the table has not been
+            shared, or keys have been added to it or its data replaced since.
+    """
+    data = vectors.data
+    if isinstance(data, numpy.memmap) and data.mode == "r" and data.filename:
+        return data.filename
+    entry = _shared.get(id(vectors))
+    if entry is None or entry[0]() is not data or entry[1] != len(vectors.key2row):
+        return None
+    return entry[2]
+
+
+def get_vectors_key(data: numpy.ndarray) -> str:
+    """Gets a key identifying the content of a vectors table's data.
+
+    Args:
+        data (numpy.ndarray): The data.
+
+    Returns:
+        str: Hex digest of the data's shape, dtype and content.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((data.shape, data.dtype.str)).encode("utf-8"))
+    digest.update(memoryview(numpy.ascontiguousarray(data)).cast("B"))
+    return digest.hexdigest()
+
+
+def write_vectors(data: numpy.ndarray, directory: str) -> str:
+    """Writes a vectors table's data to a .npy file named by its content.
+
+    The file is only written if it does not already exist, and is written to
+    a temporary file first, so that concurrent writers and readers never see
+    a partial file.
+
+    Args:
+        data (numpy.ndarray): The data.
+        directory (str): Directory to write the file to. Created if needed.
+
+    Returns:
+        str: Path of the file.
+    """
+    path = os.path.join(directory, f"{get_vectors_key(data)}.npy")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            numpy.save(file, data, allow_pickle=False)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+def holds_vectors(path: str, data: numpy.ndarray) -> bool:
+    """Checks whether a .npy file holds the same array as data.
+
+    Args:
+        path (str): Path of the .npy file.
+        data (numpy.ndarray): The array the file should hold.
+
+    Returns:
+        bool: True if the file can be memory mapped and holds an equal array.
+    """
+    try:
+        mapped = numpy.load(path, mmap_mode="r", allow_pickle=False)
+    except (OSError, ValueError):
+        return False
+    return (
+        isinstance(mapped, numpy.memmap)
+        and mapped.shape == data.shape
+        and mapped.dtype == data.dtype
+        and numpy.array_equal(mapped, data)
+    )
+
+
+def share_vectors(nlp: Language, directory: str | None = None) -> str | None:
+    """Shares a pipeline's vectors table with the worker processes it starts.
+
+    The model's own vectors file is used if it holds the same data as the
+    loaded table. Otherwise, if a directory is passed, the data is written to
+    a file there, once per distinct table. Workers the pipeline is sent to
+    afterwards map the file rather than receiving a copy of the table. The
+    table should not be changed after sharing, as workers would not see the
+    change; a table whose keys or data have since been replaced is no longer
+    shared.
+
+    Args:
+        nlp (Language): The spacy pipeline.
+        directory (str | None, optional): Directory to write the vectors to if
+            the model's own file cannot be used. Defaults to None, in which
+            case nothing is written.
+
+    Returns:
+        str | None: Path of the shared file, or None if the pipeline has no
+            vectors, they are not held in a numpy array (e.g. on a GPU), or
+            no file holds them.
+    """
+    vectors = nlp.vocab.vectors
+    path = get_shared_path(vectors)
+    if path is not None:
+        return path
+
+    data = vectors.data
+    if not isinstance(data, numpy.ndarray) or not data.size:
+        return None
+
+    path = None
+    if nlp.path is not None:
+        model_path = os.path.join(str(nlp.path), MODEL_VECTORS_PATH)
+        if holds_vectors(model_path, data):
+            path = model_path
+    if path is None and directory is not None:
+        path = write_vectors(data, directory)
+    if path is None:
+        return None
+
+    _shared[id(vectors)] = (weakref.ref(data), len(vectors.key2row), path)
+    return path
+
+
+def attach_vectors(path: str, state: bytes) -> Vectors:
+    """Rebuilds a vectors table whose data is mapped from a file.
+
+    Should not be called publicly. Used to unpickle Vectors sent to
+    multiprocessing workers by reduce_vectors().
+    """
+    vectors = Vectors()
+    vectors.data = numpy.load(path, mmap_mode="r", allow_pickle=False)
+    return vectors.from_bytes(state, exclude=["vectors"])
+
+
+def reduce_vectors(vectors: Vectors) -> tuple:
+    """Pickles a vectors table as the path of its mapped file, if it has one.
+
+    Should not be called publicly. Registered with multiprocessing's
+    pickler, so that it only applies to objects sent to other processes.
+    """
+    path = get_shared_path(vectors)
+    if path is None:
+        return vectors.__reduce__()
+    return (attach_vectors, (path, vectors.to_bytes(exclude=["vectors"])))
+
+
+ForkingPickler.register(Vectors, reduce_vectors)
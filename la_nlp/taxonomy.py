@@ -0,0 +1,577 @@
+"""Compiled aspect taxonomies for use by the matching components.
+
+This module contains the AspectIndex class, which compiles a dictionary of
+aspects and keywords into a hashed lookup table mapping lemmas to aspects. The
+index is built once per taxonomy and shared by all components that need to
+match keywords, so that a Doc can be matched against the full taxonomy in a
+single pass at a constant cost per token, regardless of the taxonomy's size.
+
+Optionally, tokens can also be matched by the similarity of their word vectors
+to the keywords' (e.g. 'lectures' or 'prof' to 'lecturer'), by a VectorMatcher
+built once per taxonomy. This scores all tokens of a batch of Docs against all
+keywords with a single matrix multiplication.
+
+Taxonomies passed as paths to .toml files are loaded via TaxonomyRegistry,
+which parses and compiles each file once, and reloads it when it changes, so
+that long-running services pick up edits without restarting.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import tomllib
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterable
+
+from la_nlp import utils
+
+import numpy
+from spacy.attrs import IS_ALPHA, IS_STOP, LEMMA, LOWER, ORTH
+from spacy.language import Language
+from spacy.matcher import Matcher
+from spacy.strings import hash_string
+from spacy.tokens import Doc, Token
+
+# Characters on which the tokenizer may split a keyword into multiple tokens
+MULTI_WORD_REGEX = re.compile(r"[-\s/']")
+
+# Default minimum cosine similarity of a token to a keyword for a vector match
+DEFAULT_SIMILARITY_THRESHOLD = 0.7
+
+# Maximum number of lemma -> aspect lookups memoized per index, after which the
+# memo is emptied, so that it stays bounded however many distinct lemmas occur
+LEMMA_CACHE_SIZE = 100_000
+
+
+class AspectIndex:
+    """An aspect taxonomy compiled into a case-folded lemma -> aspect lookup.
+
+    Keywords are case-folded and keyed by their spacy string hash, so that a
+    token can be matched by looking up its lemma hash directly, without
+    creating any strings. Lemmas not yet seen by the index are case-folded once
+    and their results memoized by lemma hash.
+
+    If a keyword appears under more than one aspect, it is mapped to the first
+    of these aspects. All of its aspects can be looked up with
+    get_token_aspects(), as the legacy set_doc_aspects() and
+    set_token_aspects() components do.
+
+    Keywords spanning multiple tokens (e.g. 'mid-term' or 'office hours') are
+    matched separately, by a Matcher compiled by get_phrase_matcher().
+
+    Attributes:
+        aspects (MappingProxyType): Read-only mapping of the aspects the index
+            was compiled from to tuples of their keywords.
+        keywords (tuple[str, ...]): All keywords contained in the aspects.
+        multi_word_keywords (tuple[str, ...]): Keywords which may be split
+            into multiple tokens by the tokenizer.
+    """
+
+    def __init__(self, aspects: dict):
+        """Compiles the index from a dictionary of aspects.
+
+        Args:
+            aspects (dict): Dictionary of keywords mapped to aspects. Should
+                take the form of: {'aspect1': ['keyword1', 'keyword2'],
+                'aspect2': ['keyword3', 'keyword4']}.
+        """
+        # Indexes are shared by every caller compiling equal aspects, so are
+        # exposed read-only
+        self.aspects = MappingProxyType(
+            {aspect: tuple(kws) for aspect, kws in aspects.items()}
+        )
+        self.keywords = tuple(utils.get_keywords_from_aspects(self.aspects))
+        self.multi_word_keywords = tuple(
+            kw for kw in dict.fromkeys(self.keywords) if MULTI_WORD_REGEX.search(kw)
+        )
+
+        self._keyword_aspects = {}
+        # Every aspect of each keyword, in taxonomy order
+        self._keyword_all_aspects = {}
+        for aspect, keywords in self.aspects.items():
+            for keyword in keywords:
+                key = hash_string(keyword.lower())
+                self._keyword_aspects.setdefault(key, aspect)
+                key_aspects = self._keyword_all_aspects.setdefault(key, ())
+                if aspect not in key_aspects:
+                    self._keyword_all_aspects[key] = key_aspects + (aspect,)
+
+        # Memoized results of lemma hash -> aspect lookups, including misses,
+        # up to LEMMA_CACHE_SIZE
+        self._lemma_aspects = {}
+
+        # Compiled phrase matchers, one per spacy Vocab, and vector matchers,
+        # one per (Vocab, threshold)
+        self._phrase_matchers = {}
+        self._vector_matchers = {}
+        self._matchers_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keyword_aspects)
+
+    def get_lemma_aspect(self, lemma: int, doc: Doc) -> str | None:
+        """Gets the aspect corresponding to a lemma hash.
+
+        Args:
+            lemma (int): Hash of the lemma to look up, e.g. Token.lemma.
+            doc (Doc): Doc whose string store the lemma hash belongs to.
+
+        Returns:
+            str | None: The corresponding aspect, or None if the lemma is not a
+                keyword.
+        """
+        try:
+            return self._lemma_aspects[lemma]
+        except KeyError:
+            key = hash_string(doc.vocab.strings[lemma].lower())
+            aspect = self._keyword_aspects.get(key)
+            if len(self._lemma_aspects) >= LEMMA_CACHE_SIZE:
+                self._lemma_aspects.clear()
+            self._lemma_aspects[lemma] = aspect
+            return aspect
+
+    def get_token_aspect(self, token: Token) -> str | None:
+        """Gets the aspect corresponding to a token's lemma.
+
+        Args:
+            token (Token): The token to look up.
+
+        Returns:
+            str | None: The corresponding aspect, or None if the token is not a
+                keyword.
+        """
+        return self.get_lemma_aspect(token.lemma, token.doc)
+
+    def get_token_aspects(self, token: Token) -> tuple[str, ...]:
+        """Gets every aspect listing a token's lemma as a keyword.
+
+        Args:
+            token (Token): The token to look up.
+
+        Returns:
+            tuple[str, ...]: The aspects, in the order of the taxonomy, or an
+                empty tuple if the token is not a keyword.
+        """
+        return self._keyword_all_aspects.get(hash_string(token.lemma_.lower()), ())
+
+    def get_phrase_matcher(self, nlp: Language) -> Matcher | None:
+        """Gets a Matcher for the index's multi-word keywords.
+
+        Each keyword is split into tokens by the pipeline's own tokenizer and
+        matched case-insensitively, with the final token also matched on its
+        plural or lemma (so that 'mid-terms' matches the keyword 'mid-term').
+        Matches are labelled with the keyword they correspond to. The Matcher
+        is compiled once per Vocab and cached.
+
+        Args:
+            nlp (Language): The spacy pipeline the Matcher will be used with.
+
+        Returns:
+            Matcher | None: The compiled Matcher, or None if the index contains
+                no multi-word keywords.
+        """
+        if not self.multi_word_keywords:
+            return None
+
+        matcher = self._phrase_matchers.get(nlp.vocab)
+        if matcher is not None:
+            return matcher
+
+        with self._matchers_lock:
+            matcher = self._phrase_matchers.get(nlp.vocab)
+            if matcher is None:
+                matcher = Matcher(nlp.vocab)
+                for keyword in self.multi_word_keywords:
+                    words = [token.lower_ for token in nlp.tokenizer(keyword)]
+                    if len(words) < 2:
+                        continue
+                    head = [{"LOWER": word} for word in words[:-1]]
+                    last = words[-1]
+                    matcher.add(
+                        keyword,
+                        [
+                            head + [{"LOWER": {"IN": [last, last + "s"]}}],
+                            head + [{"LEMMA": last}],
+                        ],
+                    )
+                self._phrase_matchers[nlp.vocab] = matcher
+        return matcher
+
+    def get_vector_matcher(
+        self,
+        nlp: Language,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    ) -> "VectorMatcher":
+        """Gets a VectorMatcher for the index's keywords.
+
+        The VectorMatcher is built once per Vocab and threshold and cached.
+
+        Args:
+            nlp (Language): The spacy pipeline the VectorMatcher will be used
+                with. Its vocab must contain word vectors.
+            threshold (float, optional): Minimum cosine similarity of a token
+                to a keyword for it to be matched. Defaults to
+                DEFAULT_SIMILARITY_THRESHOLD.
+
+        Raises:
+            ValueError: Raised if the threshold is not in (0, 1], or if none of
+                the keywords have a vector.
+
+        Returns:
+            VectorMatcher: The compiled VectorMatcher.
+        """
+        key = (nlp.vocab, threshold)
+        matcher = self._vector_matchers.get(key)
+        if matcher is not None:
+            return matcher
+
+        with self._matchers_lock:
+            matcher = self._vector_matchers.get(key)
+            if matcher is None:
+                matcher = VectorMatcher(self, nlp, threshold)
+                self._vector_matchers[key] = matcher
+        return matcher
+
+    def match(self, doc: Doc) -> list[tuple[int, str]]:
+        """Finds all keyword tokens within a Doc in a single pass.
+
+        Args:
+            doc (Doc): The Doc to search for keywords.
+
+        Returns:
+            list[tuple[int, str]]: (token index, aspect) pairs for every keyword
+                token in the Doc, in order.
+        """
+        lemma_aspects = self._lemma_aspects
+        matches = []
+        for i, lemma in enumerate(doc.to_array(LEMMA).tolist()):
+            aspect = lemma_aspects.get(lemma, False)
+            if aspect is False:
+                aspect = self.get_lemma_aspect(lemma, doc)
+            if aspect is not None:
+                matches.append((i, aspect))
+        return matches
+
+
+class VectorMatcher:
+    """Matches tokens to aspects by the similarity of their word vectors.
+
+    The vectors of all keywords are normalized and stacked into a single
+    keyword-by-dimension matrix, grouped by aspect, when the matcher is built.
+    The vectors of all candidate tokens in a batch of Docs are then gathered
+    from the vector table and scored against every keyword with one matrix
+    multiplication, so the cost per Doc does not grow with the number of
+    keywords in Python. A token is matched to the aspect of its most similar
+    keyword if their cosine similarity is at least the threshold.
+
+    Candidate tokens are alphabetic, not stop words and have a vector. Multi-
+    word keywords are represented by the mean of their words' vectors.
+
+    Attributes:
+        threshold (float): Minimum cosine similarity for a token to match.
+        aspects (tuple[str, ...]): Names of the aspects.
+        keywords (tuple[str, ...]): Keywords with a vector, in matrix order.
+        keyword_matrix (numpy.ndarray): Unit-normalized float32 keyword
+            vectors, of shape (len(keywords), vector width).
+        keyword_aspects (numpy.ndarray): Index into aspects of each keyword.
+    """
+
+    def __init__(self, aspect_index: AspectIndex, nlp: Language, threshold: float):
+        """Builds the keyword matrix of a taxonomy.
+
+        Args:
+            aspect_index (AspectIndex): The taxonomy.
+            nlp (Language): The spacy pipeline whose word vectors are used.
+            threshold (float): Minimum cosine similarity for a token to match.
+
+        Raises:
+            ValueError: Raised if the threshold is not in (0, 1], or if the
+                model has no word vectors or none for any keyword.
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("Similarity threshold must be in (0, 1]")
+        if not nlp.vocab.vectors.shape[0]:
+            raise ValueError("The model has no word vectors")
+        self.threshold = threshold
+        self.aspects = tuple(aspect_index.aspects)
+        self._vectors = nlp.vocab.vectors
+        self._strings = nlp.vocab.strings
+
+        keywords = []
+        rows = []
+        aspect_ids = []
+        seen = set()
+        for aspect_id, aspect in enumerate(self.aspects):
+            for keyword in aspect_index.aspects[aspect]:
+                # As for exact matches, a keyword is mapped to its first aspect
+                if keyword.lower() in seen:
+                    continue
+                seen.add(keyword.lower())
+                words = [token.text for token in nlp.tokenizer(keyword)]
+                vectors = self.get_vectors(words, [word.lower() for word in words])
+                vectors = vectors[numpy.any(vectors, axis=1)]
+                if not len(vectors):
+                    continue
+                keywords.append(keyword)
+                rows.append(vectors.mean(axis=0))
+                aspect_ids.append(aspect_id)
+
+        if not keywords:
+            raise ValueError("None of the keywords have a word vector in the model")
+
+        self.keywords = tuple(keywords)
+        self.keyword_matrix = normalize_rows(numpy.vstack(rows))
+        self.keyword_aspects = numpy.array(aspect_ids, dtype=numpy.intp)
+
+    def __repr__(self) -> str:
+        return f"VectorMatcher(threshold={self.threshold!r})"
+
+    def get_vectors(self, keys: list, lower_keys: list) -> numpy.ndarray:
+        """Gets float32 vectors of words, or zeros for words without a vector.
+
+        Args:
+            keys (list): The words, or their hashes.
+            lower_keys (list): The words, or their hashes, in lowercase. Used
+                for words whose own case has no vector.
+
+        Returns:
+            numpy.ndarray: One row per word.
+        """
+        vectors = self._vectors
+        if vectors.mode != "default":
+            # Floret vectors are computed from subwords, so every word has one
+            strings = [self._strings.as_string(key) for key in keys]
+            return numpy.asarray(vectors.get_batch(strings), dtype=numpy.float32)
+
+        rows = vectors.find(keys=keys)
+        missing = rows < 0
+        if missing.any():
+            indices = numpy.flatnonzero(missing)
+            rows[indices] = vectors.find(keys=[lower_keys[i] for i in indices])
+        data = numpy.asarray(vectors.data, dtype=numpy.float32)
+        found = data[rows]
+        found[rows < 0] = 0
+        return found
+
+    def match(
+        self,
+        doc: Doc,
+        exclude: Iterable[int] = (),
+    ) -> list[tuple[int, str]]:
+        """Finds tokens of a Doc similar to a keyword.
+
+        Args:
+            doc (Doc): The Doc to search.
+            exclude (Iterable[int], optional): Indices of tokens not to match,
+                e.g. as they already match a keyword exactly. Defaults to ().
+
+        Returns:
+            list[tuple[int, str]]: (token index, aspect) pairs, in order.
+        """
+        return self.match_batch([doc], [exclude])[0]
+
+    def match_batch(
+        self,
+        docs: list[Doc],
+        excludes: list[Iterable[int]] | None = None,
+    ) -> list[list[tuple[int, str]]]:
+        """Finds tokens similar to a keyword in a batch of Docs.
+
+        All candidate tokens of the batch are scored with a single matrix
+        multiplication.
+
+        Args:
+            docs (list[Doc]): The Docs to search.
+            excludes (list[Iterable[int]] | None, optional): For each Doc,
+                indices of tokens not to match. Defaults to None.
+
+        Returns:
+            list[list[tuple[int, str]]]: For each Doc, (token index, aspect)
+                pairs, in order.
+        """
+        doc_ids = []
+        token_ids = []
+        keys = []
+        lower_keys = []
+        for doc_id, doc in enumerate(docs):
+            if not len(doc):
+                continue
+            array = doc.to_array([ORTH, LOWER, IS_ALPHA, IS_STOP])
+            candidates = (array[:, 2] == 1) & (array[:, 3] == 0)
+            if excludes is not None:
+                candidates[list(excludes[doc_id])] = False
+            indices = numpy.flatnonzero(candidates)
+            doc_ids.extend([doc_id] * len(indices))
+            token_ids.extend(indices.tolist())
+            keys.extend(array[indices, 0].tolist())
+            lower_keys.extend(array[indices, 1].tolist())
+
+        matches = [[] for _ in docs]
+        if not keys:
+            return matches
+
+        token_matrix = self.get_vectors(keys, lower_keys)
+        scores = normalize_rows(token_matrix) @ self.keyword_matrix.T
+        best = scores.argmax(axis=1)
+        similarities = scores[numpy.arange(len(best)), best]
+        for i in numpy.flatnonzero(similarities >= self.threshold).tolist():
+            aspect = self.aspects[self.keyword_aspects[best[i]]]
+            matches[doc_ids[i]].append((token_ids[i], aspect))
+        return matches
+
+
+def normalize_rows(matrix: numpy.ndarray) -> numpy.ndarray:
+    """Scales the rows of a matrix to unit length, leaving zero rows as zeros.
+
+    Args:
+        matrix (numpy.ndarray): A 2D float matrix.
+
+    Returns:
+        numpy.ndarray: The normalized float32 matrix.
+    """
+    norms = numpy.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).astype(numpy.float32, copy=False)
+
+
+def freeze_aspects(aspects: dict) -> tuple:
+    """Converts a dictionary of aspects into a hashable, order-preserving tuple.
+
+    Args:
+        aspects (dict): Dictionary of aspects and corresponding keywords.
+
+    Returns:
+        tuple: Tuple of (aspect, (keyword1, keyword2, ...)) tuples.
+    """
+    return tuple((aspect, tuple(keywords)) for aspect, keywords in aspects.items())
+
+
+def compile_aspects(aspects: dict) -> AspectIndex:
+    """Gets the compiled AspectIndex for a dictionary of aspects.
+
+    Compiled indexes are cached, so repeated calls with equal aspects will
+    return the same AspectIndex object.
+
+    Args:
+        aspects (dict): Dictionary of aspects and corresponding keywords.
+
+    Returns:
+        AspectIndex: The compiled index.
+    """
+    return compile_frozen_aspects(freeze_aspects(aspects))
+
+
+@lru_cache(maxsize=32)
+def compile_frozen_aspects(frozen_aspects: tuple) -> AspectIndex:
+    """Compiles an AspectIndex from aspects frozen by freeze_aspects()."""
+    return AspectIndex(dict(frozen_aspects))
+
+
+class TaxonomyRegistry:
+    """Cache of AspectIndexes compiled from .toml aspect files, reloaded on change.
+
+    Each file is read, parsed and compiled once. While a file is unchanged,
+    get() returns the same AspectIndex without reading it again. Files are
+    checked for changes at most once every check_interval seconds, with a
+    single os.stat() call comparing their modification time and size. If
+    these differ, the file is read again and its content hashed, and it is
+    only parsed and compiled again if the content has changed. The new
+    AspectIndex then replaces the old one atomically, so concurrent callers
+    always get a complete index, either the old or the new one.
+
+    Attributes:
+        check_interval (float): Minimum time in seconds between checks of a
+            file for changes. 0 checks on every call.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        """Creates an empty registry.
+
+        Args:
+            check_interval (float, optional): Minimum time in seconds between
+                checks of a file for changes. Defaults to 1.0.
+        """
+        self.check_interval = check_interval
+        # Absolute path -> (index, mtime_ns, size, content hash, time checked)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, path: str) -> AspectIndex:
+        """Gets the compiled AspectIndex of an aspects file.
+
+        Args:
+            path (str): Path to a .toml aspects file.
+
+        Raises:
+            OSError: Raised if the file cannot be read, e.g. as it does not
+                exist.
+            tomllib.TOMLDecodeError: Raised if the file is not valid TOML.
+
+        Returns:
+            AspectIndex: The index compiled from the file's current content.
+        """
+        path = os.path.abspath(path)
+        entry = self._entries.get(path)
+        now = time.monotonic()
+        if entry is not None and now - entry[4] < self.check_interval:
+            return entry[0]
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._entries.pop(path, None)
+            raise
+        entry_stat = (stat.st_mtime_ns, stat.st_size)
+        if entry is not None and entry_stat == entry[1:3]:
+            self._entries[path] = (*entry[:4], now)
+            return entry[0]
+
+        with self._lock:
+            # Another thread may have reloaded the file while waiting
+            current = self._entries.get(path)
+            if current is not None and current[1:3] == entry_stat:
+                return current[0]
+
+            with open(path, "rb") as file:
+                content = file.read()
+            digest = hashlib.blake2b(content, digest_size=16).digest()
+            if entry is not None and digest == entry[3]:
+                index = entry[0]
+            else:
+                aspects = tomllib.loads(content.decode("utf-8"))
+                index = compile_aspects(aspects)
+            self._entries[path] = (index, *entry_stat, digest, now)
+        return index
+
+    def clear(self) -> None:
+        """Removes all files from the registry."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Registry used by the aspect sentiment pipeline for aspects passed as paths
+REGISTRY = TaxonomyRegistry()
+
+
+def load_aspects(path: str) -> AspectIndex:
+    """Gets the compiled AspectIndex of an aspects file, via REGISTRY.
+
+    The file is only read again once it has changed. See TaxonomyRegistry.
+
+    Args:
+        path (str): Path to a .toml aspects file.
+
+    Raises:
+        OSError: Raised if the file cannot be read, e.g. as it does not exist.
+        tomllib.TOMLDecodeError: Raised if the file is not valid TOML.
+
+    Returns:
+        AspectIndex: The index compiled from the file's current content.
+    """
+    return REGISTRY.get(path)
@@ -0,0 +1,497 @@
+"""Streaming writers for the results of the aspect sentiment pipeline.
+
+This module contains writers which flatten processed Docs into one record per
+Doc and write them incrementally to JSONL, CSV or (if pyarrow is installed)
+Parquet files. Records are buffered and written in blocks of buffer_size, so
+memory use stays bounded however many Docs are written, and streams from
+make_docs() can be written as they are produced.
+
+Each record holds the row ID of the Doc, one column per aspect containing its
+sentiment score (or None if the aspect is not mentioned), and a 'keywords'
+column listing every keyword found along with its character offsets and those
+of its parent span. See write_docs() for the simplest way to use the writers.
+"""
+
+import csv
+import json
+import os
+from typing import Any, Iterable
+
+from la_nlp import components, results
+
+from spacy.tokens import Doc
+
+# Name of the row ID and keywords columns
+ID_COLUMN = "id"
+KEYWORDS_COLUMN = "keywords"
+
+# Fields of each entry of the keywords column
+KEYWORD_FIELDS = (
+    "keyword",
+    "aspect",
+    "start",
+    "end",
+    "span_start",
+    "span_end",
+    "sentiment",
+)
+
+# Default number of records buffered before being written
+DEFAULT_BUFFER_SIZE = 1000
+
+
+def get_keyword_records(doc: Doc) -> list[dict]:
+    """Gets the keywords of a processed Doc as a list of flat dictionaries.
+
+    Args:
+        doc (Doc): Doc processed by the aspect sentiment pipeline.
+
+    Returns:
+        list[dict]: One dictionary per keyword, with the keys in KEYWORD_FIELDS.
+            The keyword is identified by its lemma, or by the keyword it
+            matched for multi-word keywords, as in results.from_doc().
+            Offsets are character offsets into the Doc's text, with end offsets
+            exclusive.
+    """
+    keywords = doc._.keywords
+    if not keywords:
+        return []
+
+    records = []
+    for keyword in keywords:
+        span = keyword._.parent_span
+        keyword_span = components.get_keyword_span(keyword)
+        records.append(
+            {
+                "keyword": keyword_span.label_,
+                "aspect": keyword._.aspect,
+                "start": keyword_span.start_char,
+                "end": keyword_span.end_char,
+                "span_start": span.start_char,
+                "span_end": span.end_char,
+                "sentiment": span._.sentiment,
+            }
+        )
+    return records
+
+
+def get_record(doc: Doc, row_id: Any, aspects: Iterable[str]) -> dict:
+    """Flattens a processed Doc into a single record.
+
+    Args:
+        doc (Doc): Doc processed by the aspect sentiment pipeline.
+        row_id (Any): The ID of the row, e.g. its index in the input.
+        aspects (Iterable[str]): The aspects to include as columns.
+
+    Returns:
+        dict: Dictionary of the row ID, the sentiment of each aspect and the
+            list of keyword records (see get_keyword_records()).
+    """
+    aspect_sentiments = doc._.aspect_sentiments or {}
+    record = {ID_COLUMN: row_id}
+    for aspect in aspects:
+        record[aspect] = aspect_sentiments.get(aspect)
+    record[KEYWORDS_COLUMN] = get_keyword_records(doc)
+    return record
+
+
+class ResultWriter:
+    """Base class for writers of aspect sentiment results.
+
+    Writers are used as context managers, or closed explicitly with close().
+    If an error is raised within the context before the output file has been
+    opened, the file is not created or truncated.
+    Docs are added with write() or write_many(), flattened by get_record() and
+    buffered until buffer_size records are pending, at which point they are
+    written in a single block by the subclass's write_records().
+
+    Attributes:
+        path (str): Path of the output file.
+        aspects (list | None): The aspect columns. If None, these are taken
+            from the 'aspect_sentiments' attribute of the first Doc written.
+        buffer_size (int): Maximum number of records buffered before writing.
+        append (bool): Whether records are appended to an existing file.
+        count (int): Number of records written so far, including any still
+            buffered.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        aspects: dict | Iterable[str] | None = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        append: bool = False,
+    ):
+        """Creates the writer. The output file is opened on the first write.
+
+        Args:
+            path (str): Path of the output file.
+            aspects (dict | Iterable[str] | None, optional): The aspects, or
+                aspect names, to write a column for. Defaults to None, in which
+                case the aspects of the first Doc written are used.
+            buffer_size (int, optional): Maximum number of records buffered
+                before writing. Defaults to DEFAULT_BUFFER_SIZE.
+            append (bool, optional): Whether to append to the file if it exists
+                rather than overwrite it. Defaults to False.
+        """
+        self.path = path
+        self.aspects = list(aspects) if aspects is not None else None
+        self.buffer_size = max(buffer_size, 1)
+        self.append = append
+        self.count = 0
+        self._buffer = []
+        self._opened = False
+        self._closed = False
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # After an error, an output file which was never opened is left as is
+        if exc_type is None or self._opened:
+            self.close()
+        else:
+            self._buffer = []
+            self._closed = True
+
+    @property
+    def columns(self) -> list[str]:
+        """list[str]: The names of the columns written, in order."""
+        return [ID_COLUMN, *self.aspects, KEYWORDS_COLUMN]
+
+    def write(
+        self,
+        doc: Doc | results.AspectSentimentResult,
+        row_id: Any = None,
+    ) -> None:
+        """Adds a processed Doc, or a result from make_results(), to the output.
+
+        Args:
+            doc (Doc | results.AspectSentimentResult): Doc processed by the
+                aspect sentiment pipeline, or a detached result.
+            row_id (Any, optional): The ID of the row. Defaults to None, in
+                which case the id of the result is used if set, or else the
+                number of records written so far.
+
+        Raises:
+            ValueError: Raised if the writer has been closed.
+        """
+        if self._closed:
+            raise ValueError("Cannot write to a closed writer")
+
+        if isinstance(doc, results.AspectSentimentResult):
+            if self.aspects is None:
+                self.aspects = list(doc.aspect_names)
+            if row_id is None:
+                row_id = self.count if doc.id is None else doc.id
+            record = doc.to_record(row_id, self.aspects)
+        else:
+            if self.aspects is None:
+                self.aspects = list(doc._.aspect_sentiments or {})
+            if row_id is None:
+                row_id = self.count
+            record = get_record(doc, row_id, self.aspects)
+
+        self._buffer.append(record)
+        self.count += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_many(self, docs: Iterable[Doc] | Iterable[tuple[Doc, Any]]) -> int:
+        """Adds a stream of processed Docs to the output.
+
+        Args:
+            docs (Iterable[Doc] | Iterable[tuple[Doc, Any]]): The Docs, or
+                (Doc, row ID) tuples such as those yielded by make_docs() with
+                as_tuples=True.
+
+        Returns:
+            int: Number of Docs added.
+        """
+        n = 0
+        for item in docs:
+            if isinstance(item, tuple):
+                self.write(*item)
+            else:
+                self.write(item)
+            n += 1
+        return n
+
+    def flush(self) -> None:
+        """Writes all buffered records to the output file."""
+        if not self._buffer:
+            return
+        if not self._opened:
+            self.open()
+            self._opened = True
+        self.write_records(self._buffer)
+        self._buffer = []
+
+    def sync(self) -> int:
+        """Writes all buffered records and flushes the output file to disk.
+
+        Used to checkpoint long runs: once this returns, the records written so
+        far are on disk and occupy the returned number of bytes of the file.
+
+        Raises:
+            NotImplementedError: Raised if the format does not support syncing
+                a partly written file.
+
+        Returns:
+            int: Size of the output file in bytes.
+        """
+        self.flush()
+        if not self._opened:
+            self.open()
+            self._opened = True
+        self.sync_file()
+        return os.path.getsize(self.path)
+
+    def close(self) -> None:
+        """Writes any buffered records and closes the output file."""
+        if self._closed:
+            return
+        if self.aspects is None:
+            self.aspects = []
+        if not self._opened:
+            self.open()
+            self._opened = True
+        self.flush()
+        self.finalize()
+        self._closed = True
+
+    def open(self) -> None:
+        """Opens the output file. Called before the first block is written."""
+        raise NotImplementedError
+
+    def write_records(self, records: list[dict]) -> None:
+        """Writes a block of records to the open output file.
+
+        Args:
+            records (list[dict]): Records returned by get_record().
+        """
+        raise NotImplementedError
+
+    def sync_file(self) -> None:
+        """Flushes the open output file to disk."""
+        raise NotImplementedError
+
+    def finalize(self) -> None:
+        """Closes the output file."""
+        raise NotImplementedError
+
+
+class JSONLWriter(ResultWriter):
+    """Writes one JSON object per line, with keywords as a list of objects."""
+
+    def open(self) -> None:
+        self._file = open(self.path, "a" if self.append else "w", encoding="utf-8")
+
+    def write_records(self, records: list[dict]) -> None:
+        dumps = json.JSONEncoder(ensure_ascii=False).encode
+        self._file.write("".join([dumps(record) + "\n" for record in records]))
+
+    def sync_file(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def finalize(self) -> None:
+        self._file.close()
+
+
+class CSVWriter(ResultWriter):
+    """Writes one CSV row per record, with keywords encoded as a JSON list.
+
+    Aspects that are not mentioned in a Doc are written as empty cells. The
+    header row is only written when creating a new file, so when appending,
+    the aspects should match those of the existing file.
+    """
+
+    def open(self) -> None:
+        write_header = not (
+            self.append and os.path.isfile(self.path) and os.path.getsize(self.path)
+        )
+        self._file = open(
+            self.path,
+            "a" if self.append else "w",
+            encoding="utf-8",
+            newline="",
+        )
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(self.columns)
+
+    def write_records(self, records: list[dict]) -> None:
+        dumps = json.JSONEncoder(ensure_ascii=False).encode
+        columns = self.columns[:-1]
+        self._writer.writerows(
+            [
+                [record[column] for column in columns]
+                + [dumps(record[KEYWORDS_COLUMN])]
+                for record in records
+            ]
+        )
+
+    def sync_file(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def finalize(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter(ResultWriter):
+    """Writes records to a Parquet file, one row group per block of records.
+
+    Requires the optional pyarrow dependency. Row IDs are stored as strings,
+    aspect sentiments as nullable doubles and keywords as a list of structs.
+    Parquet files cannot be appended to, so append must be False.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Creates the writer. See ResultWriter.
+
+        Raises:
+            ImportError: Raised if pyarrow is not installed.
+            ValueError: Raised if append is True.
+        """
+        super().__init__(*args, **kwargs)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError(
+                "Writing Parquet files requires pyarrow. Install it with "
+                "'pip install pyarrow'."
+            ) from e
+        if self.append:
+            raise ValueError("Parquet files cannot be appended to")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+
+    def open(self) -> None:
+        pa = self._pa
+        keyword_type = pa.struct(
+            [
+                ("keyword", pa.string()),
+                ("aspect", pa.string()),
+                ("start", pa.int64()),
+                ("end", pa.int64()),
+                ("span_start", pa.int64()),
+                ("span_end", pa.int64()),
+                ("sentiment", pa.float64()),
+            ]
+        )
+        self._schema = pa.schema(
+            [(ID_COLUMN, pa.string())]
+            + [(aspect, pa.float64()) for aspect in self.aspects]
+            + [(KEYWORDS_COLUMN, pa.list_(keyword_type))]
+        )
+        self._writer = self._pq.ParquetWriter(self.path, self._schema)
+
+    def write_records(self, records: list[dict]) -> None:
+        columns = {
+            column: [record[column] for record in records] for column in self.columns
+        }
+        columns[ID_COLUMN] = [str(row_id) for row_id in columns[ID_COLUMN]]
+        table = self._pa.Table.from_pydict(columns, schema=self._schema)
+        self._writer.write_table(table)
+
+    def finalize(self) -> None:
+        self._writer.close()
+
+
+# Writer classes keyed by format name
+WRITERS = {
+    "jsonl": JSONLWriter,
+    "csv": CSVWriter,
+    "parquet": ParquetWriter,
+}
+
+# Formats keyed by file extension
+EXTENSIONS = {
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+def get_writer(
+    path: str,
+    aspects: dict | Iterable[str] | None = None,
+    format: str | None = None,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    append: bool = False,
+) -> ResultWriter:
+    """Creates a writer for a file, choosing its format from its extension.
+
+    Args:
+        path (str): Path of the output file.
+        aspects (dict | Iterable[str] | None, optional): The aspects to write a
+            column for. Defaults to None, in which case the aspects of the
+            first Doc written are used.
+        format (str | None, optional): One of 'jsonl', 'csv' or 'parquet'.
+            Defaults to None, in which case it is inferred from the extension.
+        buffer_size (int, optional): Maximum number of records buffered before
+            writing. Defaults to DEFAULT_BUFFER_SIZE.
+        append (bool, optional): Whether to append to the file if it exists.
+            Defaults to False.
+
+    Raises:
+        ValueError: Raised if the format is not supported or cannot be inferred.
+        ImportError: Raised if the format is 'parquet' and pyarrow is not
+            installed.
+
+    Returns:
+        ResultWriter: The writer.
+    """
+    if format is None:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in EXTENSIONS:
+            raise ValueError(f"Cannot infer output format of {path!r}")
+        format = EXTENSIONS[extension]
+    if format not in WRITERS:
+        raise ValueError(f"Unsupported output format {format!r}")
+    return WRITERS[format](path, aspects, buffer_size, append)
+
+
+def write_docs(
+    docs: Iterable[Doc] | Iterable[tuple[Doc, Any]],
+    path: str,
+    aspects: dict | Iterable[str] | None = None,
+    format: str | None = None,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    append: bool = False,
+) -> int:
+    """Writes a stream of processed Docs to a file.
+
+    Intended for use with make_docs(), e.g.
+    write_docs(make_docs(texts, as_tuples=True), 'results.csv'). Docs are
+    consumed lazily, so only one buffer of records is held in memory at once.
+
+    Args:
+        docs (Iterable[Doc] | Iterable[tuple[Doc, Any]]): The processed Docs,
+            or (Doc, row ID) tuples.
+        path (str): Path of the output file.
+        aspects (dict | Iterable[str] | None, optional): The aspects to write a
+            column for. Defaults to None, in which case the aspects of the
+            first Doc are used.
+        format (str | None, optional): One of 'jsonl', 'csv' or 'parquet'.
+            Defaults to None, in which case it is inferred from the extension.
+        buffer_size (int, optional): Maximum number of records buffered before
+            writing. Defaults to DEFAULT_BUFFER_SIZE.
+        append (bool, optional): Whether to append to the file if it exists.
+            Defaults to False.
+
+    Raises:
+        ValueError: Raised if the format is not supported or cannot be inferred.
+        ImportError: Raised if the format is 'parquet' and pyarrow is not
+            installed.
+
+    Returns:
+        int: Number of records written.
+    """
+    with get_writer(path, aspects, format, buffer_size, append) as writer:
+        return writer.write_many(docs)
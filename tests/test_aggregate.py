@@ -0,0 +1,100 @@
+"""Test functions for the la_nlp.aggregate module.
+"""
+
+import pickle
+import random
+import statistics
+from la_nlp.pipes import aspect_sentiment as asp
+from la_nlp import aggregate
+import pytest
+
+ASPECTS = {"Food": ["food"], "Service": ["service"]}
+
+
+def get_rows(n, seed=0):
+    """Returns n random (aspect sentiments, group) rows."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        sentiments = {
+            "Food": rng.uniform(-1, 1),
+            "Service": rng.uniform(-1, 1) if rng.random() < 0.5 else None,
+        }
+        rows.append((sentiments, rng.choice(["A", "B", "C"])))
+    return rows
+
+
+def test_aggregator_statistics():
+    """Tests that statistics match those computed over all values"""
+    rows = get_rows(500)
+    aggregator = aggregate.Aggregator()
+    for sentiments, group in rows:
+        aggregator.add(sentiments, group)
+
+    for group in "ABC":
+        values = [s["Service"] for s, g in rows if g == group]
+        values = [value for value in values if value is not None]
+        stats = aggregator.get(group, "Service")
+        assert stats.count == len(values)
+        assert stats.mean == pytest.approx(statistics.mean(values))
+        assert stats.variance == pytest.approx(statistics.variance(values))
+        assert stats.min == min(values)
+        assert stats.max == max(values)
+        assert sum(stats.histogram) == len(values)
+        assert aggregator.docs[group] == sum(1 for _, g in rows if g == group)
+
+    assert len(aggregator) == 6
+
+
+def test_aggregator_histogram():
+    aggregator = aggregate.Aggregator(bins=4)
+    assert aggregator.get_bin_edges() == [-1.0, -0.5, 0.0, 0.5, 1.0]
+    for score in [-1.0, -0.4, 0.0, 0.2, 1.0, 1.5]:
+        aggregator.add({"Food": score})
+    assert aggregator.get(None, "Food").histogram == [1, 1, 2, 2]
+
+
+def test_aggregator_merge():
+    """Tests that merged partial aggregators match a single aggregator"""
+    rows = get_rows(300, seed=1)
+    single = aggregate.Aggregator().add_many(*zip(*rows))
+    parts = [aggregate.Aggregator().add_many(*zip(*rows[i::3])) for i in range(3)]
+    # Partial aggregators may come from worker processes
+    parts = [pickle.loads(pickle.dumps(part)) for part in parts]
+    merged = aggregate.merge(parts)
+
+    assert merged.docs == single.docs
+    assert set(merged.stats) == set(single.stats)
+    for key, stats in single.stats.items():
+        other = merged.stats[key]
+        assert other.count == stats.count
+        assert other.histogram == stats.histogram
+        assert other.mean == pytest.approx(stats.mean)
+        assert other.variance == pytest.approx(stats.variance)
+        assert (other.min, other.max) == (stats.min, stats.max)
+
+
+def test_aggregator_merge_errors():
+    with pytest.raises(ValueError):
+        aggregate.Aggregator(bins=4).merge(aggregate.Aggregator(bins=5))
+    with pytest.raises(ValueError):
+        aggregate.merge([])
+
+
+def test_aggregator_pipeline_output():
+    """Tests that Docs and results are aggregated alike"""
+    texts = ["The food was great.", "The food was awful but the service was fine."]
+    groups = [("CPSC 110", "2024W"), ("CPSC 110", "2024W")]
+    from_docs = aggregate.Aggregator().add_many(
+        asp.make_docs(texts, aspects=ASPECTS), groups
+    )
+    from_results = aggregate.Aggregator().add_many(
+        asp.make_results(texts, aspects=ASPECTS), groups
+    )
+    records = list(from_results.to_records())
+    assert records == list(from_docs.to_records())
+    assert [(r["aspect"], r["docs"], r["count"]) for r in records] == [
+        ("Food", 2, 2),
+        ("Service", 2, 1),
+    ]
+    assert records[1]["variance"] is None
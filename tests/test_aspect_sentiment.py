@@ -2,8 +2,10 @@
 """
 
 import os
+import subprocess
+import sys
 from la_nlp.pipes import aspect_sentiment as asp
-from la_nlp import utils
+from la_nlp import sentiment, taxonomy, utils
 import pytest
 from spacy.tokens import Doc
 
@@ -91,6 +93,32 @@ def doc7():
     return doc
 
 
+def test_import_does_not_load_model():
+    """Tests that importing the module does not load a spacy model."""
+    code = (
+        "import sys; import la_nlp.pipes.aspect_sentiment as asp; "
+        "assert not asp._MODELS; "
+        "assert 'en_core_web_lg' not in sys.modules"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(FILE_DIR))
+    assertion = "Importing aspect_sentiment should not load a model"
+    assert result.returncode == 0, assertion
+
+
+def test_function_get_nlp():
+    """Tests that get_nlp() loads each model once, with the pipe added."""
+    nlp = asp.get_nlp()
+    assert nlp is asp.get_nlp("en_core_web_lg")
+    assert nlp.pipe_names[-1] == "aspect_sentiment_pipe"
+
+
+def test_model_from_environment_variable(monkeypatch):
+    """Tests that the model name can be set via environment variable."""
+    monkeypatch.setenv(asp.MODEL_ENV_VAR, "some_model")
+    assert asp.get_model_name() == "some_model"
+    assert asp.get_model_name("other_model") == "other_model"
+
+
 def test_function_make_doc(doc1, doc3):
     """Tests that the make_doc() function returns a spacy Doc object."""
     assertion1 = "Should be a spacy Doc object"
@@ -102,6 +130,41 @@ def test_function_make_doc(doc1, doc3):
     assert isinstance(doc3, Doc)
 
 
+def test_function_make_docs():
+    """Tests that make_docs() yields Docs matching those made by make_doc()."""
+    texts = [TEST_TEXT_1, TEST_TEXT_2, TEST_TEXT_3]
+    docs = asp.make_docs(texts, aspects=ASPECTS_1, batch_size=2)
+
+    assertion1 = "make_docs() should return a generator, not a list"
+    assert not isinstance(docs, list), assertion1
+
+    docs = list(docs)
+    assertion2 = "Should yield one Doc per input text"
+    assert len(docs) == len(texts), assertion2
+
+    assertion3 = "Aspect sentiments should match those from make_doc()"
+    for text, doc in zip(texts, docs):
+        target = asp.make_doc(text, aspects=ASPECTS_1)._.aspect_sentiments
+        assert doc._.aspect_sentiments == target, assertion3
+
+
+def test_function_make_docs_as_tuples():
+    """Tests that make_docs() carries context through when as_tuples=True."""
+    rows = [(TEST_TEXT_1, "row-1"), (TEST_TEXT_2, "row-2")]
+    results = list(asp.make_docs(rows, aspects=ASPECTS_1, as_tuples=True))
+
+    assertion = "Contexts should be yielded alongside their Docs, in order"
+    assert [context for _, context in results] == ["row-1", "row-2"], assertion
+    assert results[0][0]._.contains_aspect == True
+    assert results[1][0]._.contains_aspect == False
+
+
+def test_make_docs_error_from_non_path_aspects_string():
+    """Tests that make_docs() raises ValueError before iteration begins."""
+    with pytest.raises(ValueError):
+        asp.make_docs([TEST_TEXT_1], aspects="Not a path")
+
+
 def test_attribute_contains_aspect(doc1, doc2):
     """Tests that docs are assigned the contains_aspect attribute as expected."""
     assertion1 = "doc1 should return True"
@@ -231,17 +294,55 @@ def test_make_doc_error_from_non_path_aspects_string():
         assert excinfo.value == target_error, assertion
 
 
+def test_make_doc_error_from_unknown_sentiment_backend():
+    """Tests that make_doc() raises ValueError for unregistered backends."""
+    with pytest.raises(ValueError):
+        asp.make_doc(TEST_TEXT_1, sentiment_backend="not a backend")
+
+
+def test_make_doc_with_sentiment_backend():
+    """Tests that spans are scored by the sentiment backend passed by name."""
+
+    class ConstantBackend(sentiment.SentimentBackend):
+        def score_texts(self, texts):
+            return [0.5] * len(texts)
+
+    sentiment.register_backend("constant")(ConstantBackend)
+    doc = asp.make_doc(TEST_TEXT_1, aspects=ASPECTS_1, sentiment_backend="constant")
+
+    assertion = "All mentioned aspects should have a sentiment of 0.5"
+    mentioned = [v for v in doc._.aspect_sentiments.values() if v is not None]
+    assert mentioned == [0.5, 0.5, 0.5], assertion
+
+
 def test_multi_word_expression_keywords(doc5):
-    """Tests that multi-word expressions in aspect keywords are not split by tokenizer"""
-    target_len = 13
+    """Tests that multi-word expressions in aspect keywords are matched as spans"""
+    target_len = 16
     assertion1 = f"Length of doc should be {target_len} tokens"
     assert len(doc5) == target_len, assertion1
 
     target_kws = ["mid-term", "mid term"]
-    kws = [kw.lemma_ for kw in doc5._.keywords]
+    kws = [kw._.keyword_span.label_ for kw in doc5._.keywords]
     assertion2 = f"Keywords in doc should {target_kws}"
     assert kws == target_kws, assertion2
 
+    assertion3 = "Each keyword token should be the root of its keyword span"
+    assert all(kw == kw._.keyword_span.root for kw in doc5._.keywords), assertion3
+
+
+def test_multi_word_expression_keywords_vectors_unchanged():
+    """Tests that matching multi-word expressions does not modify the vectors."""
+    vectors = asp.get_nlp().vocab.vectors
+    shape = vectors.shape
+    n_keys = vectors.n_keys
+    data_id = id(vectors.data)
+    asp.make_doc(TEST_TEXT_5, aspects={"tests": ["mid-term", "mid term"]})
+
+    assertion = "The vectors table should not be resized or added to"
+    assert vectors.shape == shape, assertion
+    assert vectors.n_keys == n_keys, assertion
+    assert id(vectors.data) == data_id, assertion
+
 
 def test_multi_word_expression_keywords_capitalized():
     """Tests that capitalized multi-word expressions are processed properly.
@@ -257,8 +358,206 @@ def test_multi_word_expression_keywords_capitalized():
     assert len(doc._.keywords) == 1, assertion
 
 
+def test_multi_word_expression_keywords_tokenizer_unchanged():
+    """Tests that matching multi-word expressions does not modify the tokenizer."""
+    nlp = asp.get_nlp()
+    rules = dict(nlp.tokenizer.rules)
+    text = "Office hours were helpful, unlike the mid-term."
+    aspects = {"support": ["office hours"], "tests": ["mid-term"]}
+    doc = asp.make_doc(text, aspects)
+
+    assertion1 = "Tokenizer rules should not be modified"
+    assert nlp.tokenizer.rules == rules, assertion1
+
+    assertion2 = "Both multi-word keywords should be found"
+    assert [kw._.aspect for kw in doc._.keywords] == ["support", "tests"], assertion2
+
+
+def test_similarity_threshold():
+    """Tests that matching by word vectors only adds to the exact matches"""
+    exact = asp.make_doc(TEST_TEXT_4)
+    similar = asp.make_doc(TEST_TEXT_4, similarity_threshold=0.5)
+
+    exact_keywords = {kw.i: kw._.aspect for kw in exact._.keywords}
+    similar_keywords = {kw.i: kw._.aspect for kw in similar._.keywords}
+    assertion = "Exact matches should be kept, with the same aspects"
+    assert exact_keywords.items() <= similar_keywords.items(), assertion
+    assert all(aspect is not None for aspect in similar_keywords.values())
+
+
+def test_similarity_threshold_errors():
+    with pytest.raises(ValueError):
+        asp.make_doc(TEST_TEXT_1, similarity_threshold=1.5)
+    with pytest.raises(ValueError):
+        asp.make_docs([TEST_TEXT_1], similarity_threshold=0.7, prefilter=True)
+
+
 def test_anonymized(doc6):
     """Tests that text is being anonymized as intended"""
     target = "Professor *** was a great instructor."
     assertion = f"anonymized attribute should be {target}."
     assert doc6._.anonymized == target, assertion
+
+
+def test_anonymized_strategy():
+    """Tests that anonymization strategy and labels can be passed to make_doc()"""
+    doc = asp.make_doc(
+        TEST_TEXT_6,
+        anonymize=True,
+        anonymize_labels=["PERSON"],
+        anonymize_strategy="label",
+    )
+    target = "Professor [PERSON] was a great instructor."
+    assertion = f"anonymized attribute should be {target}."
+    assert doc._.anonymized == target, assertion
+
+
+def test_function_reanalyze():
+    """Tests that reanalyze() matches a fresh run and clears old attributes"""
+    doc = asp.make_doc(TEST_TEXT_1, aspects=ASPECTS_1)
+    doc = asp.reanalyze(doc, aspects=ASPECTS_3)
+    target = asp.make_doc(TEST_TEXT_1, aspects=ASPECTS_3)
+
+    assert doc._.contains_aspect == target._.contains_aspect == False
+    assert doc._.keywords is None
+    assert doc._.aspect_sentiments == target._.aspect_sentiments
+    assert all(token._.aspect is None for token in doc)
+
+
+def test_function_reanalyze_many():
+    docs = list(asp.make_docs([TEST_TEXT_1, TEST_TEXT_4], aspects=ASPECTS_3))
+    docs = asp.reanalyze(docs, aspects=ASPECTS_1, parent_span_min_length=3)
+    targets = asp.make_docs(
+        [TEST_TEXT_1, TEST_TEXT_4], aspects=ASPECTS_1, parent_span_min_length=3
+    )
+    for doc, target in zip(docs, targets):
+        assert doc._.aspect_sentiments == target._.aspect_sentiments
+        spans = [(t._.parent_span.start, t._.parent_span.end) for t in doc._.keywords]
+        assert spans == [
+            (t._.parent_span.start, t._.parent_span.end) for t in target._.keywords
+        ]
+
+
+def test_function_reanalyze_profile(monkeypatch):
+    """Tests that reanalyze() and sweeps use the model loaded with the profile"""
+    doc = asp.make_doc(TEST_TEXT_1, aspects=ASPECTS_1, profile="absa")
+    get_nlp = asp.get_nlp
+    profiles = []
+
+    def record_profile(model=None, profile=None):
+        profiles.append(profile)
+        return get_nlp(model, profile)
+
+    monkeypatch.setattr(asp, "get_nlp", record_profile)
+    doc = asp.reanalyze(doc, aspects=ASPECTS_1, profile="absa")
+    target = asp.make_doc(TEST_TEXT_1, aspects=ASPECTS_1, profile="absa")
+    assert doc._.aspect_sentiments == target._.aspect_sentiments
+
+    asp.sweep_parent_span_lengths(doc, [3, 7], aspects=ASPECTS_1, profile="absa")
+    assert profiles and set(profiles) == {"absa"}
+
+
+def test_function_sweep_parent_span_lengths():
+    """Tests that a sweep gives the same sentiments as separate runs"""
+    min_lengths = [0, 3, 7, 20]
+    docs = list(asp.make_docs([TEST_TEXT_1, TEST_TEXT_2, TEST_TEXT_4]))
+    sweeps = asp.sweep_parent_span_lengths(docs, min_lengths)
+    assert len(sweeps) == len(docs)
+    for doc, sweep in zip(docs, sweeps):
+        assert list(sweep) == min_lengths
+        for min_length in min_lengths:
+            target = asp.make_doc(doc.text, parent_span_min_length=min_length)
+            assert sweep[min_length] == target._.aspect_sentiments
+
+
+def test_profile_absa():
+    """Tests that the 'absa' profile excludes NER at load time"""
+    nlp = asp.get_nlp(profile="absa")
+    assert "ner" not in nlp.pipe_names
+    assert asp.get_nlp(profile="absa") is nlp
+
+    doc = asp.make_doc(TEST_TEXT_1, profile="absa")
+    target = asp.make_doc(TEST_TEXT_1)
+    assert doc._.aspect_sentiments == target._.aspect_sentiments
+
+
+def test_profile_anonymize_only():
+    nlp = asp.get_nlp(profile="anonymize-only")
+    assert "ner" in nlp.pipe_names
+    doc = asp.make_doc(TEST_TEXT_6, profile="anonymize-only")
+    assert doc._.anonymized == "Professor *** was a great instructor."
+
+
+def test_profile_errors():
+    with pytest.raises(ValueError):
+        asp.make_doc(TEST_TEXT_1, profile="unknown")
+    with pytest.raises(ValueError):
+        asp.make_doc(TEST_TEXT_1, anonymize=True, profile="absa")
+
+
+def test_class_aspect_sentiment_pipeline():
+    """Tests that a pipeline gives the same results as make_doc()"""
+    pipeline = asp.AspectSentimentPipeline(aspects=ASPECTS_1_PATH)
+    assert pipeline.nlp is asp.get_nlp()
+
+    doc = pipeline(TEST_TEXT_4)
+    target = asp.make_doc(TEST_TEXT_4, aspects=ASPECTS_1)
+    assert doc._.aspect_sentiments == target._.aspect_sentiments
+    assert [t.i for t in doc._.keywords] == [t.i for t in target._.keywords]
+
+    docs = list(pipeline.pipe([TEST_TEXT_1, TEST_TEXT_4]))
+    assert docs[1]._.aspect_sentiments == target._.aspect_sentiments
+
+    result = pipeline.make_result(TEST_TEXT_4)
+    assert result.aspect_sentiments == target._.aspect_sentiments
+    results = list(pipeline.make_results([(TEST_TEXT_4, 7)], as_tuples=True))
+    assert results[0].id == 7
+
+
+def test_pipeline_immutable():
+    aspects = {"Food": ["food"], "Service": ["service"]}
+    pipeline = asp.AspectSentimentPipeline(aspects=aspects)
+    with pytest.raises(AttributeError):
+        pipeline.config = {}
+    with pytest.raises(TypeError):
+        pipeline.config["anonymize"] = True
+
+    # Changes to the aspects passed should not affect the pipeline
+    aspects["Food"].append("delicious")
+    assert pipeline(TEST_TEXT_7)._.keywords[0].text == "food"
+
+
+def test_pipeline_concurrent_taxonomies():
+    """Tests that pipelines with different taxonomies can run in many threads"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    pipelines = [
+        asp.AspectSentimentPipeline(aspects=ASPECTS_1),
+        asp.AspectSentimentPipeline(aspects=ASPECTS_3),
+    ]
+    texts = [TEST_TEXT_1, TEST_TEXT_4, TEST_TEXT_7]
+    targets = {
+        (i, text): pipeline(text)._.aspect_sentiments
+        for i, pipeline in enumerate(pipelines)
+        for text in texts
+    }
+
+    jobs = list(targets) * 20
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        outputs = executor.map(
+            lambda job: pipelines[job[0]](job[1])._.aspect_sentiments, jobs
+        )
+        for job, output in zip(jobs, outputs):
+            assert output == targets[job]
+
+
+def test_make_doc_reloads_aspects_file(tmp_path, monkeypatch):
+    """Tests that make_doc() uses the current content of an aspects file"""
+    monkeypatch.setattr(taxonomy.REGISTRY, "check_interval", 0)
+    path = tmp_path / "aspects.toml"
+    path.write_text('Food = ["food"]\n')
+    assert asp.make_doc(TEST_TEXT_7, aspects=str(path))._.aspects == ["Food"]
+
+    path.write_text('Food = ["food"]\nService = ["service"]\n')
+    doc = asp.make_doc(TEST_TEXT_7, aspects=str(path))
+    assert doc._.aspects == ["Food", "Service"]
@@ -0,0 +1,161 @@
+"""Test functions for the la_nlp.batching module.
+"""
+
+import asyncio
+import threading
+from la_nlp.pipes import aspect_sentiment as asp
+from la_nlp import batching
+import pytest
+from spacy.tokens import Doc
+
+ASPECTS = {"Food": ["food"], "Service": ["service"]}
+
+TEXTS = [
+    "The food was great.",
+    "The service was terrible but the food was fine.",
+    "This text mentions no aspects.",
+]
+
+
+class RecordingProcess:
+    """Process function recording the batches it is called with."""
+
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+
+    def __call__(self, texts, options):
+        self.batches.append((list(texts), options))
+        self.threads.add(threading.get_ident())
+        if options.get("fail"):
+            raise ValueError("Failed")
+        return [text.upper() for text in texts]
+
+
+def test_batcher_coalesces_concurrent_requests():
+    """Tests that concurrent requests are processed in one batch, in order"""
+
+    async def main():
+        process = RecordingProcess()
+        batcher = batching.MicroBatcher(process, max_batch_size=10, max_wait=0.05)
+        outputs = await asyncio.gather(*[batcher.submit(t) for t in ["a", "b", "c"]])
+        await batcher.close()
+        return process, outputs
+
+    process, outputs = asyncio.run(main())
+    assert outputs == ["A", "B", "C"]
+    assert process.batches == [(["a", "b", "c"], {})]
+    assert threading.get_ident() not in process.threads
+
+
+def test_batcher_max_batch_size():
+    """Tests that batches are no larger than max_batch_size"""
+
+    async def main():
+        process = RecordingProcess()
+        batcher = batching.MicroBatcher(process, max_batch_size=2, max_wait=0.05)
+        texts = [str(i) for i in range(5)]
+        outputs = await asyncio.gather(*[batcher.submit(t) for t in texts])
+        await batcher.close()
+        return process, outputs
+
+    process, outputs = asyncio.run(main())
+    assert outputs == [str(i) for i in range(5)]
+    assert [len(texts) for texts, _ in process.batches] == [2, 2, 1]
+
+
+def test_batcher_groups_options():
+    """Tests that requests with different options are processed separately"""
+
+    async def main():
+        process = RecordingProcess()
+        batcher = batching.MicroBatcher(process, max_wait=0.05)
+        outputs = await asyncio.gather(
+            batcher.submit("a", option=1),
+            batcher.submit("b", option=2),
+            batcher.submit("c", option=1),
+        )
+        await batcher.close()
+        return process, outputs
+
+    process, outputs = asyncio.run(main())
+    assert outputs == ["A", "B", "C"]
+    assert process.batches == [(["a", "c"], {"option": 1}), (["b"], {"option": 2})]
+
+
+def test_batcher_error():
+    """Tests that an error fails only the requests of its batch"""
+
+    async def main():
+        batcher = batching.MicroBatcher(RecordingProcess(), max_wait=0.05)
+        outputs = await asyncio.gather(
+            batcher.submit("a", fail=True),
+            batcher.submit("b"),
+            return_exceptions=True,
+        )
+        await batcher.close()
+        return outputs
+
+    failed, output = asyncio.run(main())
+    assert isinstance(failed, ValueError)
+    assert output == "B"
+
+
+def test_batcher_missing_results():
+    """Tests that requests fail rather than hang if results are missing"""
+
+    async def main():
+        batcher = batching.MicroBatcher(lambda texts, options: [], max_wait=0.05)
+        outputs = await asyncio.wait_for(
+            asyncio.gather(
+                batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+            ),
+            timeout=5,
+        )
+        await batcher.close()
+        return outputs
+
+    outputs = asyncio.run(main())
+    assert all(isinstance(output, ValueError) for output in outputs)
+
+
+def test_batcher_new_event_loop():
+    """Tests that a batcher can be used from successive event loops"""
+    batcher = batching.MicroBatcher(RecordingProcess())
+    assert asyncio.run(batcher.submit("a")) == "A"
+    assert asyncio.run(batcher.submit("b")) == "B"
+
+
+def test_function_amake_doc():
+    """Tests that amake_doc() matches make_doc() for concurrent calls"""
+
+    async def main():
+        return await asyncio.gather(*[asp.amake_doc(t, aspects=ASPECTS) for t in TEXTS])
+
+    docs = asyncio.run(main())
+    for text, doc in zip(TEXTS, docs):
+        expected = asp.make_doc(text, aspects=ASPECTS)
+        assert isinstance(doc, Doc)
+        assert doc.text == text
+        assert doc._.aspect_sentiments == expected._.aspect_sentiments
+
+
+def test_function_amake_result():
+    """Tests that amake_result() returns a detached result"""
+    batcher = batching.MicroBatcher(asp.make_docs_batch, max_wait=0.01)
+    result = asyncio.run(asp.amake_result(TEXTS[0], batcher, aspects=ASPECTS))
+    expected = asp.make_doc(TEXTS[0], aspects=ASPECTS)
+    assert result.aspect_sentiments == expected._.aspect_sentiments
+
+
+def test_function_amake_doc_batch_size():
+    """Tests that amake_doc() accepts the batch_size option of make_docs()"""
+    doc = asyncio.run(asp.amake_doc(TEXTS[0], aspects=ASPECTS, batch_size=10))
+    expected = asp.make_doc(TEXTS[0], aspects=ASPECTS)
+    assert doc._.aspect_sentiments == expected._.aspect_sentiments
+
+
+def test_amake_doc_error_from_non_path_aspects_string():
+    """Tests that amake_doc() raises the error of make_docs()"""
+    with pytest.raises(ValueError):
+        asyncio.run(asp.amake_doc(TEXTS[0], aspects="not a path"))
@@ -0,0 +1,220 @@
+"""Test functions for the la_nlp.cache module.
+"""
+
+import os
+from la_nlp.pipes import aspect_sentiment as asp
+from la_nlp import cache, results
+import pytest
+
+ASPECTS = {"Food": ["food"], "Service": ["service"]}
+
+TEXTS = [
+    "The food was great.",
+    "The service was terrible but the food was fine.",
+    "This text mentions no aspects.",
+]
+
+
+def test_function_get_text_key():
+    key = cache.get_text_key("text", "en_core_web_lg-3.0.0:parser")
+    assert key == cache.get_text_key("text", "en_core_web_lg-3.0.0:parser")
+    assert key != cache.get_text_key("text", "en_core_web_sm-3.0.0:parser")
+    assert key != cache.get_text_key("other text", "en_core_web_lg-3.0.0:parser")
+
+
+def test_function_get_model_key():
+    nlp = asp.get_nlp()
+    assert cache.get_model_key(nlp) != cache.get_model_key(nlp, disable=["ner"])
+    assert "aspect_sentiment_pipe" not in cache.get_model_key(nlp)
+
+
+def test_make_docs_parse_cache(tmp_path):
+    """Tests that a warm cache gives the same results without parsing."""
+    path = os.path.join(tmp_path, "cache")
+    parse_cache = cache.ParseCache(path, shard_size=2)
+
+    cold = list(asp.make_docs(TEXTS, aspects=ASPECTS, parse_cache=parse_cache))
+    assert parse_cache.info()["misses"] == len(TEXTS)
+    assert parse_cache.info()["shards"] == 2
+
+    parse_cache = cache.ParseCache(path)
+    warm = list(asp.make_docs(TEXTS, aspects=ASPECTS, parse_cache=parse_cache))
+    assert parse_cache.hits == len(TEXTS) and parse_cache.misses == 0
+
+    for cold_doc, warm_doc in zip(cold, warm):
+        assert warm_doc.text == cold_doc.text
+        assert [t.dep_ for t in warm_doc] == [t.dep_ for t in cold_doc]
+        assert warm_doc._.aspect_sentiments == cold_doc._.aspect_sentiments
+
+
+def test_make_docs_parse_cache_path_as_tuples(tmp_path):
+    path = os.path.join(tmp_path, "cache")
+    rows = [(text, i) for i, text in enumerate(TEXTS)]
+    list(asp.make_docs(rows, aspects=ASPECTS, as_tuples=True, parse_cache=path))
+    docs = list(asp.make_docs(rows, aspects=ASPECTS, as_tuples=True, parse_cache=path))
+    assert [context for _, context in docs] == [0, 1, 2]
+    assert len(cache.ParseCache(path)) == len(TEXTS)
+
+
+def test_parse_cache_eviction(tmp_path):
+    nlp = asp.get_nlp()
+    parse_cache = cache.ParseCache(tmp_path, shard_size=1)
+    for i, text in enumerate(TEXTS):
+        parse_cache.put(str(i), nlp.make_doc(text))
+    assert parse_cache.get("0", nlp.vocab) is not None
+
+    # Shard "0" was used most recently, so shard "1" is evicted first
+    parse_cache.max_size = parse_cache.size - 1
+    parse_cache.evict()
+    assert "1" not in parse_cache
+    assert "0" in parse_cache and "2" in parse_cache
+    assert parse_cache.size <= parse_cache.max_size
+
+
+def test_parse_cache_doc_copies(tmp_path):
+    """Tests that cached Docs are copied, so modifying them is safe."""
+    nlp = asp.get_nlp()
+    parse_cache = cache.ParseCache(tmp_path)
+    parse_cache.put("key", nlp.make_doc("mid term exams"))
+    doc = parse_cache.get("key", nlp.vocab)
+    with doc.retokenize() as retokenizer:
+        retokenizer.merge(doc[0:2])
+    assert len(parse_cache.get("key", nlp.vocab)) == 3
+
+
+def test_parse_cache_pending_duplicates(tmp_path):
+    """Tests that pending Docs are served without writing a new shard."""
+    nlp = asp.get_nlp()
+    parse_cache = cache.ParseCache(tmp_path)
+    parse_cache.put("key", nlp.make_doc(TEXTS[0]))
+    assert parse_cache.get("key", nlp.vocab).text == TEXTS[0]
+    assert parse_cache.info()["shards"] == 0
+
+    parse_cache.flush()
+    assert parse_cache.info()["shards"] == 1
+
+
+def test_parse_cache_pipe_single_stream(tmp_path, monkeypatch):
+    """Tests that all misses are parsed by a single call to nlp.pipe()."""
+    nlp = asp.get_nlp()
+    calls = []
+    pipe = nlp.pipe
+
+    def counting_pipe(*args, **kwargs):
+        # With as_tuples, Language.pipe() calls itself again without it
+        if kwargs.get("as_tuples"):
+            calls.append(kwargs)
+        return pipe(*args, **kwargs)
+
+    monkeypatch.setattr(nlp, "pipe", counting_pipe)
+    disable = list(cache.UNCACHED_COMPONENTS)
+    model_key = cache.get_model_key(nlp, disable)
+    parse_cache = cache.ParseCache(tmp_path)
+    for text in TEXTS[:2]:
+        doc = nlp(text, disable=disable)
+        parse_cache.put(cache.get_text_key(text, model_key), doc)
+    parse_cache.flush()
+
+    texts = TEXTS + TEXTS[::-1] + TEXTS
+    docs = list(parse_cache.pipe(nlp, texts, batch_size=1, disable=disable))
+    assert [doc.text for doc in docs] == texts
+    assert len(calls) == 1
+    assert parse_cache.info()["shards"] == 2
+    assert len(parse_cache) == len(TEXTS)
+
+    calls.clear()
+    docs = list(parse_cache.pipe(nlp, texts, n_process=2, disable=disable))
+    assert [doc.text for doc in docs] == texts
+    assert calls == [], "No texts should be parsed if all are cached"
+
+
+def test_function_get_config_key():
+    nlp = asp.get_nlp()
+    cfg, disable = asp.get_pipe_config(ASPECTS, nlp=nlp)
+    key = cache.get_config_key(nlp, cfg, disable)
+    same_cfg, _ = asp.get_pipe_config(ASPECTS, nlp=nlp)
+    assert cache.get_config_key(nlp, same_cfg, disable) == key
+
+    other_cfg, _ = asp.get_pipe_config(ASPECTS, parent_span_min_length=3, nlp=nlp)
+    assert cache.get_config_key(nlp, other_cfg, disable) != key
+    other_cfg, _ = asp.get_pipe_config({"Food": ["food"]}, nlp=nlp)
+    assert cache.get_config_key(nlp, other_cfg, disable) != key
+
+
+def test_make_results_result_cache():
+    """Tests that duplicate texts are processed once and give the same results."""
+    texts = TEXTS + [TEXTS[0], "  " + TEXTS[1] + "\n"]
+    rows = [(text, i) for i, text in enumerate(texts)]
+    result_cache = cache.ResultCache()
+    cached = asp.make_results(
+        rows, as_tuples=True, aspects=ASPECTS, result_cache=result_cache
+    )
+    cached = list(cached)
+    targets = list(asp.make_results(rows, as_tuples=True, aspects=ASPECTS))
+
+    assert result_cache.misses == len(TEXTS)
+    assert result_cache.hits == 2
+    assert len(result_cache) == len(TEXTS)
+    for result, target, text in zip(cached, targets, texts):
+        assert result.id == target.id
+        assert result.aspect_sentiments == target.aspect_sentiments
+        for keyword in result.keywords:
+            assert text[keyword["start"] : keyword["end"]] == keyword["keyword"]
+
+    result = asp.make_result(TEXTS[0], aspects=ASPECTS, result_cache=result_cache)
+    assert result.aspect_sentiments == targets[0].aspect_sentiments
+    assert result_cache.hits == 3
+    assert result_cache.info()["seconds_saved"] > 0
+
+    # Results computed with other options are not reused
+    asp.make_result(TEXTS[0], aspects={"Food": ["food"]}, result_cache=result_cache)
+    assert result_cache.misses == len(TEXTS) + 1
+
+
+def test_result_cache_pipe_single_stream():
+    """Tests that misses are processed in one stream, started only if needed."""
+    calls = []
+
+    def process(items):
+        calls.append(None)
+        for _, key in items:
+            yield results.AspectSentimentResult(key, (), ())
+
+    result_cache = cache.ResultCache()
+    texts = TEXTS * 3
+    rows = list(result_cache.pipe(texts, "config", process, batch_size=1))
+    assert len(rows) == len(texts) and len(calls) == 1
+    assert result_cache.misses == len(TEXTS)
+    assert result_cache.hits == len(texts) - len(TEXTS)
+
+    calls.clear()
+    assert len(list(result_cache.pipe(texts, "config", process))) == len(texts)
+    assert calls == []
+
+
+def test_result_cache_sqlite(tmp_path):
+    path = os.path.join(tmp_path, "results.sqlite")
+    with cache.ResultCache(path=path) as result_cache:
+        cold = list(asp.make_results(TEXTS, aspects=ASPECTS, result_cache=result_cache))
+
+    result_cache = cache.ResultCache(max_size=1, path=path)
+    warm = list(asp.make_results(TEXTS, aspects=ASPECTS, result_cache=result_cache))
+    assert result_cache.hits == len(TEXTS) and result_cache.misses == 0
+    assert len(result_cache) == 1
+    for cold_result, warm_result in zip(cold, warm):
+        assert warm_result.aspect_sentiments == cold_result.aspect_sentiments
+        assert warm_result.keywords == cold_result.keywords
+        assert warm_result.aspect_names is cold_result.aspect_names
+    result_cache.close()
+
+
+def test_function_restore_result():
+    text = "  The food was great.\n"
+    normalized, start = cache.normalize_text(text)
+    assert (normalized, start) == ("The food was great.", 2)
+    result = asp.make_result(normalized, aspects=ASPECTS, anonymize=True)
+    restored = cache.restore_result(result, text, start, len(normalized), row_id=5)
+    assert restored.id == 5
+    assert restored.anonymized == text
+    keyword = restored.keywords[0]
+    assert text[keyword["start"] : keyword["end"]] == "food"
@@ -0,0 +1,84 @@
+"""Test functions for the la_nlp.chunking module.
+"""
+
+import math
+from la_nlp.pipes import aspect_sentiment as asp
+from la_nlp import chunking
+import pytest
+
+ASPECTS = {"Food": ["food"], "Service": ["service"]}
+
+PARAGRAPHS = [
+    "The food was delicious. The service was terrible.",
+    "I did not like the food at all, it was cold.",
+    "The service was fine.",
+]
+
+LONG_TEXT = "\n\n".join(PARAGRAPHS)
+
+
+def test_split_text_paragraphs():
+    """Tests that paragraphs are packed into chunks which cover the text"""
+    chunks = chunking.split_text(LONG_TEXT, max_chars=100)
+    assert "".join(LONG_TEXT[start:end] for start, end in chunks) == LONG_TEXT
+    assert all(end - start <= 100 for start, end in chunks)
+    assert len(chunks) == 2
+    assert LONG_TEXT[chunks[1][0] : chunks[1][1]] == PARAGRAPHS[2]
+
+
+def test_split_text_sentences_and_words():
+    text = "One two three. Four five six seven eight nine ten."
+    chunks = chunking.split_text(text, max_chars=20)
+    assert [text[start:end] for start, end in chunks] == [
+        "One two three. ",
+        "Four five six seven ",
+        "eight nine ten.",
+    ]
+    assert chunking.split_text("x" * 25, max_chars=10) == [(0, 10), (10, 20), (20, 25)]
+
+
+def test_split_text_short():
+    assert chunking.split_text("Short.") == [(0, 6)]
+    assert chunking.split_text("") == [(0, 0)]
+    with pytest.raises(ValueError):
+        chunking.split_text("Text", max_chars=0)
+
+
+def test_function_make_long_result():
+    """Tests that merged results are weighted means over chunks"""
+    result = asp.make_long_result(LONG_TEXT, aspects=ASPECTS, max_chunk_chars=60)
+    chunk_results = [asp.make_result(p, aspects=ASPECTS) for p in PARAGRAPHS]
+
+    food = [r.aspect_sentiments["Food"] for r in chunk_results[:2]]
+    service = [chunk_results[0].aspect_sentiments["Service"]]
+    service.append(chunk_results[2].aspect_sentiments["Service"])
+    assert result.aspect_sentiments["Food"] == pytest.approx(sum(food) / 2)
+    assert result.aspect_sentiments["Service"] == pytest.approx(sum(service) / 2)
+
+    # Keyword offsets refer to the whole text
+    assert [k["keyword"] for k in result.keywords] == [
+        "food",
+        "service",
+        "food",
+        "service",
+    ]
+    for keyword in result.keywords:
+        assert LONG_TEXT[keyword["start"] : keyword["end"]] == keyword["keyword"]
+        assert keyword["span_start"] <= keyword["start"] < keyword["span_end"]
+
+
+def test_function_make_long_results_matches_make_results():
+    """Tests that texts shorter than a chunk give the same results"""
+    rows = [(text, i) for i, text in enumerate(PARAGRAPHS)]
+    long_results = list(asp.make_long_results(rows, as_tuples=True, aspects=ASPECTS))
+    targets = list(asp.make_results(rows, as_tuples=True, aspects=ASPECTS))
+    for result, target in zip(long_results, targets):
+        assert result.id == target.id
+        assert result.aspect_sentiments == target.aspect_sentiments
+        assert result.keywords == target.keywords
+
+
+def test_make_long_result_no_aspects():
+    result = asp.make_long_result("Nothing here.\n\nOr here.", aspects=ASPECTS)
+    assert result.contains_aspect == False
+    assert all(math.isnan(score) for score in result.sentiments)
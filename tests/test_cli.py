@@ -0,0 +1,163 @@
+"""Test functions for the la_nlp.cli module.
+"""
+
+import csv
+import json
+import os
+from la_nlp import cli
+import pytest
+
+TEXTS = [
+    "I enjoyed the course.",
+    "The readings were too long.",
+    "This text does not mention anything.",
+    "The professor was great, but the exams were hard.",
+    "The lectures were boring.",
+]
+
+
+@pytest.fixture
+def input_csv(tmp_path):
+    path = os.path.join(tmp_path, "comments.csv")
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["comment_id", "comment"])
+        for i, text in enumerate(TEXTS):
+            writer.writerow([f"c{i}", text])
+    return path
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_function_read_rows_jsonl(tmp_path):
+    path = os.path.join(tmp_path, "comments.jsonl")
+    with open(path, "w", encoding="utf-8") as file:
+        for text in TEXTS[:2]:
+            file.write(json.dumps({"body": text}) + "\n")
+    rows = list(cli.read_rows(path, text_column="body"))
+    assert rows == [(TEXTS[0], 0), (TEXTS[1], 1)]
+    with pytest.raises(ValueError):
+        list(cli.read_rows(path))
+
+
+def test_cli_run(input_csv, tmp_path):
+    output = os.path.join(tmp_path, "results.jsonl")
+    argv = [input_csv, output, "--text-column", "comment", "--id-column", "comment_id"]
+    cli.main(argv + ["--quiet", "--checkpoint-every", "2"])
+
+    records = read_jsonl(output)
+    assert [record["id"] for record in records] == [f"c{i}" for i in range(5)]
+    assert records[0]["course"] is not None
+    assert not os.path.exists(cli.get_checkpoint_path(output))
+
+
+def test_cli_resume(input_csv, tmp_path):
+    """Tests that an interrupted run resumes from its last checkpoint"""
+    output = os.path.join(tmp_path, "results.csv")
+    argv = [input_csv, output, "--text-column", "comment", "--id-column", "comment_id"]
+    cli.main(argv + ["--quiet"])
+    with open(output, encoding="utf-8") as file:
+        complete = file.read()
+
+    # Simulate a run which checkpointed after 2 rows, then wrote a partial row
+    lines = complete.splitlines(keepends=True)
+    partial = "".join(lines[:3])
+    with open(output, "w", encoding="utf-8", newline="") as file:
+        file.write(partial + lines[3][:10])
+    args = cli.get_parser().parse_args(argv)
+    cli.write_checkpoint(
+        output,
+        {
+            "input": os.path.abspath(input_csv),
+            "options": cli.get_checkpoint_options(args, "csv"),
+            "rows": 2,
+            "bytes": len(partial.encode("utf-8")),
+        },
+    )
+
+    cli.main(argv + ["--quiet", "--resume"])
+    with open(output, encoding="utf-8") as file:
+        assert file.read() == complete
+
+
+def test_cli_resume_different_options(input_csv, tmp_path):
+    """Tests that a run is not resumed with options changing its output"""
+    output = os.path.join(tmp_path, "results.jsonl")
+    argv = [input_csv, output, "--text-column", "comment", "--id-column", "comment_id"]
+    args = cli.get_parser().parse_args(argv)
+    cli.write_checkpoint(
+        output,
+        {
+            "input": os.path.abspath(input_csv),
+            "options": cli.get_checkpoint_options(args, "jsonl"),
+            "rows": 2,
+            "bytes": 0,
+        },
+    )
+    with pytest.raises(SystemExit):
+        cli.main(argv + ["--quiet", "--resume", "--anonymize"])
+
+
+def test_cli_stale_checkpoint(input_csv, tmp_path):
+    """Tests that a run without --resume deletes an existing checkpoint"""
+    output = os.path.join(tmp_path, "results.jsonl")
+    argv = [input_csv, output, "--text-column", "comment", "--id-column", "comment_id"]
+    cli.write_checkpoint(output, {"input": os.path.abspath(input_csv), "rows": 2})
+
+    # The run fails after it starts writing, before its first checkpoint
+    with pytest.raises(SystemExit):
+        cli.main(argv + ["--quiet", "--aspects", os.path.join(tmp_path, "a.txt")])
+    assert not os.path.exists(cli.get_checkpoint_path(output))
+
+
+def test_cli_error(tmp_path):
+    output = os.path.join(tmp_path, "results.jsonl")
+    with pytest.raises(SystemExit):
+        cli.main([os.path.join(tmp_path, "comments.txt"), output, "--quiet"])
+
+
+@pytest.mark.parametrize("column", ["comment", "missing"])
+def test_cli_error_keeps_output(input_csv, tmp_path, column):
+    """Tests that a run which cannot read its input leaves the output intact"""
+    output = os.path.join(tmp_path, "results.jsonl")
+    with open(output, "w", encoding="utf-8") as file:
+        file.write("previous\n")
+    path = input_csv if column == "missing" else os.path.join(tmp_path, "none.csv")
+    with pytest.raises(SystemExit):
+        cli.main([path, output, "--text-column", column, "--quiet"])
+    with open(output, encoding="utf-8") as file:
+        assert file.read() == "previous\n"
+
+
+def test_cli_result_cache(input_csv, tmp_path, capsys):
+    output = os.path.join(tmp_path, "results.jsonl")
+    result_cache = os.path.join(tmp_path, "results.sqlite")
+    argv = [input_csv, output, "--text-column", "comment", "--id-column", "comment_id"]
+    cli.main(argv + ["--result-cache", result_cache])
+    cold = read_jsonl(output)
+    cli.main(argv + ["--result-cache", result_cache])
+
+    assert read_jsonl(output) == cold
+    assert "5 hits" in capsys.readouterr().err
+
+
+def test_cli_prefilter(input_csv, tmp_path):
+    output = os.path.join(tmp_path, "results.jsonl")
+    argv = [input_csv, output, "--text-column", "comment", "--id-column", "comment_id"]
+    cli.main(argv + ["--quiet"])
+    expected = read_jsonl(output)
+    cli.main(argv + ["--quiet", "--prefilter"])
+
+    assert read_jsonl(output) == expected
+
+
+def test_cli_prefilter_skip_rate(input_csv, tmp_path, capsys):
+    output = os.path.join(tmp_path, "results.jsonl")
+    argv = [input_csv, output, "--text-column", "comment", "--id-column", "comment_id"]
+    cli.main(argv + ["--prefilter"])
+
+    err = capsys.readouterr().err
+    assert "Prefilter: " in err and "skip rate" in err
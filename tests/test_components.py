@@ -6,8 +6,10 @@ correctness, see the test suite for a pipeline containing the component in quest
 """
 
 from la_nlp import components as comp
+from la_nlp import sentiment, taxonomy
 from spacy import load as load_model
-from spacy.tokens import Doc
+from spacy.tokens import Doc, Span
+from spacy.vocab import Vocab
 import pytest
 
 TEST_TEXT_1 = """
@@ -30,6 +32,25 @@ def test_function_get_token_parent_span(nlp):
     assert comp.get_token_parent_span(doc[0], min_length=7).text == text
 
 
+def test_function_get_token_parent_span_deep_tree():
+    """Tests that parent spans can be found in very deep dependency trees."""
+    n = 5000
+    heads = [i + 1 for i in range(n - 1)] + [n - 1]
+    deps = ["dep"] * (n - 1) + ["ROOT"]
+    doc = Doc(Vocab(), words=["word"] * n, heads=heads, deps=deps)
+    span = comp.get_token_parent_span(doc[0], min_length=7)
+    assert (span.start, span.end) == (0, 7)
+
+
+def test_function_get_parent_span_bounds_cached(nlp):
+    doc = nlp(TEST_TEXT_1)
+    bounds = comp.get_parent_span_bounds(doc, min_length=7)
+    assert comp.get_parent_span_bounds(doc, min_length=7) is bounds
+    assert len(bounds) == len(doc)
+    for token, (start, end) in zip(doc, bounds):
+        assert start <= token.i < end
+
+
 def test_function_contains_aspect(nlp):
     doc = nlp(TEST_TEXT_1)
     doc = comp.set_doc_contains_aspect(doc, base_keywords=KEYWORDS)
@@ -58,6 +79,33 @@ def test_function_keyword_aspects(nlp):
     assert doc._.keywords[0]._.aspect is not None
 
 
+def test_function_duplicate_keyword_aspects():
+    """Tests legacy components' handling of keywords under several aspects."""
+    aspects = {"aspect1": ["keyword1"], "aspect2": ["other", "Keyword1"]}
+    doc = Doc(Vocab(), words=["the", "keyword1"], lemmas=["the", "keyword1"])
+    doc = comp.set_doc_contains_aspect(doc, base_keywords=["keyword1"])
+    doc = comp.set_doc_aspects(doc, base_aspects=aspects)
+    doc = comp.set_doc_keywords(doc, base_keywords=["keyword1"])
+    doc = comp.set_token_aspects(doc, base_aspects=aspects)
+    assert doc._.aspects == ["aspect1", "aspect2"]
+    assert doc._.keywords[0]._.aspect == "aspect2"
+
+    index = taxonomy.compile_aspects(aspects)
+    assert index.get_token_aspects(doc[1]) == ("aspect1", "aspect2")
+    doc = comp.set_doc_aspect_matches(doc, aspect_index=index)
+    assert doc._.aspects == ["aspect1"]
+    assert doc._.keywords[0]._.aspect == "aspect1"
+
+
+def test_function_aspect_matches(nlp):
+    doc = nlp(TEST_TEXT_1)
+    index = taxonomy.compile_aspects(ASPECTS)
+    doc = comp.set_doc_aspect_matches(doc, aspect_index=index)
+    assert doc._.contains_aspect == True
+    assert doc._.aspects == ["aspect1"]
+    assert doc._.keywords[0]._.aspect == "aspect1"
+
+
 def test_function_parent_span(nlp):
     doc = nlp(TEST_TEXT_1)
     doc = comp.set_doc_contains_aspect(doc, base_keywords=KEYWORDS)
@@ -92,6 +140,17 @@ def test_function_parent_span_sentiment_non_keywords(nlp):
     assert doc[0]._.parent_span._.sentiment is not None
 
 
+def test_function_parent_span_sentiment_deduplicated(nlp):
+    doc = nlp(TEST_TEXT_1)
+    doc = comp.set_token_parent_span(doc, include_non_keywords=True)
+    cache = sentiment.SentimentCache()
+    backend = sentiment.VaderBackend(cache=cache)
+    doc = comp.set_span_sentiment(doc, include_non_keywords=True, backend=backend)
+    spans = {(token._.parent_span.start, token._.parent_span.end) for token in doc}
+    info = cache.info()
+    assert info["hits"] + info["misses"] == len(spans)
+
+
 def test_function_aspect_sentiments(nlp):
     doc = nlp(TEST_TEXT_1)
     doc = comp.set_doc_contains_aspect(doc, base_keywords=KEYWORDS)
@@ -107,3 +166,41 @@ def test_function_anonymized(nlp):
     doc = nlp(TEST_TEXT_1)
     doc = comp.set_anonymized(doc)
     assert doc._.anonymized is not None
+
+
+@pytest.fixture
+def ents_doc():
+    words = ["John", "Smith", "met", "John", "Smith", "at", "UBC", "."]
+    spaces = [True, True, True, True, True, True, False, False]
+    doc = Doc(Vocab(), words=words, spaces=spaces)
+    doc.ents = [
+        Span(doc, 0, 2, label="PERSON"),
+        Span(doc, 3, 5, label="PERSON"),
+        Span(doc, 6, 7, label="ORG"),
+    ]
+    return doc
+
+
+def test_function_anonymized_mask(ents_doc):
+    doc = comp.set_anonymized(ents_doc)
+    assert doc._.anonymized == "**** ***** met **** ***** at ***."
+
+
+def test_function_anonymized_labels(ents_doc):
+    doc = comp.set_anonymized(ents_doc, labels=["ORG"], strategy="label")
+    assert doc._.anonymized == "John Smith met John Smith at [ORG]."
+
+
+def test_function_anonymized_pseudonym(ents_doc):
+    doc = comp.set_anonymized(ents_doc, strategy="pseudonym")
+    assert doc._.anonymized == "PERSON_1 met PERSON_1 at ORG_1."
+
+
+def test_function_anonymized_callable(ents_doc):
+    doc = comp.set_anonymized(ents_doc, strategy=lambda ent: ent.label_.lower())
+    assert doc._.anonymized == "person met person at org."
+
+
+def test_function_anonymized_unknown_strategy(ents_doc):
+    with pytest.raises(ValueError):
+        comp.set_anonymized(ents_doc, strategy="unknown")
@@ -0,0 +1,75 @@
+"""Test functions for the la_nlp.instrumentation module.
+"""
+
+import json
+from la_nlp.pipes import aspect_sentiment as asp
+from la_nlp import instrumentation
+import pytest
+
+ASPECTS = {"Food": ["food"], "Service": ["service"]}
+
+TEXTS = [
+    "The food was great.",
+    "The service was terrible but the food was fine.",
+    "This text mentions no aspects.",
+]
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_disabled_records_nothing():
+    instrumentation.reset()
+    instrumentation.disable()
+    list(asp.make_docs(TEXTS, aspects=ASPECTS))
+    stats = instrumentation.get_stats()
+    assert stats["stages"] == {} and stats["counters"] == {}
+
+
+def test_make_docs_stats(enabled):
+    list(asp.make_docs(TEXTS, aspects=ASPECTS))
+    stats = instrumentation.get_stats()
+
+    for stage in ["parse", "match", "parent_span", "sentiment", "aspect_sentiments"]:
+        assert stats["stages"][stage]["docs"] == len(TEXTS)
+        assert stats["stages"][stage]["seconds"] >= 0
+    assert "anonymize" not in stats["stages"]
+
+    assert stats["counters"]["docs"] == 3
+    assert stats["counters"]["keywords_found"] == 3
+    assert stats["counters"]["docs_skipped"] == 1
+    assert stats["counters"]["spans_scored"] >= 2
+
+
+def test_hooks(enabled):
+    calls = []
+
+    def hook(stage, seconds, n_docs):
+        calls.append((stage, n_docs))
+
+    instrumentation.add_hook(hook)
+    try:
+        asp.make_doc(TEXTS[0], aspects=ASPECTS, anonymize=True)
+    finally:
+        instrumentation.remove_hook(hook)
+    assert ("match", 1) in calls and ("anonymize", 1) in calls
+
+
+def test_exports(enabled):
+    with instrumentation.timer("match", n_docs=2):
+        pass
+    instrumentation.count("keywords_found", 5)
+
+    stats = json.loads(instrumentation.to_json())
+    assert stats["stages"]["match"]["calls"] == 1
+
+    text = instrumentation.to_prometheus()
+    assert 'la_nlp_stage_docs_total{stage="match"} 2' in text
+    assert "la_nlp_keywords_found_total 5" in text
+    assert "# TYPE la_nlp_stage_seconds_total counter" in text
@@ -0,0 +1,132 @@
+"""Test functions for the la_nlp.prefiltering module.
+"""
+
+from la_nlp.pipes import aspect_sentiment as asp
+from la_nlp import prefiltering, taxonomy
+import pytest
+import spacy
+from spacy.lookups import Lookups
+
+ASPECTS = {"Food": ["food"], "Service": ["service"], "Hours": ["office hours"]}
+
+TEXTS = [
+    "The food was great.",
+    "The services were terrible but the food was fine.",
+    "This text mentions no aspects.",
+    "Office hours were useful.",
+    "Nothing to see here.",
+    "",
+]
+
+
+def get_rule_lemmatizer():
+    """Gets a blank pipeline with a rule lemmatizer holding a few rules."""
+    nlp = spacy.blank("en")
+    lemmatizer = nlp.add_pipe("lemmatizer", config={"mode": "rule"})
+    lookups = Lookups()
+    lookups.add_table("lemma_rules", {"noun": [["s", ""], ["ies", "y"]]})
+    lookups.add_table("lemma_exc", {"noun": {"feet": ["foot"]}, "verb": {}})
+    lookups.add_table("lemma_index", {})
+    lemmatizer.lookups = lookups
+    return lemmatizer
+
+
+def test_function_get_rule_forms():
+    lemmatizer = get_rule_lemmatizer()
+    forms = prefiltering.get_rule_forms(lemmatizer, {"food", "study", "foot"})
+    assert {"food", "foods", "study", "studies", "feet", "foot"} <= forms
+    assert "stud" not in forms
+
+
+def test_function_get_rule_forms_whole_word():
+    """Tests that rules replacing a whole form with a keyword are inverted"""
+    lemmatizer = get_rule_lemmatizer()
+    lookups = lemmatizer.lookups
+    lookups.set_table("lemma_rules", {"verb": [["was", "be"], ["s", ""]]})
+    forms = prefiltering.get_rule_forms(lemmatizer, {"be"})
+    assert {"be", "was", "bes"} <= forms
+    assert "" not in forms
+
+
+def test_function_get_attribute_ruler_forms():
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("attribute_ruler")
+    ruler.add([[{"ORTH": "Grub"}]], {"LEMMA": "food"})
+    ruler.add([[{"LOWER": "ate"}]], {"LEMMA": "eat"})
+    assert prefiltering.get_attribute_ruler_forms(ruler, {"food"}) == {"grub"}
+
+    ruler.add([[{"POS": "NOUN"}]], {"LEMMA": "food"})
+    assert prefiltering.get_attribute_ruler_forms(ruler, {"food"}) is None
+
+
+def test_prefilter_no_false_negatives():
+    """Tests that every text containing an aspect may contain a keyword"""
+    nlp = asp.get_nlp()
+    aspect_index = taxonomy.AspectIndex(ASPECTS)
+    prefilter = prefiltering.KeywordPrefilter(aspect_index, nlp)
+    for doc in asp.make_docs(TEXTS, aspects=ASPECTS):
+        if doc._.contains_aspect:
+            assert prefilter.may_contain_keyword(nlp.make_doc(doc.text))
+    assert not prefilter.may_contain_keyword(nlp.make_doc(TEXTS[2]))
+
+
+def test_prefilter_unpredictable_lemmas():
+    """Tests that no texts are skipped if lemmas cannot be predicted"""
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("attribute_ruler")
+    ruler.add([[{"POS": "NOUN"}]], {"LEMMA": "food"})
+    prefilter = prefiltering.KeywordPrefilter(taxonomy.AspectIndex(ASPECTS), nlp)
+    assert prefilter.forms is None
+    assert prefilter.may_contain_keyword(nlp.make_doc(TEXTS[2]))
+
+
+def test_function_make_docs_prefilter():
+    """Tests that prefiltered Docs have the same aspect sentiments, in order"""
+    expected = list(asp.make_docs(TEXTS, aspects=ASPECTS))
+    docs = list(asp.make_docs(TEXTS, aspects=ASPECTS, prefilter=True))
+    assert [doc.text for doc in docs] == TEXTS
+    for doc, expected_doc in zip(docs, expected):
+        assert doc._.aspect_sentiments == expected_doc._.aspect_sentiments
+        assert doc._.contains_aspect == expected_doc._.contains_aspect
+
+
+def test_function_make_docs_prefilter_as_tuples():
+    texts = [(text, i) for i, text in enumerate(TEXTS)]
+    docs = list(asp.make_docs(texts, as_tuples=True, aspects=ASPECTS, prefilter=True))
+    assert [(doc.text, i) for doc, i in docs] == texts
+
+
+def test_function_make_results_prefilter():
+    expected = list(asp.make_results(TEXTS, aspects=ASPECTS))
+    results = list(asp.make_results(TEXTS, aspects=ASPECTS, prefilter=True))
+    assert [r.aspect_sentiments for r in results] == [
+        r.aspect_sentiments for r in expected
+    ]
+
+
+def test_prefilter_info():
+    pipeline = asp.AspectSentimentPipeline(aspects=ASPECTS)
+    prefilter = prefiltering.KeywordPrefilter(pipeline.aspect_index, pipeline.nlp)
+    list(pipeline.pipe(TEXTS, prefilter=prefilter))
+    assert prefilter.info() == {
+        "checked": len(TEXTS),
+        "skipped": 3,
+        "skip_rate": 3 / len(TEXTS),
+    }
+
+
+def test_function_get_prefilter():
+    pipeline = asp.AspectSentimentPipeline(aspects=ASPECTS)
+    prefilter = prefiltering.get_prefilter(pipeline.aspect_index, pipeline.nlp)
+    assert prefilter is prefiltering.get_prefilter(
+        pipeline.aspect_index, pipeline.nlp
+    )
+
+
+def test_make_docs_prefilter_errors():
+    with pytest.raises(ValueError):
+        list(asp.make_docs(TEXTS, anonymize=True, prefilter=True))
+
+    other = prefiltering.KeywordPrefilter(taxonomy.AspectIndex(ASPECTS), asp.get_nlp())
+    with pytest.raises(ValueError):
+        list(asp.make_docs(TEXTS, aspects=ASPECTS, prefilter=other))
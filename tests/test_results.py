@@ -0,0 +1,67 @@
+"""Test functions for the la_nlp.results module.
+"""
+
+import os
+import pickle
+import sys
+from la_nlp.pipes import aspect_sentiment as asp
+from la_nlp import results, writers
+import pytest
+from spacy.tokens import Doc, Span, Token
+
+ASPECTS = {"Food": ["food"], "Service": ["service"]}
+
+TEXTS = [
+    "The food was great.",
+    "The service was terrible but the food was fine.",
+    "This text mentions no aspects.",
+]
+
+
+def get_size(result):
+    """Returns the approximate memory use of a result in bytes."""
+    size = sys.getsizeof(result)
+    for name in ["sentiments", "lemmas", "offsets", "scores"]:
+        size += sys.getsizeof(getattr(result, name))
+    return size
+
+
+def test_function_make_results():
+    """Tests that results match the attributes of the corresponding Docs"""
+    docs = list(asp.make_docs(TEXTS, aspects=ASPECTS))
+    rows = [(text, f"row{i}") for i, text in enumerate(TEXTS)]
+    all_results = list(asp.make_results(rows, as_tuples=True, aspects=ASPECTS))
+
+    for i, (doc, result) in enumerate(zip(docs, all_results)):
+        assert result.id == f"row{i}"
+        assert result.aspect_sentiments == doc._.aspect_sentiments
+        assert result.aspects == doc._.aspects
+        assert result.contains_aspect == doc._.contains_aspect
+        assert result.keywords == writers.get_keyword_records(doc)
+    assert all_results[0].aspect_names is all_results[1].aspect_names
+
+
+def test_result_detached():
+    result = asp.make_result(TEXTS[1], aspects=ASPECTS)
+    for name in results.AspectSentimentResult.__slots__:
+        assert not isinstance(getattr(result, name), (Doc, Span, Token))
+    assert get_size(result) < 1000
+
+
+def test_result_pickle():
+    result = asp.make_result(TEXTS[1], aspects=ASPECTS, anonymize=True)
+    loaded = pickle.loads(pickle.dumps(result))
+    assert loaded.to_record() == result.to_record()
+    assert loaded.anonymized == result.anonymized
+
+
+def test_write_results(tmp_path):
+    path = os.path.join(tmp_path, "results.jsonl")
+    rows = [(text, i + 10) for i, text in enumerate(TEXTS)]
+    writers.write_docs(asp.make_results(rows, as_tuples=True, aspects=ASPECTS), path)
+    with open(path, encoding="utf-8") as file:
+        assert [line.split(",")[0] for line in file] == [
+            '{"id": 10',
+            '{"id": 11',
+            '{"id": 12',
+        ]
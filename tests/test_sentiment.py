@@ -0,0 +1,92 @@
+"""Test functions for the la_nlp.sentiment module.
+"""
+
+from la_nlp import sentiment
+import pytest
+
+
+class CountingBackend(sentiment.SentimentBackend):
+    """Backend scoring texts by length, recording each batch it is passed."""
+
+    def __init__(self, cache_size: int = 10):
+        super().__init__(cache_size)
+        self.batches = []
+
+    def score_texts(self, texts: list[str]) -> list[float]:
+        self.batches.append(texts)
+        return [len(text) / 100 for text in texts]
+
+
+def test_get_text_sentiment():
+    """Tests that texts are scored with VADER compound sentiment by default."""
+    score = sentiment.get_text_sentiment("I enjoyed the course")
+    assertion = "Score should be 0.5106"
+    assert score == 0.5106, assertion
+
+
+def test_sentiment_cache_hits_and_misses():
+    """Tests that repeated texts are served from the cache."""
+    cache = sentiment.SentimentCache(maxsize=10)
+    backend = sentiment.VaderBackend(cache=cache)
+    first = sentiment.get_text_sentiment("Great prof!", backend=backend)
+    second = sentiment.get_text_sentiment("Great prof!", backend=backend)
+
+    assert first == second
+    target = {"hits": 1, "misses": 1, "maxsize": 10, "currsize": 1}
+    assertion = f"Cache info should be {target}"
+    assert cache.info() == target, assertion
+
+
+def test_sentiment_cache_evicts_least_recently_used():
+    """Tests that the cache is bounded, evicting least recently used scores."""
+    cache = sentiment.SentimentCache(maxsize=2)
+    cache.put("a", 0.1)
+    cache.put("b", 0.2)
+    cache.get("a")
+    cache.put("c", 0.3)
+
+    assertion = "'b' should have been evicted"
+    assert cache.get("b") is None, assertion
+    assert cache.get("a") == 0.1
+    assert cache.get("c") == 0.3
+
+
+def test_sentiment_cache_resize():
+    """Tests that resizing the cache evicts scores and size 0 disables it."""
+    cache = sentiment.SentimentCache(maxsize=3)
+    for text in ["a", "b", "c"]:
+        cache.put(text, 0.0)
+    cache.resize(1)
+    assert len(cache) == 1
+
+    cache.resize(0)
+    cache.put("d", 0.0)
+    assert len(cache) == 0
+
+
+def test_score_batch():
+    """Tests that score_batch() scores each distinct uncached text once."""
+    backend = CountingBackend()
+    scores = backend.score_batch(["ab", "abc", "ab"])
+    assert scores.tolist() == [0.02, 0.03, 0.02]
+
+    backend.score_batch(["abc", "abcd"])
+    assertion = "Only uncached, distinct texts should be passed to score_texts()"
+    assert backend.batches == [["ab", "abc"], ["abcd"]], assertion
+
+
+def test_register_backend():
+    """Tests that registered backends can be retrieved by name."""
+    sentiment.register_backend("counting")(CountingBackend)
+    backend = sentiment.get_backend("counting")
+
+    assert isinstance(backend, CountingBackend)
+    assertion = "Backends should be created once and shared"
+    assert sentiment.get_backend("counting") is backend, assertion
+    assert sentiment.get_text_sentiment("abcd", backend="counting") == 0.04
+
+
+def test_get_backend_unknown():
+    """Tests that requesting an unregistered backend raises a ValueError."""
+    with pytest.raises(ValueError):
+        sentiment.get_backend("not a backend")
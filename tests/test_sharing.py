@@ -0,0 +1,140 @@
+"""Test functions for the la_nlp.sharing module.
+"""
+
+import multiprocessing
+import os
+import pickle
+from multiprocessing.reduction import ForkingPickler
+import numpy
+from la_nlp.pipes import aspect_sentiment as asp
+from la_nlp import sharing
+from spacy import blank
+from spacy import load as load_model
+import pytest
+
+TEXTS = [
+    "The professor was great.",
+    "The readings were too long.",
+    "This text mentions no aspects.",
+]
+
+
+@pytest.fixture
+def vectors_nlp():
+    nlp = blank("en")
+    for i, word in enumerate(["course", "class", "exam"]):
+        nlp.vocab.set_vector(word, numpy.full(4, i + 1, dtype="float32"))
+    return nlp
+
+
+def get_worker_vectors(vectors, queue):
+    """Sends the type, shape and first row of a worker's vectors back."""
+    queue.put((type(vectors.data).__name__, vectors.shape, vectors.data[0].tolist()))
+
+
+def test_function_share_vectors_model_file():
+    """Tests that a loaded model's own vectors file is shared"""
+    nlp = load_model(asp.get_model_name())
+    path = sharing.share_vectors(nlp)
+
+    assert path == os.path.join(str(nlp.path), sharing.MODEL_VECTORS_PATH)
+    assert not isinstance(nlp.vocab.vectors.data, numpy.memmap)
+    assert sharing.get_shared_path(nlp.vocab.vectors) == path
+    assert sharing.share_vectors(nlp) == path
+
+
+def test_function_share_vectors_directory(vectors_nlp, tmp_path):
+    """Tests that vectors without a model file are written once, by content"""
+    data = numpy.array(vectors_nlp.vocab.vectors.data)
+    assert sharing.share_vectors(vectors_nlp) is None
+
+    path = sharing.share_vectors(vectors_nlp, str(tmp_path))
+    assert os.path.dirname(path) == str(tmp_path)
+    assert numpy.array_equal(numpy.load(path), data)
+
+    other = blank("en")
+    for i, word in enumerate(["course", "class", "exam"]):
+        other.vocab.set_vector(word, numpy.full(4, i + 1, dtype="float32"))
+    assert sharing.share_vectors(other, str(tmp_path)) == path
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_function_share_vectors_changed(vectors_nlp, tmp_path):
+    """Tests that vectors added after sharing stop the table being shared"""
+    vectors = vectors_nlp.vocab.vectors
+    sharing.share_vectors(vectors_nlp, str(tmp_path))
+    vectors_nlp.vocab.set_vector("quiz", numpy.ones(4, dtype="float32"))
+    assert sharing.get_shared_path(vectors) is None
+    unpickled = pickle.loads(ForkingPickler.dumps(vectors))
+    assert not isinstance(unpickled.data, numpy.memmap)
+
+    path = sharing.share_vectors(vectors_nlp, str(tmp_path))
+    assert sharing.get_shared_path(vectors) == path
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_function_share_vectors_no_vectors(tmp_path):
+    assert sharing.share_vectors(blank("en"), str(tmp_path)) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_pickle_shared_vectors(vectors_nlp, tmp_path):
+    """Tests that mapped vectors are sent to workers as the path of their file"""
+    vectors = vectors_nlp.vocab.vectors
+    full_size = len(ForkingPickler.dumps(vectors))
+    sharing.share_vectors(vectors_nlp, str(tmp_path))
+
+    pickled = ForkingPickler.dumps(vectors)
+    assert len(pickled) < full_size
+    attached = pickle.loads(pickled)
+    assert isinstance(attached.data, numpy.memmap)
+    assert attached.key2row == vectors.key2row
+    assert attached.find(key="exam") == vectors.find(key="exam")
+
+    assertion = "Vectors should still be copied when pickled outside multiprocessing"
+    assert not isinstance(
+        pickle.loads(pickle.dumps(vectors)).data, numpy.memmap
+    ), assertion
+
+
+def test_spawned_worker_attaches_vectors(vectors_nlp, tmp_path):
+    sharing.share_vectors(vectors_nlp, str(tmp_path))
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=get_worker_vectors, args=(vectors_nlp.vocab.vectors, queue)
+    )
+    process.start()
+    result = queue.get(timeout=60)
+    process.join()
+    assert result == ("memmap", vectors_nlp.vocab.vectors.shape, [1.0] * 4)
+
+
+def test_shared_after_multi_word_keywords():
+    """Tests that matching multi-word keywords does not stop vectors being shared"""
+    vectors = asp.get_nlp().vocab.vectors
+    texts = ["The mid-terms were horrible.", "I wish the mid term was less boring."]
+    aspects = {"tests": ["mid-term", "mid term"]}
+    list(asp.make_docs(texts, aspects=aspects, n_process=2, batch_size=1))
+    path = sharing.get_shared_path(vectors)
+    assert path is not None
+
+    docs = list(asp.make_docs(texts, aspects=aspects, n_process=2, batch_size=1))
+    assert len(docs[0]._.keywords) == 1
+    assert sharing.get_shared_path(vectors) == path
+
+
+def test_function_enable_disable():
+    assert sharing.is_enabled()
+    sharing.disable()
+    assert not sharing.is_enabled()
+    sharing.enable()
+    assert sharing.is_enabled()
+
+
+def test_function_make_docs_n_process():
+    """Tests that multi-process results match single process results"""
+    expected = [doc._.aspect_sentiments for doc in asp.make_docs(TEXTS)]
+    docs = list(asp.make_docs(TEXTS, n_process=2, batch_size=1))
+    assert [doc._.aspect_sentiments for doc in docs] == expected
+    assert sharing.get_shared_path(asp.get_nlp().vocab.vectors) is not None
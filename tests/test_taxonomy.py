@@ -0,0 +1,241 @@
+"""Test functions for the la_nlp.taxonomy module.
+"""
+
+import os
+import numpy
+from la_nlp import components, taxonomy
+from spacy import blank
+from spacy.tokens import Doc
+from spacy.vocab import Vocab
+import pytest
+
+ASPECTS = {
+    "course": ["course", "class"],
+    "tests": ["exam", "Mid-Term"],
+    "instructor": ["professor", "class"],
+}
+
+
+@pytest.fixture
+def doc():
+    words = ["The", "Professor", "said", "the", "Mid-Term", "exams", "were", "fair"]
+    lemmas = ["the", "Professor", "say", "the", "Mid-Term", "exam", "be", "fair"]
+    return Doc(Vocab(), words=words, lemmas=lemmas)
+
+
+def test_match(doc):
+    """Tests that match() finds keyword tokens and their aspects in order."""
+    index = taxonomy.AspectIndex(ASPECTS)
+    target = [(1, "instructor"), (4, "tests"), (5, "tests")]
+    assertion = f"Matches should be {target}"
+    assert index.match(doc) == target, assertion
+
+
+def test_match_case_folded():
+    """Tests that matching is insensitive to the case of lemmas and keywords."""
+    doc = Doc(Vocab(), words=["MID-TERM"], lemmas=["mid-term"])
+    index = taxonomy.AspectIndex(ASPECTS)
+    assert index.get_token_aspect(doc[0]) == "tests"
+
+
+def test_duplicate_keyword_first_aspect():
+    """Tests that keywords shared by multiple aspects map to the first aspect."""
+    doc = Doc(Vocab(), words=["class"], lemmas=["class"])
+    index = taxonomy.AspectIndex(ASPECTS)
+    assert index.get_token_aspect(doc[0]) == "course"
+
+
+def test_lemma_cache_bounded(doc, monkeypatch):
+    """Tests that the memo of lemma lookups stays within LEMMA_CACHE_SIZE."""
+    monkeypatch.setattr(taxonomy, "LEMMA_CACHE_SIZE", 3)
+    index = taxonomy.AspectIndex(ASPECTS)
+    target = [(1, "instructor"), (4, "tests"), (5, "tests")]
+    assert index.match(doc) == target
+    assert len(index._lemma_aspects) <= 3
+    assert index.match(doc) == target
+
+
+def test_index_keywords():
+    """Tests that the index exposes its aspects and keywords."""
+    index = taxonomy.AspectIndex(ASPECTS)
+    assert index.aspects == {aspect: tuple(kws) for aspect, kws in ASPECTS.items()}
+    assert index.keywords == (
+        "course",
+        "class",
+        "exam",
+        "Mid-Term",
+        "professor",
+        "class",
+    )
+
+
+def test_index_read_only():
+    """Tests that a shared index's aspects cannot be changed by a caller."""
+    index = taxonomy.compile_aspects(ASPECTS)
+    with pytest.raises(TypeError):
+        index.aspects["course"] = ("lecture",)
+    with pytest.raises(AttributeError):
+        index.aspects["course"].append("lecture")
+    assert taxonomy.compile_aspects(ASPECTS).aspects["course"] == ("course", "class")
+
+
+def test_compile_aspects_cached():
+    """Tests that compiling equal aspects returns the same index."""
+    index1 = taxonomy.compile_aspects(ASPECTS)
+    index2 = taxonomy.compile_aspects(dict(ASPECTS))
+    assertion = "Equal aspects should share a compiled index"
+    assert index1 is index2, assertion
+
+    index3 = taxonomy.compile_aspects({"course": ["course"]})
+    assert index3 is not index1
+
+
+def test_multi_word_keywords():
+    """Tests that keywords containing token separators are identified."""
+    aspects = {"tests": ["mid-term", "mid term", "exam"], "support": ["office hours"]}
+    index = taxonomy.AspectIndex(aspects)
+    assert index.multi_word_keywords == ("mid-term", "mid term", "office hours")
+
+
+def test_phrase_matcher():
+    """Tests that multi-word keywords are matched as spans labelled by keyword."""
+    nlp = blank("en")
+    aspects = {"tests": ["mid-term", "mid term"], "support": ["Office Hours"]}
+    index = taxonomy.AspectIndex(aspects)
+    matcher = index.get_phrase_matcher(nlp)
+
+    assertion1 = "Matcher should be compiled once per vocab"
+    assert index.get_phrase_matcher(nlp) is matcher, assertion1
+
+    doc = nlp("The Mid-Terms and mid term were fine, office hours less so.")
+    n_tokens = len(doc)
+    spans = components.match_keyword_phrases(doc, matcher)
+    assertion2 = "Matches should be labelled with the keyword they matched"
+    labels = [span.label_ for span in spans]
+    assert labels == ["mid-term", "mid term", "Office Hours"], assertion2
+    assert [span.text for span in spans] == ["Mid-Terms", "mid term", "office hours"]
+    assert len(doc) == n_tokens, "The Doc should not be retokenized"
+
+    doc = components.set_doc_aspect_matches(doc, index, matcher)
+    assert [kw._.aspect for kw in doc._.keywords] == ["tests", "tests", "support"]
+
+
+def test_phrase_matcher_none_without_multi_word_keywords():
+    """Tests that no matcher is compiled if there are no multi-word keywords."""
+    index = taxonomy.AspectIndex({"course": ["course"]})
+    assert index.get_phrase_matcher(blank("en")) is None
+
+
+@pytest.fixture
+def vectors_nlp():
+    nlp = blank("en")
+    vectors = {
+        "lecturer": [1.0, 0.0, 0.0],
+        "lectures": [0.9, 0.1, 0.0],
+        "professor": [0.0, 1.0, 0.0],
+        "prof": [0.1, 0.95, 0.0],
+        "exam": [0.0, 0.0, 1.0],
+        "great": [0.5, 0.5, 0.5],
+    }
+    for word, vector in vectors.items():
+        nlp.vocab.set_vector(word, numpy.array(vector, dtype="float32"))
+    return nlp
+
+
+VECTOR_ASPECTS = {
+    "lectures": ["lecturer"],
+    "instructor": ["professor"],
+    "tests": ["final exam", "quiz"],
+}
+
+
+def test_vector_matcher(vectors_nlp):
+    """Tests that tokens similar to a keyword are matched to its aspect."""
+    index = taxonomy.AspectIndex(VECTOR_ASPECTS)
+    matcher = index.get_vector_matcher(vectors_nlp, 0.8)
+
+    assertion1 = "Matcher should be compiled once per vocab and threshold"
+    assert index.get_vector_matcher(vectors_nlp, 0.8) is matcher, assertion1
+    assert index.get_vector_matcher(vectors_nlp, 0.9) is not matcher
+
+    assertion2 = "Keywords without vectors should be left out"
+    assert matcher.keywords == ("lecturer", "professor", "final exam"), assertion2
+    assert matcher.keyword_matrix.shape == (3, 3)
+    assert numpy.allclose(numpy.linalg.norm(matcher.keyword_matrix, axis=1), 1)
+
+    doc = vectors_nlp("The Prof gave great lectures before the exam")
+    target = [(1, "instructor"), (4, "lectures"), (7, "tests")]
+    assert matcher.match(doc) == target
+    assert matcher.match(doc, exclude=[1, 7]) == [(4, "lectures")]
+
+
+def test_vector_matcher_batch(vectors_nlp):
+    """Tests that a batch is matched the same as each Doc separately."""
+    matcher = taxonomy.AspectIndex(VECTOR_ASPECTS).get_vector_matcher(vectors_nlp)
+    docs = [vectors_nlp(text) for text in ["The prof", "", "Nothing", "exam lectures"]]
+    assert matcher.match_batch(docs) == [matcher.match(doc) for doc in docs]
+
+
+def test_vector_matcher_errors(vectors_nlp):
+    index = taxonomy.AspectIndex(VECTOR_ASPECTS)
+    with pytest.raises(ValueError):
+        index.get_vector_matcher(vectors_nlp, 0)
+    with pytest.raises(ValueError):
+        index.get_vector_matcher(vectors_nlp, 1.5)
+    with pytest.raises(ValueError):
+        index.get_vector_matcher(blank("en"))
+
+
+def test_aspect_matches_with_vector_matcher(vectors_nlp):
+    """Tests that exact and similar matches are combined in token order."""
+    index = taxonomy.AspectIndex(VECTOR_ASPECTS)
+    matcher = index.get_vector_matcher(vectors_nlp, 0.8)
+    words = ["The", "lecturer", "and", "prof", "were", "great"]
+    lemmas = ["the", "lecturer", "and", "prof", "be", "great"]
+    doc = Doc(vectors_nlp.vocab, words=words, lemmas=lemmas)
+    doc = components.set_doc_aspect_matches(doc, index, vector_matcher=matcher)
+    assert [token.i for token in doc._.keywords] == [1, 3]
+    assert [token._.aspect for token in doc._.keywords] == ["lectures", "instructor"]
+    assert doc._.aspects == ["lectures", "instructor"]
+
+
+def test_registry_caches_file(tmp_path):
+    """Tests that an unchanged file is compiled once."""
+    path = tmp_path / "aspects.toml"
+    path.write_text('course = ["course", "class"]\n')
+    registry = taxonomy.TaxonomyRegistry(check_interval=0)
+    index = registry.get(str(path))
+    assert index.aspects == {"course": ("course", "class")}
+    assert registry.get(str(path)) is index
+
+    # Touching the file without changing its content keeps the index
+    os.utime(path, ns=(0, 0))
+    assert registry.get(str(path)) is index
+
+
+def test_registry_reloads_changed_file(tmp_path):
+    path = tmp_path / "aspects.toml"
+    path.write_text('course = ["course"]\n')
+    registry = taxonomy.TaxonomyRegistry(check_interval=0)
+    index = registry.get(str(path))
+
+    path.write_text('course = ["course"]\ntests = ["exam"]\n')
+    reloaded = registry.get(str(path))
+    assert reloaded is not index
+    assert list(reloaded.aspects) == ["course", "tests"]
+
+
+def test_registry_check_interval(tmp_path):
+    """Tests that files are not checked again within the check interval."""
+    path = tmp_path / "aspects.toml"
+    path.write_text('course = ["course"]\n')
+    registry = taxonomy.TaxonomyRegistry(check_interval=3600)
+    index = registry.get(str(path))
+    path.write_text('tests = ["exam"]\n')
+    assert registry.get(str(path)) is index
+
+
+def test_registry_missing_file(tmp_path):
+    registry = taxonomy.TaxonomyRegistry()
+    with pytest.raises(OSError):
+        registry.get(str(tmp_path / "missing.toml"))
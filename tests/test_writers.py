@@ -0,0 +1,113 @@
+"""Test functions for the la_nlp.writers module.
+"""
+
+import csv
+import json
+import os
+from la_nlp.pipes import aspect_sentiment as asp
+from la_nlp import writers
+import pytest
+
+ASPECTS = {"Food": ["food"], "Service": ["service"]}
+
+TEXTS = [
+    "The food was great.",
+    "This text mentions no aspects.",
+    "The service was terrible but the food was fine.",
+]
+
+
+@pytest.fixture
+def docs():
+    return list(asp.make_docs(TEXTS, aspects=ASPECTS))
+
+
+def test_function_get_record(docs):
+    record = writers.get_record(docs[0], 7, ASPECTS)
+    assert list(record) == ["id", "Food", "Service", "keywords"]
+    assert record["id"] == 7
+    assert record["Service"] is None
+    assert record["Food"] == docs[0]._.aspect_sentiments["Food"]
+
+    (keyword,) = record["keywords"]
+    assert keyword["aspect"] == "Food"
+    assert TEXTS[0][keyword["start"] : keyword["end"]] == "food"
+    assert keyword["span_start"] <= keyword["start"] < keyword["span_end"]
+
+
+def test_function_get_record_no_keywords(docs):
+    record = writers.get_record(docs[1], 1, ASPECTS)
+    assert record["keywords"] == []
+    assert record["Food"] is None and record["Service"] is None
+
+
+def test_write_jsonl(docs, tmp_path):
+    path = os.path.join(tmp_path, "results.jsonl")
+    assert writers.write_docs(docs, path, buffer_size=2) == 3
+    with open(path, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+    assert [record["id"] for record in records] == [0, 1, 2]
+    assert [len(record["keywords"]) for record in records] == [1, 0, 2]
+
+
+def test_write_jsonl_results_aspects(docs, tmp_path):
+    """Tests that results are written with the writer's aspects, as Docs are"""
+    doc_path = os.path.join(tmp_path, "docs.jsonl")
+    result_path = os.path.join(tmp_path, "results.jsonl")
+    writers.write_docs(docs, doc_path, aspects=["Food"])
+    results = asp.make_results(TEXTS, aspects=ASPECTS)
+    writers.write_docs(results, result_path, aspects=["Food"])
+
+    with open(doc_path, encoding="utf-8") as file:
+        doc_records = [json.loads(line) for line in file]
+    with open(result_path, encoding="utf-8") as file:
+        result_records = [json.loads(line) for line in file]
+    assert list(result_records[2]) == ["id", "Food", "keywords"]
+    assert result_records == doc_records
+
+
+def test_write_csv_append(docs, tmp_path):
+    path = os.path.join(tmp_path, "results.csv")
+    writers.write_docs(zip(docs, ["a", "b", "c"]), path, aspects=ASPECTS)
+    writers.write_docs(zip(docs, ["d", "e", "f"]), path, ASPECTS, append=True)
+    with open(path, encoding="utf-8", newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["id", "Food", "Service", "keywords"]
+    assert [row[0] for row in rows[1:]] == ["a", "b", "c", "d", "e", "f"]
+    assert rows[2][1:3] == ["", ""]
+    assert len(json.loads(rows[3][3])) == 2
+
+
+def test_write_parquet(docs, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = os.path.join(tmp_path, "results.parquet")
+    writers.write_docs(docs, path, buffer_size=2)
+    table = pq.read_table(path)
+    assert table.column_names == ["id", "Food", "Service", "keywords"]
+    assert table.num_rows == 3
+    assert table.column("Service").to_pylist()[1] is None
+
+
+def test_writer_empty_output(tmp_path):
+    path = os.path.join(tmp_path, "results.csv")
+    with writers.get_writer(path, ASPECTS):
+        pass
+    with open(path, encoding="utf-8") as file:
+        assert file.read().strip() == "id,Food,Service,keywords"
+
+
+def test_writer_error_before_open(tmp_path):
+    """Tests that an error before the first write leaves the output as it was"""
+    path = os.path.join(tmp_path, "results.jsonl")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("previous\n")
+    with pytest.raises(RuntimeError):
+        with writers.get_writer(path, ASPECTS):
+            raise RuntimeError
+    with open(path, encoding="utf-8") as file:
+        assert file.read() == "previous\n"
+
+
+def test_writer_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        writers.get_writer(os.path.join(tmp_path, "results.txt"))